@@ -0,0 +1,10 @@
+"""Benchmark suite for mmdiagram.
+
+Synthetic diagrams are generated by benchmarks.generate and each stage of the
+pipeline is measured separately by benchmarks.run. Use benchmarks.compare to
+check a run against a baseline recorded earlier on the same machine.
+
+    python3 -m benchmarks run -o out/benchmarks/baseline.json
+    python3 -m benchmarks run -o out/benchmarks/results.json
+    python3 -m benchmarks compare out/benchmarks/results.json out/benchmarks/baseline.json
+"""
@@ -0,0 +1,158 @@
+import argparse
+import pathlib
+import sys
+
+import benchmarks.compare
+import benchmarks.export
+import benchmarks.generate
+import benchmarks.ldmap
+import benchmarks.run
+import benchmarks.table
+import benchmarks.typecheck
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python3 -m benchmarks",
+        description="Benchmark each stage of the mmdiagram pipeline using synthetic diagrams.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the benchmark suite and save the results as JSON")
+    run_parser.add_argument(
+        "-o",
+        "--out",
+        help="Path to the JSON results file. Default: out/benchmarks/results.json",
+        default="out/benchmarks/results.json",
+    )
+    run_parser.add_argument(
+        "--suite",
+        help="'default' varies each dimension in turn, 'quick' only uses a few regions per diagram. Default: default",
+        choices=["default", "quick"],
+        default="default",
+    )
+    run_parser.add_argument(
+        "--repeat",
+        help="Number of timing runs per scenario. The fastest run is recorded. Default: 3",
+        type=int,
+        default=3,
+    )
+
+    compare_parser = subparsers.add_parser("compare", help="Compare results against a stored baseline")
+    compare_parser.add_argument("results", help="Path to the JSON results file")
+    compare_parser.add_argument("baseline", help="Path to the JSON baseline file")
+    compare_parser.add_argument(
+        "--tolerance",
+        help="Allowed increase over the baseline as a fraction. Default: 0.2 (20%%)",
+        type=float,
+        default=0.2,
+    )
+
+    typecheck_parser = subparsers.add_parser(
+        "typecheck", help="Compare the stage wall times with and without the typeguard run-time type checks"
+    )
+    typecheck_parser.add_argument(
+        "--regions",
+        help="Number of regions in the synthetic diagram. Default: 1000",
+        type=int,
+        default=1000,
+    )
+    typecheck_parser.add_argument(
+        "--repeat",
+        help="Number of timing runs. The fastest run is recorded. Default: 3",
+        type=int,
+        default=3,
+    )
+
+    table_parser = subparsers.add_parser("table", help="Measure the summary table image for different numbers of rows")
+    table_parser.add_argument(
+        "--rows",
+        help="Numbers of table rows to measure. Default: 100 1000 10000",
+        type=int,
+        nargs="+",
+        default=benchmarks.table.table_sizes,
+    )
+    table_parser.add_argument(
+        "--repeat",
+        help="Number of timing runs per table size. The fastest run is recorded. Default: 3",
+        type=int,
+        default=3,
+    )
+
+    ldmap_parser = subparsers.add_parser(
+        "ldmap", help="Measure the GNU ld map file import throughput and the time to analyse the imported regions")
+    ldmap_parser.add_argument(
+        "--size-mb",
+        help="Size of the synthetic map file in megabytes. Default: 50",
+        type=float,
+        default=50,
+    )
+    ldmap_parser.add_argument(
+        "--repeat",
+        help="Number of timing runs. The fastest run is recorded. Default: 3",
+        type=int,
+        default=3,
+    )
+
+    export_parser = subparsers.add_parser(
+        "export", help="Measure the results outputs end to end, from the JSON input to the results file")
+    export_parser.add_argument(
+        "--regions",
+        help="Numbers of regions to measure. Default: 10000 100000",
+        type=int,
+        nargs="+",
+        default=benchmarks.export.export_sizes,
+    )
+    export_parser.add_argument(
+        "--repeat",
+        help="Number of timing runs per size. The fastest run is recorded. Default: 3",
+        type=int,
+        default=3,
+    )
+
+    pargs = parser.parse_args()
+
+    if pargs.command == "run":
+        if pargs.suite == "quick":
+            suite = benchmarks.generate.quick_suite()
+        else:
+            suite = benchmarks.generate.default_suite()
+        results = benchmarks.run.run_suite(suite, pargs.repeat)
+        benchmarks.run.save_results(results, pathlib.Path(pargs.out))
+        print(f"Results saved to {pargs.out}")
+
+    if pargs.command == "compare":
+        regressions = benchmarks.compare.compare(
+            benchmarks.compare.load_results(pathlib.Path(pargs.results)),
+            benchmarks.compare.load_results(pathlib.Path(pargs.baseline)),
+            pargs.tolerance,
+        )
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions found")
+
+    if pargs.command == "typecheck":
+        scenario = benchmarks.generate.Scenario(regions=pargs.regions)
+        benchmarks.typecheck.print_comparison(benchmarks.typecheck.compare(scenario, pargs.repeat))
+
+    if pargs.command == "table":
+        benchmarks.table.print_table_sizes(benchmarks.table.run_table_sizes(pargs.rows, pargs.repeat))
+
+    if pargs.command == "ldmap":
+        map_path = pathlib.Path("out/benchmarks/synthetic.map")
+        map_path.parent.mkdir(parents=True, exist_ok=True)
+        input_count = benchmarks.ldmap.generate_map_file(map_path, pargs.size_mb)
+        results = benchmarks.ldmap.measure_throughput(map_path, pargs.repeat)
+        print(f"{results['size_mb']:.1f} MB, {input_count} input sections")
+        print(f"parse: {results['parse_mb_per_s']:.1f} MB/s")
+        print(f"load:  {results['load_mb_per_s']:.1f} MB/s")
+        print(f"map file to analysed model: {results['diagram_s']:.2f} s ({results['regions']} regions)")
+
+    if pargs.command == "export":
+        benchmarks.export.print_export_sizes(benchmarks.export.run_export_sizes(pargs.regions, pargs.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import json
+import pathlib
+import typing
+import dataclasses
+
+metrics = ["wall_time_s", "peak_traced_bytes", "peak_rss_bytes", "output_bytes"]
+"""The measurements that are compared against the baseline"""
+
+noise_floor = {
+    "wall_time_s": 0.005,
+    "peak_traced_bytes": 64 * 1024,
+    "peak_rss_bytes": 1024 * 1024,
+    "output_bytes": 1024,
+}
+"""Absolute differences below these values are ignored, so that tiny stages don't flag regressions"""
+
+
+@dataclasses.dataclass
+class Regression:
+    scenario: str
+    stage: str
+    metric: str
+    baseline: float
+    current: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current / self.baseline if self.baseline else float("inf")
+
+    def __str__(self):
+        return (
+            f"{self.scenario} {self.stage} {self.metric}: "
+            f"{self.baseline:.6g} -> {self.current:.6g} ({self.ratio:.2f}x)"
+        )
+
+
+def load_results(path: pathlib.Path) -> typing.Dict:
+    with path.open("r") as fp:
+        return json.load(fp)
+
+
+def compare(current: typing.Dict, baseline: typing.Dict, tolerance: float = 0.2) -> typing.List[Regression]:
+    """Find the measurements that exceed the baseline by more than the tolerance (fraction, e.g. 0.2 = 20%).
+    Scenarios and stages that are missing from either result are skipped."""
+
+    regressions = []
+    for scenario_name, scenario in current["scenarios"].items():
+        baseline_scenario = baseline["scenarios"].get(scenario_name)
+        if not baseline_scenario:
+            continue
+        for stage_name, stage in scenario["stages"].items():
+            baseline_stage = baseline_scenario["stages"].get(stage_name)
+            if not baseline_stage:
+                continue
+            for metric in metrics:
+                current_value = stage.get(metric)
+                baseline_value = baseline_stage.get(metric)
+                # e.g. peak RSS is not available on all platforms
+                if current_value is None or baseline_value is None:
+                    continue
+                if current_value - baseline_value <= noise_floor[metric]:
+                    continue
+                if current_value > baseline_value * (1 + tolerance):
+                    regressions.append(
+                        Regression(scenario_name, stage_name, metric, baseline_value, current_value)
+                    )
+    return regressions
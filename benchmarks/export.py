@@ -0,0 +1,54 @@
+import json
+import pathlib
+import tempfile
+import time
+import typing
+
+import mm.diagram
+import mm.metamodel
+
+from benchmarks.generate import Scenario, generate_diagram
+
+export_sizes = [10000, 100000]
+"""Number of regions measured by default"""
+
+
+def measure_export(regions: int, repeat: int = 3) -> typing.Dict[str, float]:
+    """Best wall time (seconds) of each step of 'mm.diagram -f input.json --outputs results-...': 
+    loading the JSON input, validating and analysing the model, and each results writer. 
+    Every results output pays for the first two steps."""
+
+    input_bytes = json.dumps(generate_diagram(Scenario(regions=regions, links=0))).encode()
+    timings: typing.Dict[str, typing.List[float]] = {"json_load": [], "analysis": []}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            input_dict = json.loads(input_bytes)
+            timings["json_load"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            model = mm.metamodel.Diagram(**input_dict)
+            timings["analysis"].append(time.perf_counter() - start)
+
+            for output in mm.diagram.Diagram.results_writers:
+                path = pathlib.Path(tmp_dir) / f"results.{output.split('-')[1]}"
+                path.unlink(missing_ok=True)
+                writer = mm.diagram.Diagram._results_writer(output)
+                start = time.perf_counter()
+                writer(path, model)
+                timings.setdefault(output, []).append(time.perf_counter() - start)
+    return {step: min(times) for step, times in timings.items()}
+
+
+def run_export_sizes(sizes: typing.List[int] = export_sizes, repeat: int = 3) -> typing.Dict[int, typing.Dict[str, float]]:
+    return {regions: measure_export(regions, repeat) for regions in sizes}
+
+
+def print_export_sizes(results: typing.Dict[int, typing.Dict[str, float]]) -> None:
+    print(f"{'regions':>8} {'json load':>10} {'analysis':>10} {'writer':>15} {'time (s)':>9} {'end to end (s)':>15}")
+    for regions, steps in results.items():
+        common = steps["json_load"] + steps["analysis"]
+        for output in mm.diagram.Diagram.results_writers:
+            print(
+                f"{regions:>8} {steps['json_load']:>10.2f} {steps['analysis']:>10.2f} "
+                f"{output:>15} {steps[output]:>9.2f} {common + steps[output]:>15.2f}")
@@ -0,0 +1,149 @@
+import random
+import typing
+import dataclasses
+
+import mm.diagram
+import mm.metamodel
+
+page_sizes: typing.Dict[str, mm.diagram.APageSize] = {
+    size.name: size for size in (
+        mm.diagram.A10,
+        mm.diagram.A9,
+        mm.diagram.A8,
+        mm.diagram.A7,
+        mm.diagram.A6,
+        mm.diagram.A5,
+        mm.diagram.A4,
+        mm.diagram.A3,
+        mm.diagram.A2,
+        mm.diagram.A1,
+    )
+}
+"""The page sizes defined in mm.diagram, smallest first"""
+
+
+@dataclasses.dataclass(frozen=True)
+class Scenario:
+    """Parameters for a synthetic diagram"""
+
+    regions: int = 100
+    """Total number of regions, split evenly across the maps"""
+
+    maps: int = 2
+    """Number of memory maps"""
+
+    links: int = 10
+    """Number of links between regions in different maps. Ignored for single map diagrams."""
+
+    collision_density: float = 0.1
+    """Probability (0.0 - 1.0) that a region overlaps the previous region in its map"""
+
+    page_size: str = "A4"
+    """Name of a page size from mm.diagram"""
+
+    indent_scheme: str = mm.metamodel.IndentScheme.alternate.value
+    """One of mm.metamodel.IndentScheme"""
+
+    seed: int = 0
+    """Seed for the random layout, so that runs are repeatable"""
+
+    @property
+    def name(self) -> str:
+        return (
+            f"r{self.regions}-m{self.maps}-l{self.links}-c{self.collision_density}"
+            f"-{self.page_size}-{self.indent_scheme}"
+        )
+
+
+def generate_diagram(scenario: Scenario) -> typing.Dict:
+    """Create the input dict (as would be loaded from a JSON file) for the scenario"""
+
+    rng = random.Random(scenario.seed)
+    page = page_sizes[scenario.page_size]
+
+    memory_maps = {}
+    regions_per_map = max(1, scenario.regions // scenario.maps)
+    for map_idx in range(scenario.maps):
+        memory_regions = {}
+        prev_origin = None
+        prev_size = None
+        next_origin = 0x10
+        for region_idx in range(regions_per_map):
+            size = rng.randrange(0x100, 0x1000, 0x10)
+            if prev_origin is not None and rng.random() < scenario.collision_density:
+                # start inside the previous region
+                origin = prev_origin + (prev_size // 2)
+            else:
+                # leave a gap so that some regions are separated by void regions
+                origin = next_origin + rng.choice((0, 0x10, 0x1000))
+
+            # names are unique across all maps because the link validation searches by region name
+            memory_regions[f"m{map_idx}r{region_idx}"] = {
+                "origin": hex(origin),
+                "size": hex(size),
+            }
+            prev_origin, prev_size = origin, size
+            next_origin = max(next_origin, origin + size)
+
+        memory_maps[f"map{map_idx}"] = {
+            "max_address": hex(next_origin + 0x1000),
+            "memory_regions": memory_regions,
+        }
+
+    if scenario.maps > 1:
+        # each region is used by at most one link, so that resizing a link target can't break another link
+        unlinked = {map_name: list(mmap["memory_regions"]) for map_name, mmap in memory_maps.items()}
+        for names in unlinked.values():
+            rng.shuffle(names)
+        for _ in range(scenario.links):
+            candidates = [map_name for map_name, names in unlinked.items() if names]
+            if len(candidates) < 2:
+                break
+            source_map, target_map = rng.sample(candidates, 2)
+            source_name = unlinked[source_map].pop()
+            target_name = unlinked[target_map].pop()
+            source = memory_maps[source_map]["memory_regions"][source_name]
+            target = memory_maps[target_map]["memory_regions"][target_name]
+
+            # linked regions must be the same size
+            target["size"] = source["size"]
+            source.setdefault("links", []).append([target_map, target_name])
+
+    return {
+        "name": scenario.name,
+        "height": page.height,
+        "width": page.width,
+        "indent_scheme": scenario.indent_scheme,
+        "memory_maps": memory_maps,
+    }
+
+
+def default_suite() -> typing.List[Scenario]:
+    """Vary each dimension from a common baseline, then sweep every page size and indent scheme"""
+
+    base = Scenario()
+    suite = [base]
+    suite += [dataclasses.replace(base, regions=n) for n in (10, 1000)]
+    suite += [dataclasses.replace(base, maps=n) for n in (1, 4)]
+    suite += [dataclasses.replace(base, links=n) for n in (0, 100)]
+    suite += [dataclasses.replace(base, collision_density=n) for n in (0.0, 0.5)]
+    suite += [dataclasses.replace(base, page_size=name) for name in page_sizes if name != base.page_size]
+    suite += [
+        dataclasses.replace(base, indent_scheme=scheme.value)
+        for scheme in mm.metamodel.IndentScheme
+        if scheme.value != base.indent_scheme
+    ]
+    return suite
+
+
+def quick_suite() -> typing.List[Scenario]:
+    """Small scenarios that cover every page size and indent scheme. Useful for smoke testing."""
+
+    base = Scenario(regions=10, links=2)
+    suite = [dataclasses.replace(base, page_size=name) for name in page_sizes]
+    suite += [
+        dataclasses.replace(base, indent_scheme=scheme.value)
+        for scheme in mm.metamodel.IndentScheme
+        if scheme.value != base.indent_scheme
+    ]
+    return suite
@@ -0,0 +1,84 @@
+import pathlib
+import random
+import time
+import typing
+
+import mm.ldmap
+import mm.metamodel
+
+
+def generate_map_file(path: pathlib.Path, size_mb: float, seed: int = 0) -> int:
+    """Write a synthetic GNU ld map file of roughly size_mb megabytes. 
+    Every output section has many input sections, symbols and fill, some with wrapped names.
+    Returns the number of input sections."""
+
+    rng = random.Random(seed)
+    target_bytes = int(size_mb * 1024 * 1024)
+    flash_origin, ram_origin = 0x08000000, 0x20000000
+    input_count = 0
+    with path.open("w") as fp:
+        fp.write("Memory Configuration\n\n")
+        fp.write("Name             Origin             Length             Attributes\n")
+        fp.write(f"FLASH            0x{flash_origin:016x} 0x{0x10000000:016x} xr\n")
+        fp.write(f"RAM              0x{ram_origin:016x} 0x{0x10000000:016x} xrw\n")
+        fp.write("*default*        0x0000000000000000 0xffffffffffffffff\n\n")
+        fp.write("Linker script and memory map\n\n")
+
+        address = flash_origin
+        section_idx = 0
+        while fp.tell() < target_bytes:
+            if section_idx % 10 == 9:
+                address = max(address, ram_origin)
+            inputs = [rng.randrange(0x10, 0x400, 4) for _ in range(100)]
+            fp.write(f".text.s{section_idx:<8} 0x{address:016x} {hex(sum(inputs)):>10}\n")
+            fp.write(f" *(.text.s{section_idx}*)\n")
+            for input_idx, size in enumerate(inputs):
+                name = f".text.s{section_idx}.function_{input_idx}"
+                if input_idx % 5 == 0:
+                    # long names are wrapped onto the next line
+                    name = name + "_with_a_long_name"
+                    fp.write(f" {name}\n                0x{address:016x} {hex(size):>10} ./src/module_{input_idx}.o\n")
+                else:
+                    fp.write(f" {name:<14} 0x{address:016x} {hex(size):>10} ./src/module_{input_idx}.o\n")
+                fp.write(f"                0x{address:016x}                function_{section_idx}_{input_idx}\n")
+                if input_idx % 7 == 0:
+                    fp.write(f" *fill*         0x{address + size:016x}        0x0 \n")
+                address += size
+                input_count += 1
+            fp.write("\n")
+            section_idx += 1
+    return input_count
+
+
+def measure_throughput(path: pathlib.Path, repeat: int = 3) -> typing.Dict[str, float]:
+    """Best parse and load throughput (MB/s) for the map file, 
+    and the best end-to-end time from the map file to the analysed model, as used by 'mm.diagram --ldmap'"""
+
+    size_mb = path.stat().st_size / (1024 * 1024)
+    parse_times, load_times, diagram_times = [], [], []
+    regions = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with path.open("r") as fp:
+            for _ in mm.ldmap.parse(fp):
+                pass
+        parse_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        mm.ldmap.load(path, sections="input")
+        load_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        model = mm.metamodel.Diagram(
+            name=path.stem, height=1000, width=400, threshold=0x1000, 
+            memory_maps=mm.ldmap.load(path, sections="input"))
+        diagram_times.append(time.perf_counter() - start)
+        regions = sum(len(mmap.memory_regions) for mmap in model.memory_maps.values())
+
+    return {
+        "size_mb": size_mb,
+        "parse_mb_per_s": size_mb / min(parse_times),
+        "load_mb_per_s": size_mb / min(load_times),
+        "regions": regions,
+        "diagram_s": min(diagram_times),
+    }
@@ -0,0 +1,174 @@
+import contextlib
+import dataclasses
+import io
+import json
+import pathlib
+import platform
+import sys
+import time
+import tracemalloc
+import typing
+
+import mm.diagram
+import mm.metamodel
+import mm.profile
+from mm.profile import image_bytes, read_peak_rss
+
+from benchmarks.generate import Scenario, generate_diagram
+
+stages = [
+    "validation",
+    "calc_nearest_region",
+    "region_images",
+    "create_mmap",
+    "draw_diagram_img",
+    "table",
+    "png_encode",
+]
+"""The pipeline stages measured for each scenario, in pipeline order. 
+calc_nearest_region is the part of the validation spent in that validator, so it is already included in the validation stage."""
+
+
+class Recorder:
+    """Records the wall time or the peak memory of each stage"""
+
+    def __init__(self, trace_memory: bool):
+        self.trace_memory = trace_memory
+        self.results: typing.Dict[str, typing.Dict] = {}
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        result = {"output_bytes": 0}
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            traced_start, _ = tracemalloc.get_traced_memory()
+            yield result
+            _, traced_peak = tracemalloc.get_traced_memory()
+            result["peak_traced_bytes"] = traced_peak - traced_start
+            # the process high-water mark, so a stage only shows an increase if it raised it
+            result["peak_rss_bytes"] = read_peak_rss()
+        else:
+            start = time.perf_counter()
+            yield result
+            result["wall_time_s"] = time.perf_counter() - start
+        self.results[name] = result
+
+    def record_span(self, name: str, span: typing.Dict) -> typing.Dict:
+        """Record a stage that was measured by a profile span, e.g. a step inside another stage"""
+        result = {"output_bytes": 0}
+        if self.trace_memory:
+            result["peak_traced_bytes"] = span["peak_traced_bytes"]
+            result["peak_rss_bytes"] = span["peak_rss_bytes"]
+        else:
+            result["wall_time_s"] = span["duration_s"]
+        self.results[name] = result
+        return result
+
+
+def run_pipeline(input_dict: typing.Dict, recorder: Recorder) -> None:
+    """Run each stage of the pipeline on the input. The state is set up the same way as mm.diagram.Diagram.__init__"""
+
+    mm.diagram.Diagram._parse_args([])
+
+    # calc_nearest_region runs as a validator, so it is measured by its profile span rather than run a second time.
+    # The validation is a span too: the profiler resets the tracemalloc peak, so the spans are measured consistently.
+    profiler = mm.profile.Profiler(trace_memory=recorder.trace_memory)
+    with mm.profile.profiling(profiler), mm.profile.span("validation"):
+        model = mm.metamodel.Diagram(**input_dict)
+    spans = {span["name"]: span for span in profiler.spans}
+    result = recorder.record_span("validation", spans["validation"])
+    result["output_bytes"] = len(model.model_dump_json())
+    recorder.record_span("calc_nearest_region", spans["Diagram.calc_nearest_region"])
+    mm.diagram.Diagram.model = model
+
+    # the region data is created up front so that drawing the region images can be measured separately
+    mmd_list = [
+        mm.diagram.MemoryMapDiagram({mmap_name: mmap}, rasterise=False)
+        for mmap_name, mmap in model.memory_maps.items()
+    ]
+
+    with recorder.stage("region_images") as result:
+        for mmd in mmd_list:
+            mmd.rasterise = True
+            mmd._create_decorations()
+            for region_image in mmd.draw_list:
+                region_image._draw()
+    result["output_bytes"] = sum(image_bytes(r.img) for mmd in mmd_list for r in mmd.draw_list)
+
+    with recorder.stage("create_mmap") as result:
+        for mmd in mmd_list:
+            mmd._create_mmap(mmd.draw_list, mmd.draw_scale)
+    result["output_bytes"] = sum(image_bytes(mmd.img) for mmd in mmd_list)
+
+    # bypass __init__ so that the remaining stages can be measured separately
+    diagram = mm.diagram.Diagram.__new__(mm.diagram.Diagram)
+    diagram.mmd_list = mmd_list
+
+    with recorder.stage("draw_diagram_img") as result:
+        diagram_img = diagram.draw_diagram_img()
+    result["output_bytes"] = image_bytes(diagram_img)
+
+    with recorder.stage("table") as result:
+        table_img = diagram._create_table_image(mmd_list)
+    result["output_bytes"] = image_bytes(table_img)
+
+    with recorder.stage("png_encode") as result:
+        encoded = 0
+        for img in (diagram_img, table_img):
+            buffer = io.BytesIO()
+            img.save(buffer, format="PNG")
+            encoded += buffer.tell()
+    result["output_bytes"] = encoded
+
+
+def run_scenario(scenario: Scenario, repeat: int = 1) -> typing.Dict[str, typing.Dict]:
+    """Measure each stage of the scenario. The wall time is the best of 'repeat' runs.
+    Memory is measured in a separate run because tracemalloc slows everything down."""
+
+    input_dict = generate_diagram(scenario)
+
+    timings: typing.List[typing.Dict[str, typing.Dict]] = []
+    for _ in range(repeat):
+        recorder = Recorder(trace_memory=False)
+        run_pipeline(input_dict, recorder)
+        timings.append(recorder.results)
+
+    recorder = Recorder(trace_memory=True)
+    tracemalloc.start()
+    try:
+        run_pipeline(input_dict, recorder)
+    finally:
+        tracemalloc.stop()
+
+    results = {}
+    for stage in stages:
+        results[stage] = {
+            "wall_time_s": min(t[stage]["wall_time_s"] for t in timings),
+            "peak_traced_bytes": recorder.results[stage]["peak_traced_bytes"],
+            "peak_rss_bytes": recorder.results[stage]["peak_rss_bytes"],
+            "output_bytes": timings[0][stage]["output_bytes"],
+        }
+    return results
+
+
+def run_suite(suite: typing.List[Scenario], repeat: int = 1) -> typing.Dict:
+    """Measure every scenario in the suite"""
+
+    results = {
+        "python": sys.version,
+        "platform": platform.platform(),
+        "scenarios": {},
+    }
+    for scenario in suite:
+        print(f"Running {scenario.name}", file=sys.stderr)
+        results["scenarios"][scenario.name] = {
+            "parameters": dataclasses.asdict(scenario),
+            "stages": run_scenario(scenario, repeat),
+        }
+    return results
+
+
+def save_results(results: typing.Dict, path: pathlib.Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w") as fp:
+        json.dump(results, fp, indent=2)
@@ -0,0 +1,65 @@
+import random
+import time
+import typing
+
+import mm.image
+
+table_sizes = [100, 1000, 10000]
+"""Number of table rows measured by default"""
+
+header = ["Region (Parent)", "Origin", "Size", "Free Space", "Collisions", "links", "Drawing Scale"]
+"""Same columns as the summary table in mm.diagram"""
+
+
+def generate_rows(rows: int, seed: int = 0) -> typing.List[typing.List[str]]:
+    """Rows formatted like mm.image.MemoryRegionImage.get_data_as_list(). Roughly 1 in 5 regions has collisions."""
+
+    rng = random.Random(seed)
+    table = []
+    for idx in range(rows):
+        origin = rng.randrange(0, 0x100000, 0x10)
+        size = rng.randrange(0x100, 0x1000, 0x10)
+        freespace = rng.randrange(-0x100, 0x1000, 0x10)
+        if rng.random() < 0.2:
+            collisions = "\n".join(f"-r{rng.randrange(rows)}@{hex(origin + n * 0x10)}" for n in range(rng.randint(1, 3)))
+        else:
+            collisions = "+None"
+        table.append([
+            f"r{idx} (map{idx % 4})",
+            f"{hex(origin)} ({origin})",
+            f"{hex(size)} ({size})",
+            f"{hex(freespace)} ({freespace})",
+            collisions,
+            "[]",
+            f"{rng.choice((1, 2, 4, 8))}:1",
+        ])
+    return table
+
+
+def run_table_sizes(sizes: typing.List[int] = table_sizes, repeat: int = 3) -> typing.Dict[int, float]:
+    """Best wall time (seconds) of mm.image.Table.get_table_img for each number of rows"""
+
+    mm.image.import_pillow()
+    font = mm.image.PIL.ImageFont.load_default(15)
+    results = {}
+    for rows in sizes:
+        table = generate_rows(rows)
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            mm.image.Table().get_table_img(
+                # get_table_img strips the '+'/'-' prefixes in place
+                table=[list(row) for row in table],
+                header=header,
+                font=font,
+                stock=True,
+            )
+            timings.append(time.perf_counter() - start)
+        results[rows] = min(timings)
+    return results
+
+
+def print_table_sizes(results: typing.Dict[int, float]) -> None:
+    print(f"{'rows':>8} {'time (s)':>10} {'per row (us)':>13}")
+    for rows, seconds in results.items():
+        print(f"{rows:>8} {seconds:>10.4f} {seconds / rows * 1e6:>13.1f}")
@@ -0,0 +1,64 @@
+import dataclasses
+import json
+import os
+import subprocess
+import sys
+import typing
+
+import mm.typecheck
+
+from benchmarks.generate import Scenario
+from benchmarks.run import stages
+
+
+def measure(scenario: Scenario, production: bool, repeat: int = 3) -> typing.Dict[str, float]:
+    """Best wall time of each stage of the scenario. 
+    A fresh interpreter is used because production mode is chosen when mm is imported."""
+
+    env = dict(os.environ)
+    env.pop(mm.typecheck.production_env_var, None)
+    if production:
+        env[mm.typecheck.production_env_var] = "1"
+
+    code = (
+        "import json, sys\n"
+        "import benchmarks.generate, benchmarks.run\n"
+        "scenario = benchmarks.generate.Scenario(**json.loads(sys.argv[1]))\n"
+        "input_dict = benchmarks.generate.generate_diagram(scenario)\n"
+        "timings = []\n"
+        "for _ in range(int(sys.argv[2])):\n"
+        "    recorder = benchmarks.run.Recorder(trace_memory=False)\n"
+        "    benchmarks.run.run_pipeline(input_dict, recorder)\n"
+        "    timings.append({k: v['wall_time_s'] for k, v in recorder.results.items()})\n"
+        "print(json.dumps({k: min(t[k] for t in timings) for k in timings[0]}))\n"
+    )
+    res = subprocess.run(
+        [sys.executable, "-c", code, json.dumps(dataclasses.asdict(scenario)), str(repeat)],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    return json.loads(res.stdout.splitlines()[-1])
+
+
+def compare(scenario: Scenario, repeat: int = 3) -> typing.Dict[str, typing.Dict[str, float]]:
+    """Wall time of each stage with and without the typeguard run-time type checks"""
+
+    checked = measure(scenario, production=False, repeat=repeat)
+    production = measure(scenario, production=True, repeat=repeat)
+    return {
+        stage: {
+            "checked_s": checked[stage],
+            "production_s": production[stage],
+            "speedup": checked[stage] / production[stage] if production[stage] else None,
+        }
+        for stage in stages
+    }
+
+
+def print_comparison(results: typing.Dict[str, typing.Dict[str, float]]) -> None:
+    print(f"{'stage':<20} {'checked (s)':>12} {'production (s)':>15} {'speedup':>8}")
+    for stage, result in results.items():
+        speedup = f"{result['speedup']:.2f}x" if result["speedup"] else "-"
+        print(f"{stage:<20} {result['checked_s']:>12.4f} {result['production_s']:>15.4f} {speedup:>8}")
@@ -0,0 +1,110 @@
+import bisect
+import math
+from typing import List, NamedTuple, Tuple
+
+import mm.typecheck
+
+# the draw scales cached by mm.cache depend on these: increment mm.metamodel.model_version when they change
+void_padding = 10
+"""Space in pixels either side of a void region"""
+
+
+def void_height(text_size: int) -> int:
+    """Height in pixels of a void region image, sized to its text"""
+    return text_size + 10
+
+
+def fold_height(text_size: int) -> int:
+    """Height in pixels of a fold: a void region and the padding either side"""
+    return void_padding + void_height(text_size) + void_padding
+
+
+title_gap = 10
+"""Space in pixels between the memory maps and their titles, including the diagram border"""
+
+
+def title_height(text_size: int) -> int:
+    """Height in pixels of a memory map title image, sized to its text"""
+    return text_size * 5 // 4 + 10
+
+
+def regions_height(height: int, text_size: int) -> int:
+    """Height in pixels left for the regions of a memory map, below its title"""
+    return height - title_height(text_size) - title_gap
+
+
+def fit_draw_scale(span: int, folds: List[Tuple[int, int]], height: int, fold_pixels: int) -> int:
+    """The smallest draw scale at which span addresses fit in height pixels, when each [start, end) fold 
+    is drawn as a void region of fold_pixels instead of to scale. If the void regions take more than 
+    three quarters of the height, a quarter is left for the addresses that are drawn to scale."""
+    unfolded = span - sum(end - start for start, end in folds)
+    available_height = max(height // 4, height - len(folds) * fold_pixels)
+    return max(1, math.ceil(unfolded / available_height))
+
+
+def laid_out_height(span: int, folds: List[Tuple[int, int]], draw_scale: int, fold_pixels: int) -> int:
+    """The most pixels that span addresses can take at the draw scale, with each fold drawn as a void region"""
+    unfolded = span - sum(end - start for start, end in folds)
+    return math.ceil(unfolded / draw_scale) + len(folds) * fold_pixels
+
+
+class Fold(NamedTuple):
+    """An address span that is drawn as a fixed height void region instead of to scale"""
+    start: int
+    """First folded address"""
+    end: int
+    """First address after the fold"""
+    pixel: int
+    """Position of the start address. The void region is drawn in the pixel span that follows it."""
+
+
+@mm.typecheck.typechecked
+class AddressAxis:
+    """Maps the addresses of a memory map to pixel positions along the (unflipped) y axis of the map image.
+    The axis is piecewise linear: the breakpoints are sorted by address, the address spans between them are
+    drawn to scale, except the folded spans which are compressed into the height of a void region.
+    Positions are found by bisecting the breakpoints, so no image has to be drawn to query them."""
+
+    def __init__(self, origin: int, draw_scale: int):
+
+        self.draw_scale = draw_scale
+        """Bytes per pixel of the spans that are drawn to scale"""
+
+        self.addresses: List[int] = [origin]
+        """Breakpoint addresses, ascending. The first is the origin of the map."""
+
+        self.pixels: List[int] = [0]
+        """Pixel position of each breakpoint address"""
+
+        self.folds: List[Fold] = []
+        """The folded spans, ascending"""
+
+        self._folded: List[bool] = [False]
+        """The span that starts at each breakpoint is folded"""
+
+    def pixel(self, address: int) -> int:
+        """The pixel position of the address. Addresses below the origin are extrapolated to scale."""
+        idx = max(0, bisect.bisect_right(self.addresses, address) - 1)
+        offset = address - self.addresses[idx]
+        if self._folded[idx]:
+            # the folded span is spread evenly over the void region
+            span_pixels = self.pixels[idx + 1] - self.pixels[idx]
+            return self.pixels[idx] + offset * span_pixels // (self.addresses[idx + 1] - self.addresses[idx])
+        return self.pixels[idx] + offset // self.draw_scale
+
+    def fold(self, start: int, end: int, height: int) -> Fold:
+        """Fold the span [start, end) into height pixels. Folds must be added in ascending address order."""
+        start = max(start, self.addresses[-1])
+        end = max(start, end)
+        pixel = self.pixel(start)
+        if start > self.addresses[-1]:
+            self.addresses.append(start)
+            self.pixels.append(pixel)
+            self._folded.append(False)
+        self._folded[-1] = end > start
+        self.addresses.append(end)
+        self.pixels.append(pixel + height)
+        self._folded.append(False)
+        fold = Fold(start, end, pixel)
+        self.folds.append(fold)
+        return fold
@@ -0,0 +1,127 @@
+import functools
+import hashlib
+import json
+import logging
+import marshal
+import os
+import pathlib
+import struct
+import sys
+import zlib
+from typing import Any, Dict, Iterable
+
+import pydantic
+
+import mm.metamodel
+
+logger = logging.getLogger(__name__)
+
+magic = b"MMDC"
+"""Identifies a model cache file"""
+
+format_version = 1
+"""Increment when the layout of the cache file changes"""
+
+_header = struct.Struct(">4sHBB32s32s")
+"""magic, format version, python major/minor version (the marshal format can change between versions),
+model fingerprint, input hash"""
+
+
+@functools.lru_cache(maxsize=1)
+def _schema_hash() -> bytes:
+    return hashlib.sha256(json.dumps(mm.metamodel.Diagram.model_json_schema(), sort_keys=True).encode()).digest()
+
+
+def model_fingerprint() -> bytes:
+    """Hash of the metamodel schema and the metamodel version.
+    Any change to the fields, or to the analysis that computes the freespace, collisions and draw scale 
+    (see mm.metamodel.model_version), invalidates the cached models."""
+    digest = hashlib.sha256(_schema_hash())
+    digest.update(struct.pack(">I", mm.metamodel.model_version))
+    return digest.digest()
+
+
+def input_hash(inputs: Iterable[bytes]) -> bytes:
+    """The cache key for the input files, e.g. the JSON input file"""
+    digest = hashlib.sha256()
+    for data in inputs:
+        # length prefix so that the boundaries between the inputs are part of the hash
+        digest.update(struct.pack(">Q", len(data)))
+        digest.update(data)
+    return digest.digest()
+
+
+def cache_path(cache_dir: pathlib.Path, key: bytes) -> pathlib.Path:
+    return cache_dir / f"{key.hex()}.mmc"
+
+
+def _to_builtins(value: Any) -> Any:
+    """Convert the models to dicts of their field values, including the excluded (internal use) fields"""
+    if isinstance(value, pydantic.BaseModel):
+        return {name: _to_builtins(field) for name, field in value.__dict__.items()}
+    if isinstance(value, dict):
+        return {name: _to_builtins(field) for name, field in value.items()}
+    if isinstance(value, list):
+        return [_to_builtins(item) for item in value]
+    if isinstance(value, tuple):
+        return tuple(_to_builtins(item) for item in value)
+    return value
+
+
+def _construct(data: Dict[str, Any]) -> mm.metamodel.Diagram:
+    """Rebuild the validated model without running the validation"""
+    memory_maps = {}
+    for mmap_name, mmap in data["memory_maps"].items():
+        memory_regions = {
+            region_name: mm.metamodel.MemoryRegion.model_construct(**region)
+            for region_name, region in mmap["memory_regions"].items()
+        }
+        memory_maps[mmap_name] = mm.metamodel.MemoryMap.model_construct(**{**mmap, "memory_regions": memory_regions})
+    return mm.metamodel.Diagram.model_construct(**{**data, "memory_maps": memory_maps})
+
+
+def dumps(model: mm.metamodel.Diagram, key: bytes) -> bytes:
+    """Serialise the validated model"""
+    header = _header.pack(magic, format_version, sys.version_info.major, sys.version_info.minor, model_fingerprint(), key)
+    return header + zlib.compress(marshal.dumps(_to_builtins(model)))
+
+
+def loads(data: bytes, key: bytes) -> mm.metamodel.Diagram | None:
+    """Deserialise the model. Returns None if the data is not a valid cache entry for the key,
+    or was created by a different version of the metamodel."""
+    if len(data) < _header.size:
+        return None
+    file_magic, version, major, minor, fingerprint, file_key = _header.unpack_from(data)
+    if (file_magic != magic
+            or version != format_version
+            or (major, minor) != sys.version_info[:2]
+            or fingerprint != model_fingerprint()
+            or file_key != key):
+        return None
+    try:
+        return _construct(marshal.loads(zlib.decompress(data[_header.size:])))
+    except (ValueError, EOFError, TypeError, KeyError, AttributeError, zlib.error) as e:
+        logger.debug(f"Invalid model cache entry: {e}")
+        return None
+
+
+def load(cache_dir: pathlib.Path, key: bytes) -> mm.metamodel.Diagram | None:
+    """The cached model for the key, if any"""
+    path = cache_path(cache_dir, key)
+    try:
+        data = path.read_bytes()
+    except OSError:
+        return None
+    model = loads(data, key)
+    if model is None:
+        logger.info(f"Ignoring stale model cache: {path}")
+    return model
+
+
+def save(cache_dir: pathlib.Path, key: bytes, model: mm.metamodel.Diagram) -> None:
+    """Cache the validated model. The file is replaced atomically so that concurrent runs never read a partial file."""
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    path = cache_path(cache_dir, key)
+    tmp_path = path.with_suffix(f".tmp{os.getpid()}")
+    tmp_path.write_bytes(dumps(model, key))
+    tmp_path.replace(path)
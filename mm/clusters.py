@@ -0,0 +1,115 @@
+import heapq
+from typing import Dict, List, NamedTuple, Tuple
+
+import mm.metamodel
+import mm.window
+
+
+class Cluster(NamedTuple):
+    """A connected group of colliding regions"""
+    regions: Tuple[str, ...]
+    """Region names, by ascending origin"""
+    start: int
+    """Lowest origin of the regions"""
+    end: int
+    """Highest end address of the regions"""
+    depth: int
+    """The largest number of regions that overlap at any address"""
+
+
+def find_clusters(memory_map: mm.metamodel.MemoryMap) -> List[Cluster]:
+    """Group the regions that collide with each other, directly or through other regions, using the collisions data.
+    A region that only collides with the start or end of the map is a cluster of its own.
+    The clusters are sorted by start address."""
+
+    parents: Dict[str, str] = {}
+
+    def find(name: str) -> str:
+        root = name
+        while parents[root] != root:
+            root = parents[root]
+        # path compression
+        while parents[name] != root:
+            parents[name], name = root, parents[name]
+        return root
+
+    for region_name, region in memory_map.memory_regions.items():
+        if region.collisions:
+            parents.setdefault(region_name, region_name)
+            for other_name in region.collisions:
+                # 'start' and 'end' are the map boundaries, not regions
+                if other_name in memory_map.memory_regions:
+                    parents.setdefault(other_name, other_name)
+                    parents[find(other_name)] = find(region_name)
+
+    groups: Dict[str, List[str]] = {}
+    for region_name in parents:
+        groups.setdefault(find(region_name), []).append(region_name)
+
+    clusters = []
+    for names in groups.values():
+        regions = sorted(((name, memory_map.memory_regions[name]) for name in names), key=lambda item: item[1].origin)
+        clusters.append(Cluster(
+            regions=tuple(name for name, _ in regions),
+            start=regions[0][1].origin,
+            end=max(region.origin + region.size for _, region in regions),
+            depth=overlap_depth([(region.origin, region.origin + region.size) for _, region in regions])))
+    clusters.sort(key=lambda cluster: cluster.start)
+    return clusters
+
+
+def overlap_depth(intervals: List[Tuple[int, int]]) -> int:
+    """The largest number of [start, end) intervals that contain the same address"""
+    # ends sort before starts at the same address because the intervals are half open
+    events = sorted([(start, 1) for start, end in intervals if end > start] + [(end, -1) for start, end in intervals if end > start])
+    depth = max_depth = 0
+    for _, change in events:
+        depth += change
+        max_depth = max(max_depth, depth)
+    return max_depth
+
+
+def assign_lanes(intervals: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Give each [start, end) interval the lowest lane that is free at its start, so that overlapping intervals 
+    are never in the same lane. This is an optimal colouring of the interval graph: each group of overlapping intervals 
+    uses as many lanes as the most intervals that overlap at one address.
+    Return (lane, lane count of its group) for each interval, in the same order. Empty intervals take a lane at their start."""
+    lanes: List[Tuple[int, int]] = [(0, 1)] * len(intervals)
+    order = sorted(range(len(intervals)), key=lambda idx: intervals[idx][0])
+    # (end, lane) of the intervals that are still open, and the lanes that have been freed
+    active: List[Tuple[int, int]] = []
+    free: List[int] = []
+    group: List[Tuple[int, int]] = []
+
+    def close_group():
+        group_lanes = max(lane for _, lane in group) + 1
+        for idx, lane in group:
+            lanes[idx] = (lane, group_lanes)
+        group.clear()
+        free.clear()
+
+    for idx in order:
+        start, end = intervals[idx]
+        while active and active[0][0] <= start:
+            heapq.heappush(free, heapq.heappop(active)[1])
+        # nothing is open so nothing later can overlap the group
+        if not active and group:
+            close_group()
+        lane = heapq.heappop(free) if free else len(active)
+        heapq.heappush(active, (max(end, start + 1), lane))
+        group.append((idx, lane))
+    if group:
+        close_group()
+    return lanes
+
+
+def context_spans(clusters: List[Cluster], context: int) -> List[mm.window.Window]:
+    """The address ranges to draw: each cluster with context bytes either side. Overlapping ranges are merged."""
+    spans: List[mm.window.Window] = []
+    for cluster in clusters:
+        start, end = max(0, cluster.start - context), cluster.end + context
+        if spans and start <= spans[-1].end:
+            spans[-1] = mm.window.Window(spans[-1].start, max(spans[-1].end, end))
+        else:
+            spans.append(mm.window.Window(start, end))
+    return spans
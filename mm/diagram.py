@@ -1,23 +1,27 @@
+from __future__ import annotations
+
 import argparse
 import itertools
-import PIL.Image
-import PIL.ImageDraw
-import PIL.ImageColor
-import PIL.ImageFont
-import PIL.ImageChops
-import PIL.ImageOps
+import math
 import json
-import typeguard
 import sys
 import pathlib
+import tracemalloc
 import logging
 import collections
 
 
-from typing import List, Dict, Literal, Tuple, DefaultDict, NamedTuple
+from typing import Callable, List, Dict, Literal, Set, Tuple, DefaultDict, NamedTuple
 
+# typeguard evaluates the type annotations of MemoryMapDiagram on each call, so their modules are imported here. 
+# Pillow's submodules are loaded by mm.image.import_pillow, and the importers and exporters where they are used.
+import PIL
+import mm.axis
 import mm.image
 import mm.metamodel
+import mm.profile
+import mm.typecheck
+import mm.window
 
 
 class APageSize(NamedTuple):
@@ -36,13 +40,7 @@ A8 = APageSize("A8", 614, 874)
 A9 = APageSize("A9", 437, 614)
 A10 = APageSize("A10", 307, 437)
 
-root = logging.getLogger()
-root.setLevel(logging.INFO)
-
-handler = logging.StreamHandler(sys.stdout)
-formatter = logging.Formatter("%(levelname)s - %(message)s")
-handler.setFormatter(formatter)
-root.addHandler(handler)
+logger = logging.getLogger(__name__)
 
 
 class LockableDictOfLists(collections.defaultdict):
@@ -56,14 +54,31 @@ class LockableDictOfLists(collections.defaultdict):
     
     def __setitem__(self, __key: any, __value: any) -> None:
         if self.__lock:
-            logging.warning("You were prevented from trying to update a locked dict!")
+            logger.warning("You were prevented from trying to update a locked dict!")
             return
         return super().__setitem__(__key, __value)
 
-@typeguard.typechecked
+@mm.typecheck.typechecked
 class MemoryMapDiagram:
 
-    def __init__(self, memory_map_metadata: Dict[str, mm.metamodel.MemoryMap]):
+    def __init__(
+            self, 
+            memory_map_metadata: Dict[str, mm.metamodel.MemoryMap], 
+            rasterise: bool = True, 
+            window: mm.window.Window | None = None,
+            tile: bool = False,
+            spans: List[mm.window.Window] | None = None,
+            link_targets: Set[Tuple[str, str]] | None = None):
+        """
+        - rasterise: draw the region images and memory map image. Disable if only the region data is needed.
+        - window: only draw the regions that overlap this address range, at a draw scale that fits the range to the map height.
+        - tile: draw the window as a tile of a tile pyramid. Every address is drawn to scale, i.e. there are no void regions,
+        and the image is not trimmed, so that adjacent tiles line up.
+        - spans: only draw the regions that overlap these ascending, non-overlapping address ranges, e.g. the collision clusters.
+        The space between the ranges is always folded into a void region.
+        - link_targets: the (map, region) pairs that are the target of a link, see Diagram._link_targets. 
+        Pass them in when drawing more than one map or tile of the same model, so that they are only found once.
+        """
 
         assert len(memory_map_metadata) == 1, \
             "MemoryMapDiagram should omly be initialised with a single mm.metamodel.MemoryMap."
@@ -77,42 +92,111 @@ class MemoryMapDiagram:
         """Map sub-diagram width in pixels. Pre-calculated by pydantic model"""
 
         self.height = next(iter(memory_map_metadata.values())).height
-        """Map sub-diagram height in pixels. Pre-calculated by pydantic model"""
+        """Map sub-diagram height in pixels, without the title. Pre-calculated by pydantic model"""
 
         self.draw_scale = next(iter(memory_map_metadata.values())).draw_scale
-        """Map sub-diagram drawing scale denominator. Pre-calculated by pydantic model"""
+        """Map sub-diagram drawing scale denominator. Pre-calculated by pydantic model, with the title height reserved"""
 
         self.max_address = next(iter(memory_map_metadata.values())).max_address
         """User-defined (via JSON) or calculated from region data if undefined or smaller than region data"""
         
+        self.origin = next(iter(memory_map_metadata.values())).origin or 0
+        """Lowest address of the map. The regions are drawn relative to this."""
+
         self.max_address_taken_from_diagram_height: bool = next(iter(memory_map_metadata.values())).max_address_taken_from_diagram_height
         """The max address value was calculated from region data"""
 
+        self.window = window
+        """The address range that is drawn, if not the whole memory map"""
+
+        self.tile = tile
+        """Draw the map as a tile, see __init__"""
+
+        self.link_targets = link_targets
+        """The (map, region) pairs that are the target of a link. Found from the model when needed, if not given."""
+
+        if not self.tile:
+            # the title is drawn above the map, within the diagram height
+            self.height = mm.axis.regions_height(self.height, Diagram.model.text_size)
+
+        self.spans: List[mm.window.Window] | None = spans or ([window] if window else None)
+        """The address ranges that are drawn, if not the whole memory map. Each region is clipped to its range."""
+
+        if self.spans:
+            self.origin = self.spans[0].start
+            self.max_address = self.spans[-1].end
+
         self.addr_col_width_percent = (self.width // 100) * Diagram.model.legend_width
         """width of the area used for text annotations/legend"""
 
+        self.region_width = self.width - self.addr_col_width_percent - (self.width//5)
+        """Width in pixels of the region blocks. The overlapping regions share it, see _assign_lanes"""
+
+        self.lane_min_width = 16
+        """The narrowest lane in pixels. Overlapping regions that don't fit are drawn over the other lanes."""
+
+        self.rasterise = rasterise
+        """Draw the region images and memory map image. Disable if only the region data is needed."""
+
+        self.title: mm.image.MapTitleImage | None = None
+        """Title graphic for this memory map"""
+
+        self.voidregion: mm.image.VoidRegionImage | None = None
+        """The reusable object used to represent the void regions in the memory map"""
+
+        self.void_height = mm.axis.void_height(Diagram.model.text_size)
+        """Height of the void region image in pixels"""
+
+        self.void_padding = mm.axis.void_padding
+        """Space in pixels either side of a void region"""
+
+        if self.window:
+            self.draw_scale = max(1, math.ceil((self.window.end - self.window.start) / self.height))
+        elif self.spans:
+            # leave room for the void regions between the ranges
+            void_span = self.void_padding + self.void_height + self.void_padding
+            available_height = max(self.height // 4, self.height - (len(self.spans) + 1) * void_span)
+            self.draw_scale = max(1, math.ceil(sum(span.end - span.start for span in self.spans) / available_height))
+
+        self.axis: mm.axis.AddressAxis | None = None
+        """Address to pixel position mapping, with the skipped spans folded into void regions"""
+
+        self.folds: Dict[int, mm.axis.Fold] = {}
+        """The folded span after each region of the draw list, by draw list index. A void region is drawn in each fold."""
+
+        self.draw_list: List[mm.image.MemoryRegionImage | mm.image.AggregateRegionImage] = []
+        """The region images to draw, by ascending origin. Runs of sub-pixel regions are replaced by an aggregate image."""
+
+        with mm.profile.span("_create_image_list", map=self.name):
+            self.image_list = self._create_image_list(memory_map_metadata)
+        """image objects representing each region in the map. In no particular order."""
+
+    def _create_decorations(self) -> None:
+        """Create the title and void region images for this memory map"""
+
+        title = self.name
+        if self.window:
+            title += f" [0x{self.window.start:X}, 0x{self.window.end:X})"
+        elif self.spans:
+            title += " collisions"
         self.title = mm.image.MapTitleImage(
-            self.name + " - scale " + str(self.draw_scale) + ":1", 
+            title + " - scale " + str(self.draw_scale) + ":1", 
             img_width=self.width,
             font_size=Diagram.model.text_size,
             fill_colour=Diagram.model.title_fill_colour,
             line_colour=Diagram.model.title_line_colour)
-        """Title graphic for this memory map"""
         
         self.voidregion = mm.image.VoidRegionImage(
             self.name,
-            w = (self.width - self.addr_col_width_percent - (self.width//5)), 
-            h = (Diagram.model.text_size + 10),
+            w = self.region_width, 
+            h = self.void_height,
             font_size = Diagram.model.text_size,
             fill_colour = Diagram.model.void_fill_colour,
             line_colour = Diagram.model.void_line_colour)
-        """The reusable object used to represent the void regions in the memory map"""       
-
-        self.image_list = self._create_image_list(memory_map_metadata)
-        """image objects representing each region in the map. In no particular order."""
 
     def trim_whitespace(self, img: PIL.Image.Image, max: mm.image.Bbox | None = None, min: mm.image.Bbox | None = None) -> PIL.Image.Image:
         """Detect and remove whitespace from img"""
+        mm.image.import_pillow()
 
         # getbbox only returns diff with black borders, not white
         img_inverted = PIL.ImageOps.invert(img.convert("RGB"))
@@ -143,14 +227,31 @@ class MemoryMapDiagram:
         image_list: List[mm.image.MemoryRegionImage] = []
         
         mmap_name = next(iter(memory_map_metadata))
-        for region_name, region in memory_map_metadata.get(mmap_name).memory_regions.items():
+        memory_regions = memory_map_metadata.get(mmap_name).memory_regions
+        region_spans: Dict[str, mm.window.Window | None] = {}
+        if not self.spans:
+            region_spans = dict.fromkeys(memory_regions)
+        else:
+            index = mm.window.region_index(memory_regions)
+            for span in self.spans:
+                for region_name in index.query(span):
+                    # a region that overlaps more than one range is drawn in the first
+                    region_spans.setdefault(region_name, span)
+            (logger.debug if self.tile else logger.info)(
+                f"{self.name}: {len(region_spans)} of {len(memory_regions)} regions in " + 
+                ", ".join(f"[0x{span.start:X}, 0x{span.end:X})" for span in self.spans))
+
+        for region_name, span in region_spans.items():
+            region = memory_regions[region_name]
             new_mr_image = mm.image.MemoryRegionImage(
                 name=region_name,
                 mmap_parent=self.name,
                 metadata=region,
-                img_width=(self.width - self.addr_col_width_percent - (self.width//5)),
+                img_width=self.region_width,
                 font_size=region.text_size,
-                draw_scale=self.draw_scale
+                draw_scale=self.draw_scale,
+                draw=False,
+                window=span
             )
             image_list.append(new_mr_image)
             
@@ -177,15 +278,150 @@ class MemoryMapDiagram:
                 if image.collisions:
                     image.draw_indent = region_indent
                     region_indent += 5
+
+        if Diagram.model.indent_scheme == "lanes":
+            with mm.profile.span("_assign_lanes", map=self.name):
+                self._assign_lanes(image_list)
+
+        # lay out the map before anything is drawn, so that it is drawn once at its final size.
+        # The whole map already has the model's scale, only the address ranges of a window or the collisions view are fitted here.
+        if self.spans and not self.tile:
+            self.draw_scale = self._fit_draw_scale(image_list)
+            for image in image_list:
+                image.draw_scale = self.draw_scale
         
-        self._create_mmap(image_list, self.draw_scale)   
+        with mm.profile.span("_aggregate", map=self.name):
+            self.draw_list = self._aggregate(image_list)
+        with mm.profile.span("_create_axis", map=self.name):
+            self.axis, self.folds = self._create_axis(self.draw_list)
+
+        if self.rasterise:
+            # the title shows the fitted draw scale
+            self._create_decorations()
+            with mm.profile.span("_create_mmap", map=self.name):
+                self._create_mmap(self.draw_list, self.draw_scale)   
 
         return image_list
+
+    def _assign_lanes(self, image_list: List[mm.image.MemoryRegionImage]) -> None:
+        """Draw each group of overlapping regions side by side. The group gets the fewest lanes that keep its regions apart, 
+        and the lanes share the region width. If the lanes would be narrower than lane_min_width, 
+        the extra lanes wrap around and are drawn over the first lanes."""
+        from mm.clusters import assign_lanes
+        lanes = assign_lanes([(image.origin_as_int, image.origin_as_int + image.size_as_int) for image in image_list])
+        max_lanes = max(1, self.region_width // self.lane_min_width)
+        for image, (lane, group_lanes) in zip(image_list, lanes):
+            if group_lanes > 1:
+                group_lanes = min(group_lanes, max_lanes)
+                image.lane = lane % group_lanes
+                image.img_width = self.region_width // group_lanes
+
+    def _fit_draw_scale(self, image_list: List[mm.image.MemoryRegionImage]) -> int:
+        """The draw scale at which the regions and the void regions fit the map height. 
+        The folds of the axis only depend on the region addresses, so they are found at the current scale. 
+        The scale is only ever increased.
+        - image_list: the region images, by ascending origin"""
+        _, folds = self._create_axis(image_list)
+        end = self.max_address
+        for image in image_list:
+            region_end = image.origin_as_int + image.size_as_int
+            end = max(end, min(region_end, image.window.end) if image.window else region_end)
+        void_span = self.void_padding + self.void_height + self.void_padding
+        return max(self.draw_scale, mm.axis.fit_draw_scale(
+            end - self.origin, [(fold.start, fold.end) for fold in folds.values()], self.height, void_span))
+
+    def _aggregate(
+            self, 
+            image_list: List[mm.image.MemoryRegionImage]
+            ) -> List[mm.image.MemoryRegionImage | mm.image.AggregateRegionImage]:
+        """Replace each run of adjacent regions that are smaller than the 'lod_threshold' height with an aggregate image, 
+        so that the drawing cost depends on the diagram height instead of the number of regions.
+        Regions with collisions, links or that are the target of a link are never aggregated. 
+        - image_list: the region images, by ascending origin"""
+
+        if not Diagram.model.lod_threshold:
+            return list(image_list)
+
+        if self.link_targets is None:
+            self.link_targets = Diagram._link_targets(Diagram.model)
+        link_targets = self.link_targets
+
+        def is_candidate(image: mm.image.MemoryRegionImage) -> bool:
+            return (image.size_as_int // self.draw_scale < Diagram.model.lod_threshold
+                    and not image.collisions
+                    and not image.metadata.links
+                    and (self.name, image.name) not in link_targets)
+
+        draw_list: List[mm.image.MemoryRegionImage | mm.image.AggregateRegionImage] = []
+        run: List[mm.image.MemoryRegionImage] = []
+
+        def end_run() -> None:
+            if len(run) > 1:
+                draw_list.append(mm.image.AggregateRegionImage(
+                    mmap_parent=self.name,
+                    regions=list(run),
+                    img_width=run[0].img_width,
+                    font_size=run[0].font_size,
+                    draw_scale=self.draw_scale))
+            else:
+                draw_list.extend(run)
+            run.clear()
+
+        for image in image_list:
+            # a void region is drawn after a gap larger than the threshold or between the drawn address ranges, 
+            # so the run can't continue across it
+            if (not is_candidate(image) 
+                    or (run and run[-1].freespace_as_int > Diagram.model.threshold) 
+                    or (run and run[-1].window != image.window)):
+                end_run()
+            if is_candidate(image):
+                run.append(image)
+            else:
+                draw_list.append(image)
+        end_run()
+
+        if len(draw_list) < len(image_list):
+            logger.info(f"{self.name}: {len(image_list)} regions drawn as {len(draw_list)} blocks")
+        return draw_list
+
+    def _create_axis(
+            self, 
+            draw_list: List[mm.image.MemoryRegionImage | mm.image.AggregateRegionImage]
+            ) -> Tuple[mm.axis.AddressAxis, Dict[int, mm.axis.Fold]]:
+        """Create the address axis of the map. Each space larger than the threshold, after a region, 
+        and each space between the drawn address ranges is folded into a void region. 
+        - draw_list: the region images to draw, by ascending origin"""
+
+        axis = mm.axis.AddressAxis(self.origin, self.draw_scale)
+        folds: Dict[int, mm.axis.Fold] = {}
+        if self.tile:
+            return axis, folds
+        covered_end = self.origin
+        for idx, region in enumerate(draw_list):
+            region_end = region.origin_as_int + region.size_as_int
+            covered_end = max(covered_end, min(region_end, region.window.end) if region.window else region_end)
+            next_region = draw_list[idx + 1] if idx + 1 < len(draw_list) else None
+            span_break = next_region is not None and next_region.window != region.window
+            if region.freespace_as_int > Diagram.model.threshold or span_break:
+                next_origin = next_region.draw_origin if next_region else self.max_address
+                if region.window and not span_break:
+                    # the freespace was measured over the whole map, so only fold the part inside the range
+                    if covered_end >= region.window.end:
+                        continue
+                    next_origin = min(next_origin, region.window.end)
+                folds[idx] = axis.fold(covered_end, next_origin, self.void_padding + self.void_height + self.void_padding)
+        return axis, folds
+
+    def region_mid_pos(self, region: mm.image.MemoryRegionImage | mm.image.AggregateRegionImage) -> mm.image.Point:
+        """Position of the middle of the region block within the (unflipped) memory map image"""
+        return mm.image.Point(
+            region.draw_x + region.img_width // 2, 
+            self.axis.pixel(region.draw_origin) + region.draw_height // 2)
     
 
     def _add_label(
             self, 
-            dest: PIL.Image, 
+            dest: PIL.Image.Image, 
             xy: mm.image.Point, 
             text: str, 
             font_size: int,
@@ -206,18 +442,22 @@ class MemoryMapDiagram:
             return label.overlay(dest, xy)
         
 
-    def _create_mmap(self, only_memregion_list: List[mm.image.MemoryRegionImage], draw_scale: int) -> None:
+    def _create_mmap(
+            self, 
+            only_memregion_list: List[mm.image.MemoryRegionImage | mm.image.AggregateRegionImage], 
+            draw_scale: int) -> None:
         """Create a dict of region groups, interleaved with void regions. 
         Then draw the regions onto a larger memory map image. """
+        mm.image.import_pillow()
 
         mixed_region_dict_idx = 0
         self.mixed_region_dict: LockableDictOfLists = LockableDictOfLists()
 
-        for memregion in only_memregion_list:
+        for memregion_idx, memregion in enumerate(only_memregion_list):
             # start adding memregions to the current subgroup...
             self.mixed_region_dict[mixed_region_dict_idx].append(memregion)
-            # until we hit a empty space larger than the threshold setting
-            if memregion.freespace_as_int > Diagram.model.threshold:
+            # until we hit a empty space larger than the threshold setting, i.e. a fold in the axis
+            if memregion_idx in self.folds:
                 # add a single void region subgroup at a new index...
                 mixed_region_dict_idx = mixed_region_dict_idx + 1
                 self.mixed_region_dict[mixed_region_dict_idx].append(self.voidregion)
@@ -232,65 +472,66 @@ class MemoryMapDiagram:
             (self.width, self.height), 
             color=Diagram.model.bgcolour)
         
-        next_void_pos = 0
-        last_void_pos = 0 
-        void_padding = 10
+        # the void regions are drawn in the folds of the axis, in the same order
+        folds = iter(self.folds.values())
         for group_idx in range(0, len(self.mixed_region_dict)):
 
-            region: mm.image.MemoryRegionImage
+            region: mm.image.MemoryRegionImage | mm.image.AggregateRegionImage
             for region in self.mixed_region_dict[group_idx]:
                 
-                if isinstance(region, mm.image.MemoryRegionImage):
+                if isinstance(region, (mm.image.MemoryRegionImage, mm.image.AggregateRegionImage)):
+                    if region.img is None:
+                        region._draw()
+
                     # adjusted values for drawing ypos - labels should use the original values
-                    region_origin_scaled  = region.origin_as_int // draw_scale
+                    region_pos = self.axis.pixel(region.draw_origin)
 
-                    # add memory region after ypos of last voidregion - if any
                     map_img = region.overlay(
                         dest=map_img, 
-                        xy=mm.image.Point(0, last_void_pos if last_void_pos else region_origin_scaled), 
+                        xy=mm.image.Point(region.draw_x, region_pos), 
                         alpha=int(Diagram.model.region_alpha))
                     
-                    # add origin address text
+                    # add origin address text, after the last lane
                     map_img = self._add_label(
                         dest=map_img, 
-                        xy=mm.image.Point(region.img.width + 5, (last_void_pos if last_void_pos else region_origin_scaled) - 1 ) , 
-                        text=f"0x{region.origin_as_int:X}" + " (" + f"{region.origin_as_int:,}" + ")", 
-                        font_size=region.metadata.address_text_size)
-                    
-                    # ready the ypos for drawing a void region - if any - after this memregion
-                    next_void_pos = (last_void_pos if last_void_pos else region_origin_scaled) + (region.img.height) + void_padding
+                        xy=mm.image.Point(self.region_width + 5, region_pos - 1), 
+                        text=region.origin_label, 
+                        font_size=region.address_text_size)
 
                 if isinstance(region, mm.image.VoidRegionImage):
                     # add void region
-                    map_img.paste(region.img, (0, next_void_pos))
-                    # reset the ypos for the next memregion
-                    last_void_pos = next_void_pos + region.img.height + void_padding
+                    void_pos = next(folds).pixel + self.void_padding
+                    map_img.paste(region.img, (0, void_pos))
 
-        last_region = self.mixed_region_dict[len(self.mixed_region_dict) - 1][-1]
+        # e.g. a window without any regions. The tile addresses are in the tile pyramid manifest instead.
+        last_region = None
+        if self.mixed_region_dict and not self.tile:
+            last_region = self.mixed_region_dict[len(self.mixed_region_dict) - 1][-1]
         if isinstance(last_region, mm.image.VoidRegionImage):
             map_img = self._add_label(
                 dest=map_img, 
-                xy=mm.image.Point(last_region.img.width + 5, next_void_pos + last_region.img.height), 
+                xy=mm.image.Point(last_region.img.width + 5, void_pos + last_region.img.height), 
                 text=f"0x{self.max_address:X}" + " (" + f"{self.max_address:,}" + ")", 
                 font_size=Diagram.model.address_text_size,
                 y_origin="bottom")
             
-        if isinstance(last_region, mm.image.MemoryRegionImage):
+        if isinstance(last_region, (mm.image.MemoryRegionImage, mm.image.AggregateRegionImage)):
             map_img = self._add_label(
                 dest=map_img, 
-                xy=mm.image.Point(last_region.img.width + 5, next_void_pos - void_padding), 
+                xy=mm.image.Point(self.region_width + 5, self.axis.pixel(last_region.draw_origin) + last_region.img.height), 
                 text=f"0x{self.max_address:X}" + " (" + f"{self.max_address:,}" + ")", 
-                font_size=last_region.metadata.address_text_size,
+                font_size=last_region.address_text_size,
                 y_origin="bottom")
 
-        bbox = mm.image.Bbox((0,0, Diagram.model.width,Diagram.model.height))             
-        if Diagram.pargs.no_whitespace_trim:
-            bbox = None
-        map_img = self.trim_whitespace(
-            map_img, 
-            max=bbox,
-            min=bbox
-        )
+        if not self.tile:
+            bbox = mm.image.Bbox((0,0, Diagram.model.width, self.height))             
+            if Diagram.pargs.no_whitespace_trim:
+                bbox = None
+            map_img = self.trim_whitespace(
+                map_img, 
+                max=bbox,
+                min=bbox
+            )
 
         # flip back up the right way
         self.img = map_img.transpose(PIL.Image.FLIP_TOP_BOTTOM)           
@@ -300,43 +541,138 @@ class Diagram:
     
     pargs: argparse.Namespace = None
     """Command line arguments"""
+
+    title_gap = mm.axis.title_gap
+    """Space in pixels between the memory maps and their titles, including the border"""
+
     model: mm.metamodel.Diagram = None
     """Parsed metamodel from user input json file or
        command line 'region' argument"""
-
-    def __init__(self):
-        
+    profiler: mm.profile.Profiler = None
+    """Timing spans for the pipeline stages. Only set when profiling is enabled."""
+    results_writers: Dict[str, str] = {
+        "results-json": "write_json",
+        "results-csv": "write_csv",
+        "results-sqlite": "write_sqlite",
+    }
+    """The per-region results outputs and the names of their writers in mm.export, see _results_writer"""
+
+    def __init__(self, profile: bool = False, profile_memory: bool = False, production: bool = False):
+        """
+        - profile: record timing spans for the pipeline stages, same as the '--profile' command line option.
+        - profile_memory: also record the peak memory of each stage, same as the '--profile-memory' command line option. 
+        - production: turn off the typeguard run-time type checks. 
+          See also mm.typecheck.production_env_var, which avoids the typeguard instrumentation entirely.
+        """
 
         self.mmd_list: List[MemoryMapDiagram] = []
         """ instances of the memory map diagram"""
 
         Diagram._parse_args()
         Diagram._validate_pargs()
-        Diagram.model = Diagram._create_model()
-
-        logging.info(f"Selected diagram height: {str(Diagram.model.height)}")
-        logging.info(f"Selected diagram void threshold: {str(Diagram.model.threshold)}")
-
-        # Create the individual memory map diagrams (full and reduced)
-        for mmap_name, mmap in Diagram.model.memory_maps.items():
-            self.mmd_list.append(MemoryMapDiagram({mmap_name: mmap}))
-            pass
 
-        # composite the memory map diagrams into single diagram
-        self.draw_diagram_img()
-
-        self._create_table_image(self.mmd_list)
-        self._create_markdown(self.mmd_list)        
-
-    def draw_diagram_img(self) -> None:
+        profile_memory = profile_memory or Diagram.pargs.profile_memory
+        Diagram.profiler = None
+        if profile or profile_memory or Diagram.pargs.profile:
+            Diagram.profiler = mm.profile.Profiler(trace_memory=profile_memory)
+
+        # tracemalloc slows everything down so only run it when asked
+        start_tracemalloc = profile_memory and not tracemalloc.is_tracing()
+        if start_tracemalloc:
+            tracemalloc.start()
+
+        try:
+            with mm.profile.profiling(Diagram.profiler), mm.profile.span("_create_outputs"):
+                if production:
+                    import typeguard
+                    with typeguard.suppress_type_checks():
+                        self._create_outputs()
+                else:
+                    self._create_outputs()
+        finally:
+            if start_tracemalloc:
+                tracemalloc.stop()
+
+        if Diagram.profiler:
+            self._create_profile()
+
+    def _create_outputs(self) -> None:
+        """Create the model and then each of the requested output artefacts"""
+
+        with mm.profile.span("_create_model"):
+            Diagram.model = Diagram._create_model()
+
+        logger.info(f"Selected diagram height: {str(Diagram.model.height)}")
+        logger.info(f"Selected diagram void threshold: {str(Diagram.model.threshold)}")
+
+        # only rasterise the memory maps if the diagram image was requested
+        rasterise = "diagram" in Diagram.pargs.outputs
+
+        # Create the individual memory map diagrams (full and reduced). 
+        # The markdown and json outputs are written straight from the model so don't need them.
+        if "diagram" in Diagram.pargs.outputs or "table" in Diagram.pargs.outputs:
+            window, window_maps = Diagram._window()
+            clusters = Diagram._clusters()
+            link_targets = Diagram._link_targets(Diagram.model)
+            for mmap_name, mmap in Diagram.model.memory_maps.items():
+                if mmap_name not in window_maps:
+                    continue
+                spans = None
+                if clusters is not None:
+                    if not clusters[mmap_name]:
+                        logger.info(f"{mmap_name}: no collisions")
+                        continue
+                    spans = mm.clusters.context_spans(clusters[mmap_name], int(Diagram.pargs.collision_context, 16))
+                self.mmd_list.append(MemoryMapDiagram(
+                    {mmap_name: mmap}, rasterise=rasterise, window=window, spans=spans, link_targets=link_targets))
+            if not self.mmd_list:
+                logger.warning("No memory maps to draw, the diagram and table images are not created")
+
+        if "diagram" in Diagram.pargs.outputs and self.mmd_list:
+            # composite the memory map diagrams into single diagram
+            with mm.profile.span("draw_diagram_img"):
+                diagram_img = self.draw_diagram_img()
+            self._save_image(diagram_img, "_diagram.png")
+
+        if "table" in Diagram.pargs.outputs and self.mmd_list:
+            # render one page at a time so that only one table image is held in memory
+            table_list = self._sorted_region_images(self.mmd_list)
+            page_rows = Diagram.pargs.table_rows
+            for page_idx, suffix in enumerate(Diagram._table_suffixes(len(table_list))):
+                with mm.profile.span("_create_table_image", page=page_idx + 1):
+                    table_img = self._create_table_image(
+                        self.mmd_list, 
+                        table_list[page_idx * page_rows : (page_idx + 1) * page_rows])
+                self._save_image(table_img, suffix)
+
+        if "tiles" in Diagram.pargs.outputs:
+            with mm.profile.span("_create_tiles"):
+                self._create_tiles()
+
+        if "markdown" in Diagram.pargs.outputs:
+            with mm.profile.span("_create_markdown"):
+                self._create_markdown()
+
+        if "json" in Diagram.pargs.outputs:
+            with mm.profile.span("_create_json"):
+                self._create_json()
+
+        for output in Diagram.results_writers:
+            if output in Diagram.pargs.outputs:
+                with mm.profile.span("_create_results", output=output):
+                    self._create_results(output)
+
+    def draw_diagram_img(self) -> PIL.Image.Image:
         """add each memory map to the complete diagram image"""
+        mm.image.import_pillow()
         border_width = 4
         max_map_img_height = max(self.mmd_list, key=lambda mmd: mmd.img.height).img.height
         max_title_img_height = max(self.mmd_list, key=lambda mmd: mmd.title.img.height).title.img.height
         
+        # the maps leave room for the titles, so this is the requested height
         final_diagram_img = PIL.Image.new(
             "RGBA", 
-            (Diagram.model.width, max_map_img_height + max_title_img_height + 10), 
+            (Diagram.model.width, max_map_img_height + max_title_img_height + Diagram.title_gap), 
             color=Diagram.model.bgcolour)       
         
         # add region and labels first
@@ -354,75 +690,160 @@ class Diagram:
                 alpha=255)    
 
         # iterate each memory map -> memory region -> link
-        for source_mmd_idx, mmd in enumerate(self.mmd_list):    
-            for region_image in mmd.image_list:
-                source_region_mid_pos_x = region_image.abs_mid_pos.x
-                source_region_mid_pos_y = region_image.abs_mid_pos.y
-                for link in region_image.metadata.links:
-                    mmd_parent_name = link[0]
-                    region_child_name = link[1]
-                    # search for the memory map/memory region pair that matches this link
-                    for target_mmd_idx, mmd in enumerate(self.mmd_list):
-                        if mmd.name == mmd_parent_name:
-                            for target_region in mmd.image_list:
-                                if target_region.name == region_child_name:
-                                    padding = 5
-                                    # determine which side of the region block we are drawing to/from
-                                    if source_mmd_idx < target_mmd_idx:
-                                        source_justify = (region_image.img.width // 2) + padding
-                                    else:
-                                        source_justify = -(region_image.img.width // 2) - padding
-
-                                    if target_mmd_idx < source_mmd_idx:
-                                        target_justify = (target_region.img.width // 2) + padding
-                                    else:
-                                        target_justify = -(target_region.img.width // 2) - padding                       
-
-                                    # create the link image for the src/dst vector (calc length and angle)           
-                                    arrow = mm.image.ArrowBlock(
-                                        src = mm.image.Point(
-                                            (source_mmd_idx * mmd.width) + source_region_mid_pos_x + source_justify,
-                                            source_region_mid_pos_y
-                                        ),
-                                        dst = mm.image.Point(
-                                            (target_mmd_idx * mmd.width) + target_region.abs_mid_pos.x + target_justify, 
-                                            target_region.abs_mid_pos.y
-                                        ),
-                                        head_width = Diagram.model.link_head_width,
-                                        tail_len = Diagram.model.link_tail_len,
-                                        tail_width = Diagram.model.link_tail_width,
-                                        fill = Diagram.model.link_fill_colour,
-                                        line = Diagram.model.link_line_colour
-                                    )
-
-                                    # add it to the memory map diagram image
-                                    final_diagram_img = arrow.overlay(final_diagram_img, mm.image.Point(arrow.pos.x, arrow.pos.y), Diagram.model.link_alpha)
-     
+        with mm.profile.span("_draw_links"):
+            final_diagram_img = self._draw_links(final_diagram_img)
 
         # finalise diagram                                                 
         final_diagram_img = final_diagram_img.transpose(PIL.Image.FLIP_TOP_BOTTOM)
-        # make sure we don't go over the requested height
-        if final_diagram_img.height > Diagram.model.height:
-            final_diagram_img = final_diagram_img.resize((Diagram.model.width, Diagram.model.height), PIL.Image.Resampling.BICUBIC)
         # draw a border around the diagram
         PIL.ImageDraw.Draw(final_diagram_img).rectangle(
             (0,0, final_diagram_img.width -1, final_diagram_img.height -1), 
             outline="black",
             width=border_width)
-        img_file_path = pathlib.Path(Diagram.pargs.out).stem + "_diagram.png"
-        final_diagram_img.save(pathlib.Path(Diagram.pargs.out).parent / img_file_path)
+        return final_diagram_img
+
+    def _draw_links(self, final_diagram_img: PIL.Image.Image) -> PIL.Image.Image:
+        """Draw an arrow for each region link, or each bundle of links, into a single link layer, 
+        then composite the layer onto the diagram once at link_alpha. Return the composite image"""
 
-    def _create_table_image(self, mmd_list: List[MemoryMapDiagram]) -> None:
-        """Create a png image of the summary table"""
+        # the link targets, by (map name, region name)
+        targets: Dict[Tuple[str, str], Tuple[int, MemoryMapDiagram, mm.image.MemoryRegionImage]] = {
+            (mmd.name, region_image.name): (mmd_idx, mmd, region_image)
+            for mmd_idx, mmd in enumerate(self.mmd_list)
+            for region_image in mmd.image_list
+        }
+        # (source map index, target map index, arrow start, arrow end) of each link
+        link_vectors: List[Tuple[int, int, mm.image.Point, mm.image.Point]] = []
 
-        table_data = []
+        for source_mmd_idx, mmd in enumerate(self.mmd_list):    
+            for region_image in mmd.image_list:
+                for link in region_image.metadata.links:
+                    target = targets.get((link[0], link[1]))
+                    # e.g. the target map is not drawn with '--window-maps'
+                    if target is None:
+                        continue
+                    target_mmd_idx, target_mmd, target_region = target
+                    source_region_mid_pos = mmd.region_mid_pos(region_image)
+                    target_region_mid_pos = target_mmd.region_mid_pos(target_region)
+                    padding = 5
+                    # determine which side of the region block we are drawing to/from
+                    if source_mmd_idx < target_mmd_idx:
+                        source_justify = (region_image.img_width // 2) + padding
+                    else:
+                        source_justify = -(region_image.img_width // 2) - padding
+
+                    if target_mmd_idx < source_mmd_idx:
+                        target_justify = (target_region.img_width // 2) + padding
+                    else:
+                        target_justify = -(target_region.img_width // 2) - padding                       
+
+                    link_vectors.append((
+                        source_mmd_idx,
+                        target_mmd_idx,
+                        mm.image.Point(
+                            (source_mmd_idx * mmd.width) + source_region_mid_pos.x + source_justify,
+                            source_region_mid_pos.y
+                        ),
+                        mm.image.Point(
+                            (target_mmd_idx * target_mmd.width) + target_region_mid_pos.x + target_justify, 
+                            target_region_mid_pos.y
+                        )))
+
+        bundles = Diagram._bundle_links(link_vectors, Diagram.model.link_bundle_height)
+        link_layer = PIL.Image.new("RGBA", final_diagram_img.size, (0,0,0,0))
+        for src, dst, _ in bundles:
+            # create the link image for the src/dst vector (calc length and angle)           
+            arrow = mm.image.ArrowBlock(
+                src = src,
+                dst = dst,
+                head_width = Diagram.model.link_head_width,
+                tail_len = Diagram.model.link_tail_len,
+                tail_width = Diagram.model.link_tail_width,
+                fill = Diagram.model.link_fill_colour,
+                line = Diagram.model.link_line_colour
+            )
+
+            # add it to the link layer, the crossing arrows are flattened before link_alpha is applied
+            arrow.composite_onto(link_layer, arrow.pos)
+
+        link_alpha = int(Diagram.model.link_alpha)
+        link_layer.putalpha(link_layer.getchannel("A").point(lambda a: a * link_alpha // 255))
+        final_diagram_img = PIL.Image.alpha_composite(final_diagram_img, link_layer)
+
+        # the badges are drawn over the arrows, without the link transparency
+        for src, dst, link_count in bundles:
+            if link_count > 1:
+                badge = mm.image.TextLabelImage(
+                    "links", 
+                    str(link_count), 
+                    font_size=Diagram.model.text_size, 
+                    font_colour="white", 
+                    fill_colour=Diagram.model.link_line_colour, 
+                    padding_width=8)
+                badge.composite_onto(
+                    final_diagram_img, 
+                    mm.image.Point(
+                        (src.x + dst.x) // 2 - badge.img.width // 2, 
+                        (src.y + dst.y) // 2 - badge.img.height // 2))
+
+        return final_diagram_img
+
+    @classmethod
+    def _bundle_links(
+            cls, 
+            link_vectors: List[Tuple[int, int, mm.image.Point, mm.image.Point]], 
+            band_height: int) -> List[Tuple[mm.image.Point, mm.image.Point, int]]:
+        """Group the links between the same two maps whose start and end are in the same bands of band_height pixels.
+        Each group is drawn as one arrow between the mean start and end. Return (start, end, link count) of each arrow.
+        - band_height: 0 draws an arrow for every link"""
+        if not band_height:
+            return [(src, dst, 1) for _, _, src, dst in link_vectors]
+
+        groups: Dict[Tuple[int, int, int, int], List[Tuple[mm.image.Point, mm.image.Point]]] = {}
+        for source_mmd_idx, target_mmd_idx, src, dst in link_vectors:
+            key = (source_mmd_idx, target_mmd_idx, int(src.y) // band_height, int(dst.y) // band_height)
+            groups.setdefault(key, []).append((src, dst))
+
+        bundles = []
+        for ends in groups.values():
+            count = len(ends)
+            bundles.append((
+                mm.image.Point(sum(src.x for src, _ in ends) // count, sum(src.y for src, _ in ends) // count),
+                mm.image.Point(sum(dst.x for _, dst in ends) // count, sum(dst.y for _, dst in ends) // count),
+                count))
+        return bundles
+
+    def _sorted_region_images(self, mmd_list: List[MemoryMapDiagram]) -> List[mm.image.MemoryRegionImage]:
+        """The regions of every map, sorted by descending origin value"""
+        table_list: List[mm.image.MemoryRegionImage] = []
         for region_map_list in mmd_list:
-            for memregion in (region_map_list.image_list):
-                table_data.append(memregion)
+            for memregion in (region_map_list.image_list): 
+                table_list.append(memregion)           
 
-        # sort by origin value, then expand into list of lists
-        table_data.sort(key=lambda x: x.origin_as_int, reverse=True)
-        table_data = [d.get_data_as_list() for d in table_data]
+        table_list.sort(key=lambda x: x.origin_as_int, reverse=True)
+        return table_list
+
+    @classmethod
+    def _table_suffixes(cls, row_count: int) -> List[str]:
+        """The file suffix of each table image page. A table that fits on one page is not numbered."""
+        pages = max(1, math.ceil(row_count / Diagram.pargs.table_rows))
+        if pages == 1:
+            return ["_table.png"]
+        return [f"_table_{page:03d}.png" for page in range(1, pages + 1)]
+
+    def _create_table_image(
+            self, 
+            mmd_list: List[MemoryMapDiagram], 
+            table_list: List[mm.image.MemoryRegionImage] | None = None) -> PIL.Image.Image:
+        """Create a png image of the summary table. 
+        - table_list: the (sorted) rows to draw. Default: every region in mmd_list"""
+        mm.image.import_pillow()
+
+        if table_list is None:
+            table_list = self._sorted_region_images(mmd_list)
+
+        # expand into list of lists
+        table_data = [d.get_data_as_list() for d in table_list]
 
         # Create the table image
         table_img = mm.image.Table().get_table_img(
@@ -455,36 +876,90 @@ class Diagram:
         final_table_img.paste(table_img, (0,0))
         final_table_img.paste(caption_img, (10,table_img.height + 10))
 
-        tableimg_file_path = pathlib.Path(Diagram.pargs.out).stem + "_table.png"
-        final_table_img.save(pathlib.Path(Diagram.pargs.out).parent / tableimg_file_path)
+        return final_table_img
+
+    def _save_image(self, img: PIL.Image.Image, suffix: str) -> None:
+        """Save the image next to the markdown report, using the report name with the suffix appended"""
+        img_file_path = pathlib.Path(Diagram.pargs.out).stem + suffix
+        with mm.profile.span("save", file=img_file_path):
+            img.save(pathlib.Path(Diagram.pargs.out).parent / img_file_path)
 
-    def _create_markdown(self,  mmd_list: List[MemoryMapDiagram]) -> None:
+    def _create_markdown(self) -> None:
         """Create markdown doc containing the diagram image """
         """and text-base summary table"""
-        table_list: List[mm.image.MemoryRegionImage] = []
-        for region_map_list in mmd_list:
-            for memregion in (region_map_list.image_list): 
-                table_list.append(memregion)           
 
-        # sort by ascending origin value starting from the table bottom
-        table_list.sort(key=lambda x: x.origin_as_int, reverse=True)
+        stem = pathlib.Path(Diagram.pargs.out).stem
+        image_links: List[str] = []
+        # only link the diagram and table images if they were generated
+        if "diagram" in Diagram.pargs.outputs and self.mmd_list:
+            image_links.append(f"![memory map diagram]({stem}_diagram.png)")
+        if "table" in Diagram.pargs.outputs and self.mmd_list:
+            # only the drawn regions are listed, e.g. with '--window'
+            region_count = sum(len(mmd.image_list) for mmd in self.mmd_list)
+            table_suffixes = Diagram._table_suffixes(region_count)
+            for page_idx, suffix in enumerate(table_suffixes):
+                page_label = f" (page {page_idx + 1} of {len(table_suffixes)})" if len(table_suffixes) > 1 else ""
+                image_links += ["", f"[summary table{page_label}]({stem}{suffix})"]
+            image_links.append("")
+
+        # colour the region names to match the diagram
+        colours = {}
+        if "diagram" in Diagram.pargs.outputs:
+            colours = {
+                (mmd.name, region_image.name): region_image.fill
+                for mmd in self.mmd_list 
+                for region_image in mmd.image_list
+            }
 
+        import mm.report
         with open(Diagram.pargs.out, "w") as f:
-            f.write(f"""![memory map diagram]({pathlib.Path(Diagram.pargs.out).stem}_diagram.png)\n""")
-            f.write("|region (parent)|origin|size|free Space|collisions|links|draw scale|\n")
-            f.write("|:-|:-|:-|:-|:-|:-|:-|\n")
-            # use __str__ from mm.image.MemoryRegionImage to print tabulated row
-            for mr in table_list:
-                f.write(f"{mr}\n")
-            f.write("\n---")
-            for mmd in mmd_list:
-                f.write(f"\n#### {mmd.name}:")
-                f.write(f"\n- max address = 0x{mmd.max_address:X} ({mmd.max_address:,})")
-                f.write(f"\n- {'Calculated from region data' if mmd.max_address_taken_from_diagram_height else 'User-defined input'}")
+            mm.report.write_markdown(f, Diagram.model, image_links, colours, Diagram._clusters() or {})
+
+    def _create_tiles(self) -> None:
+        """Create the tile pyramid directory, using the report path and name. E.g. 'report_tiles/manifest.json'"""
+        import mm.tiles
+        out = pathlib.Path(Diagram.pargs.out)
+        mm.tiles.write_pyramid(
+            Diagram.model,
+            Diagram.pargs,
+            out.parent / (out.stem + "_tiles"),
+            tile_size=Diagram.pargs.tile_size,
+            max_levels=Diagram.pargs.tile_levels,
+            workers=Diagram.pargs.tile_workers)
 
     @classmethod
-    def _parse_args(cls):
-        """Setup the command line interface"""
+    def _json_path(cls) -> pathlib.Path:
+        """The json file of the analysed model, using the report path and name. E.g. 'report_model.json'"""
+        out = pathlib.Path(Diagram.pargs.out)
+        return out.parent / (out.stem + "_model.json")
+
+    def _create_json(self) -> None:
+        """Create json file containing the analysed model, i.e. including freespace and collisions"""
+        with Diagram._json_path().open("w") as fp:
+            fp.write(Diagram.model.model_dump_json(indent=2))
+
+    def _create_results(self, output: str) -> None:
+        """Create the per-region results file, using the report path and name. E.g. 'report_results.csv'"""
+        extension = output.split("-")[1]
+        results_file_path = pathlib.Path(Diagram.pargs.out).stem + "_results." + extension
+        Diagram._results_writer(output)(pathlib.Path(Diagram.pargs.out).parent / results_file_path, Diagram.model)
+
+    @classmethod
+    def _results_writer(cls, output: str) -> Callable[[pathlib.Path, mm.metamodel.Diagram], None]:
+        """The mm.export function that writes the results output, e.g. 'results-csv'"""
+        import mm.export
+        return getattr(mm.export, Diagram.results_writers[output])
+
+    def _create_profile(self) -> None:
+        """Save the profiler spans as json and as a Chrome trace file"""
+        logger.info(f"Profile: {Diagram.profiler.images} images allocated ({Diagram.profiler.image_bytes:,} bytes)")
+        out = pathlib.Path(Diagram.pargs.out)
+        Diagram.profiler.save_json(out.parent / (out.stem + "_profile.json"))
+        Diagram.profiler.save_chrome_trace(out.parent / (out.stem + "_trace.json"))
+
+    @classmethod
+    def _parse_args(cls, argv: List[str] | None = None):
+        """Setup the command line interface. Parses sys.argv unless argv is given."""
         parser = argparse.ArgumentParser(
             formatter_class=argparse.RawTextHelpFormatter,
             description=
@@ -551,6 +1026,68 @@ EXAMPLES
             help="JSON input file for multiple memory maps (and links) support. Please see docs/example for help.",
             type=str,
         )
+        parser.add_argument(
+            "--ldmap",
+            help="""GNU ld map file input. A memory map is created for each memory in the map file's memory configuration.
+            The diagram height is set by the 'limit' argument.""",
+            type=str,
+        )
+        parser.add_argument(
+            "--ldmap-sections",
+            help="""Use the 'output' sections (e.g. .text) or the 'input' sections (e.g. .text.main from main.o) 
+            of the GNU ld map file as the regions. Default: output""",
+            choices=["output", "input"],
+            default="output"
+        )
+        parser.add_argument(
+            "--elf",
+            help="""ELF file input. The allocated sections are shown at their run addresses (VMA). 
+            If any section is loaded at a different address, e.g. initialised data, the load addresses (LMA) are shown in a second memory map.
+            The diagram height is set by the 'limit' argument.""",
+            type=str,
+        )
+        parser.add_argument(
+            "--dtb",
+            help="""Flattened device tree blob input. The 'reg' properties of the device nodes are shown in a memory map for each bus address space. 
+            The /memory nodes and the reserved memory (/reserved-memory, /memreserve/ and the initrd) have their own memory maps.
+            The diagram height is set by the 'limit' argument.""",
+            type=str,
+        )
+        parser.add_argument(
+            "--ldscript",
+            help="""Linker script with a MEMORY command. Each memory map with the same name as a memory region 
+            is bounded by its ORIGIN and LENGTH. With '--elf', the sections are shown in a memory map for each memory region.""",
+            type=str,
+        )
+        parser.add_argument(
+            "--window",
+            help="""Only draw the address range [START, END) of the memory maps, e.g. to zoom in on a collision. Please use hex.
+            The range is drawn at its own scale. Only the regions that overlap the range are drawn and listed in the table,
+            and the edges of the regions that are clipped by the range are dashed.""",
+            nargs=2,
+            metavar=("START", "END"),
+            type=str,
+        )
+        parser.add_argument(
+            "--window-maps",
+            help="The memory maps to draw with '--window'. Default: all",
+            nargs="+",
+            metavar="NAME",
+            type=str,
+        )
+        parser.add_argument(
+            "--collisions-only",
+            help="""Only draw the clusters of colliding regions, with '--collision-context' either side. 
+            The space between the clusters is collapsed into void regions and the memory maps without collisions are not drawn. 
+            The markdown report lists each cluster.""",
+            action="store_true"
+        )
+        parser.add_argument(
+            "--collision-context",
+            help="The address range to draw either side of each cluster with '--collisions-only'. Please use hex. Default: 0x0",
+            type=str,
+            default="0x0"
+        )
         parser.add_argument(
             "-v",
             help="Enable debug output.",
@@ -562,50 +1099,182 @@ EXAMPLES
             If this option is set, diagram images may be created larger than requested.""",
             action="store_true"
         )        
+        parser.add_argument(
+            "--outputs",
+            help="""The output artefacts to generate. Only the selected artefacts are computed, 
+            e.g. the diagram is not drawn unless 'diagram' is selected.
+            The json output contains the analysed model ('_model.json').
+            The results outputs contain one record per region ('_results.json', '_results.csv' or '_results.sqlite'):
+            origin, size, end, freespace, collisions, links and draw_scale.
+            The tiles output is a multi-resolution tile pyramid of each memory map ('_tiles/manifest.json'), see '--tile-size'.
+            Default: diagram table markdown""",
+            nargs="+",
+            choices=["diagram", "table", "markdown", "json", "results-json", "results-csv", "results-sqlite", "tiles"],
+            default=["diagram", "table", "markdown"]
+        )
+        parser.add_argument(
+            "--table-rows",
+            help="""The maximum number of regions in each table image. 
+            Larger tables are split into numbered pages ('_table_001.png', '_table_002.png', ...), each with the header.
+            Default: 1000""",
+            type=int,
+            default=1000
+        )
+        parser.add_argument(
+            "--tile-size",
+            help="""The width and height in pixels of each tile of the 'tiles' output. 
+            Level 0 fits each memory map into one tile, each following level halves the draw scale. 
+            Only the tiles that contain regions are drawn. Default: 512""",
+            type=int,
+            default=512
+        )
+        parser.add_argument(
+            "--tile-levels",
+            help="""The maximum number of zoom levels of the 'tiles' output. There are fewer levels if a 1:1 scale is reached first. 
+            Default: 8""",
+            type=int,
+            default=8
+        )
+        parser.add_argument(
+            "--tile-workers",
+            help="The number of processes that draw the tiles in parallel. Default: the number of CPUs",
+            type=int,
+        )
+        parser.add_argument(
+            "--profile",
+            help="""Record the time taken by each stage of the pipeline. 
+            The spans are written as json ('_profile.json') and as a Chrome trace file ('_trace.json')
+            using the report path and name.""",
+            action="store_true"
+        )
+        parser.add_argument(
+            "--profile-memory",
+            help="""As '--profile' but also record the peak tracemalloc usage of each stage, and the peak RSS of the process when it ends. 
+            This is much slower.""",
+            action="store_true"
+        )
+        parser.add_argument(
+            "--cache-dir",
+            help="""Cache the validated JSON input model in this directory, keyed by the hash of the JSON input file 
+            (and the '--ldscript' linker script, if any). Later runs with the same input skip the validation and the collision checks.""",
+            type=str,
+        )
 
-        Diagram.pargs = parser.parse_args()
+        Diagram.pargs = parser.parse_args(argv)
 
     @classmethod
     def _validate_pargs(cls):
         """"Validate the command line arguments"""
         if Diagram.pargs.v:
-            root.setLevel(logging.DEBUG)
+            logging.getLogger("mm").setLevel(logging.DEBUG)
         # parse hex/int inputs
         if not Diagram.pargs.file and not Diagram.pargs.limit:
             raise SystemExit("Error: You must specify either: limit setting or JSON input file.")
         if not Diagram.pargs.file and Diagram.pargs.limit:
             if not Diagram.pargs.limit[:2] == "0x":
                 raise SystemExit(f"Error: 'limit' argument should be in hex format: {str(Diagram.pargs.limit)} = {hex(int(Diagram.pargs.limit))}")
-        if not Diagram.pargs.file and not Diagram.pargs.regions:
-            raise SystemExit("You must provide either: region string or JSON input file.")
+        input_files = [f for f in (Diagram.pargs.file, Diagram.pargs.ldmap, Diagram.pargs.elf, Diagram.pargs.dtb) if f]
+        if not input_files and not Diagram.pargs.regions:
+            raise SystemExit("You must provide either: region string, JSON input file, GNU ld map file, ELF file or device tree blob.")
+        if len(input_files) > 1:
+            raise SystemExit("Error: Only one of JSON input file, GNU ld map file, ELF file or device tree blob can be used.")
+        if Diagram.pargs.table_rows < 1:
+            raise SystemExit(f"Error: 'table-rows' argument should be at least 1: {Diagram.pargs.table_rows}")
+        if Diagram.pargs.tile_size < 64:
+            raise SystemExit(f"Error: 'tile-size' argument should be at least 64: {Diagram.pargs.tile_size}")
+        if Diagram.pargs.tile_levels < 1:
+            raise SystemExit(f"Error: 'tile-levels' argument should be at least 1: {Diagram.pargs.tile_levels}")
+        if Diagram.pargs.tile_workers is not None and Diagram.pargs.tile_workers < 1:
+            raise SystemExit(f"Error: 'tile-workers' argument should be at least 1: {Diagram.pargs.tile_workers}")
         if Diagram.pargs.threshold:
             if not Diagram.pargs.threshold[:2] == "0x":
                 raise SystemExit(f"Error: 'threshold' argument should be in hex format: {str(Diagram.pargs.threshold)} = {hex(int(Diagram.pargs.threshold))}")
+        if Diagram.pargs.window:
+            if not all(w[:2] == "0x" for w in Diagram.pargs.window):
+                raise SystemExit(f"Error: 'window' arguments should be in hex format: {' '.join(Diagram.pargs.window)}")
+            if int(Diagram.pargs.window[0], 16) >= int(Diagram.pargs.window[1], 16):
+                raise SystemExit(f"Error: 'window' start should be below the end: {' '.join(Diagram.pargs.window)}")
+        elif Diagram.pargs.window_maps:
+            raise SystemExit("Error: 'window-maps' can only be used with 'window'")
+        if Diagram.pargs.collisions_only and Diagram.pargs.window:
+            raise SystemExit("Error: 'collisions-only' can't be used with 'window'")
+        if not Diagram.pargs.collision_context[:2] == "0x":
+            raise SystemExit(f"Error: 'collision-context' argument should be in hex format: {Diagram.pargs.collision_context}")
 
         # make sure the output path is valid and parent dir exists
         if not pathlib.Path(Diagram.pargs.out).suffix == ".md":
             raise NameError("Output file should end with .md")
         pathlib.Path(Diagram.pargs.out).parent.mkdir(parents=True, exist_ok=True)
+        if "json" in Diagram.pargs.outputs and Diagram.pargs.file:
+            if Diagram._json_path().resolve() == pathlib.Path(Diagram.pargs.file).resolve():
+                raise SystemExit(f"Error: The json output would overwrite the input file: {Diagram.pargs.file}")
 
         # check data point cardinality
         if len(sys.argv) == 1:
             raise SystemExit("Error: You must pass in data points")
-        if not Diagram.pargs.file:
+        if Diagram.pargs.ldscript:
+            input_files.append(Diagram.pargs.ldscript)
+        if input_files:
+            for input_file in input_files:
+                input_file = pathlib.Path(input_file).resolve()
+                if not input_file.exists():
+                    raise SystemExit(f"Error: File not found: {input_file}")
+        else:
             if len(Diagram.pargs.regions) % 3:
                 raise SystemExit("Error: Command line input data should be in multiples of three") 
-        else:
-            json_file = pathlib.Path(Diagram.pargs.file).resolve()
-            if not json_file.exists():
-                raise SystemExit(f"Error: File not found: {json_file}")
     
     @classmethod
     def _create_model(cls) -> mm.metamodel.Diagram:
-        
+        # the cache and the importers are only imported for the input that is used
+        import mm.metamodel
+
+        cache_key = None
         if Diagram.pargs.file:
             if Diagram.pargs.limit:
-                logging.warning("Limit flag is ignore when using JSON input. Using the JSON file Diagram -> height field instead.")
-            with pathlib.Path(Diagram.pargs.file).resolve().open("r") as fp:
-                inputdict = json.load(fp)
+                logger.warning("Limit flag is ignore when using JSON input. Using the JSON file Diagram -> height field instead.")
+            input_bytes = pathlib.Path(Diagram.pargs.file).resolve().read_bytes()
+            if Diagram.pargs.cache_dir:
+                import mm.cache
+                cache_inputs = [input_bytes]
+                if Diagram.pargs.ldscript:
+                    cache_inputs.append(pathlib.Path(Diagram.pargs.ldscript).read_bytes())
+                cache_key = mm.cache.input_hash(cache_inputs)
+                model = mm.cache.load(pathlib.Path(Diagram.pargs.cache_dir), cache_key)
+                if model is not None:
+                    logger.info(f"Loaded the validated model from the cache: {Diagram.pargs.cache_dir}")
+                    return model
+            inputdict = json.loads(input_bytes)
+        elif Diagram.pargs.ldmap:
+            import mm.ldmap
+            inputdict = {
+                "name": Diagram.pargs.name if Diagram.pargs.name else pathlib.Path(Diagram.pargs.ldmap).stem,
+                "height": int(Diagram.pargs.limit,16),
+                "width": A8.width,  # width is fixed when using the command line
+                "threshold": int(Diagram.pargs.threshold, 16),
+                "memory_maps": mm.ldmap.load(pathlib.Path(Diagram.pargs.ldmap), Diagram.pargs.ldmap_sections)
+            }
+            if not inputdict["memory_maps"]:
+                raise SystemExit(f"Error: No sections found in {Diagram.pargs.ldmap}")
+        elif Diagram.pargs.elf or Diagram.pargs.dtb:
+            input_file = pathlib.Path(Diagram.pargs.elf or Diagram.pargs.dtb)
+            try:
+                if Diagram.pargs.elf:
+                    import mm.elf
+                    memory_maps = mm.elf.load(input_file, cls._load_ldscript())
+                else:
+                    import mm.dtb
+                    memory_maps = mm.dtb.load(input_file)
+            except ValueError as e:
+                raise SystemExit(f"Error: {e}")
+            if not memory_maps:
+                raise SystemExit(f"Error: No memory regions found in {input_file}")
+            inputdict = {
+                "name": Diagram.pargs.name if Diagram.pargs.name else input_file.stem,
+                "height": int(Diagram.pargs.limit,16),
+                "width": A8.width,  # width is fixed when using the command line
+                "threshold": int(Diagram.pargs.threshold, 16),
+                "memory_maps": memory_maps
+            }
         else:
             mmname = Diagram.pargs.name if Diagram.pargs.name else "Untitled"
             # command line parameters only support one memory map per diagram
@@ -629,15 +1298,66 @@ EXAMPLES
             for datatuple in Diagram._batched(Diagram.pargs.regions, 3):
                 # prevent overwriting duplicates
                 if datatuple[0] in inputdict['memory_maps'][mmname]['memory_regions']:
-                    logging.warning(f"{str(datatuple[0])} already exists. Skipping {str(datatuple)}.")
+                    logger.warning(f"{str(datatuple[0])} already exists. Skipping {str(datatuple)}.")
                     continue
 
                 inputdict['memory_maps'][mmname]['memory_regions'][datatuple[0]] = {
                         "origin": datatuple[1],
                         "size": datatuple[2]
                     }
-            
-        return mm.metamodel.Diagram(**inputdict)
+
+        if Diagram.pargs.ldscript and not Diagram.pargs.elf:
+            import mm.ldscript
+            mm.ldscript.apply_bounds(inputdict["memory_maps"], cls._load_ldscript())
+
+        model = mm.metamodel.Diagram(**inputdict)
+        if cache_key is not None:
+            mm.cache.save(pathlib.Path(Diagram.pargs.cache_dir), cache_key, model)
+        return model
+
+    @classmethod
+    def _window(cls) -> Tuple[mm.window.Window | None, List[str]]:
+        """The '--window' address range, if any, and the names of the memory maps to draw"""
+        if not Diagram.pargs.window:
+            return None, list(Diagram.model.memory_maps)
+        window = mm.window.Window(int(Diagram.pargs.window[0], 16), int(Diagram.pargs.window[1], 16))
+        window_maps = Diagram.pargs.window_maps or list(Diagram.model.memory_maps)
+        for mmap_name in window_maps:
+            if mmap_name not in Diagram.model.memory_maps:
+                raise SystemExit(f"Error: 'window-maps' memory map not found: {mmap_name}")
+        return window, window_maps
+
+    @classmethod
+    def _clusters(cls) -> Dict[str, List[mm.clusters.Cluster]] | None:
+        """The collision clusters of each memory map with '--collisions-only', otherwise None"""
+        if not Diagram.pargs.collisions_only:
+            return None
+        import mm.clusters
+        return {mmap_name: mm.clusters.find_clusters(mmap) for mmap_name, mmap in Diagram.model.memory_maps.items()}
+
+    @classmethod
+    def _link_targets(cls, model: mm.metamodel.Diagram) -> Set[Tuple[str, str]]:
+        """The (map, region) pairs that are the target of a link in any memory map of the model"""
+        return {
+            tuple(link)
+            for mmap in model.memory_maps.values()
+            for region in mmap.memory_regions.values()
+            for link in region.links
+        }
+
+    @classmethod
+    def _load_ldscript(cls) -> Dict[str, mm.ldmap.Memory] | None:
+        """The memory regions of the '--ldscript' linker script, if any"""
+        if not Diagram.pargs.ldscript:
+            return None
+        import mm.ldscript
+        try:
+            memories = mm.ldscript.load(pathlib.Path(Diagram.pargs.ldscript))
+        except ValueError as e:
+            raise SystemExit(f"Error: {Diagram.pargs.ldscript}: {e}")
+        if not memories:
+            raise SystemExit(f"Error: No MEMORY command found in {Diagram.pargs.ldscript}")
+        return memories
 
     @classmethod
     def _batched(cls, iterable, n):
@@ -649,6 +1369,19 @@ EXAMPLES
         while batch := tuple(itertools.islice(it, n)):
             yield batch
 
-if __name__ == "__main__":
+def main():
+    """Command line entry point. Logging is only configured here so that 
+    importing this module does not change the logging of the calling application."""
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+
+    handler = logging.StreamHandler(sys.stdout)
+    formatter = logging.Formatter("%(levelname)s - %(message)s")
+    handler.setFormatter(formatter)
+    root.addHandler(handler)
+
     Diagram()
+
+if __name__ == "__main__":
+    main()
  
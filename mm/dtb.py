@@ -0,0 +1,313 @@
+import logging
+import mmap
+import pathlib
+import struct
+from typing import Dict, List, NamedTuple, Tuple
+
+import mm.metamodel
+
+logger = logging.getLogger(__name__)
+
+FDT_MAGIC = 0xd00dfeed
+FDT_BEGIN_NODE = 1
+FDT_END_NODE = 2
+FDT_PROP = 3
+FDT_NOP = 4
+FDT_END = 9
+
+_header = struct.Struct(">10I")
+_token = struct.Struct(">I")
+_prop = struct.Struct(">II")
+_reservation = struct.Struct(">QQ")
+
+memory_map_name = "/memory"
+"""Memory map for the /memory nodes"""
+
+reserved_map_name = "/reserved-memory"
+"""Memory map for the /reserved-memory nodes, the memory reservation block (/memreserve/) and the initrd"""
+
+
+class Range(NamedTuple):
+    """An entry in a bus node's 'ranges' property"""
+    child_address: int
+    parent_address: int
+    size: int
+
+
+class AddressSpace(NamedTuple):
+    """The address space of a bus node's children"""
+    name: str
+    """The memory map name. '/' is the CPU physical address space."""
+    translations: Tuple[Tuple[Range, ...], ...]
+    """The 'ranges' to apply, innermost bus first, to get from a child address to an address in the named space"""
+
+    def translate(self, address: int, size: int) -> int | None:
+        for ranges in self.translations:
+            for r in ranges:
+                if r.child_address <= address and address + size <= r.child_address + r.size:
+                    address = r.parent_address + (address - r.child_address)
+                    break
+            else:
+                return None
+        return address
+
+
+class _Node:
+    """A node of the structure block. Property values are stored as (offset, length) in the blob."""
+
+    def __init__(self, name: str, path: str, parent: "_Node | None"):
+        self.name = name
+        self.path = path
+        self.parent = parent
+        self.props: Dict[str, Tuple[int, int]] = {}
+        self.yielded = False
+        self._space: AddressSpace | None = None
+
+
+class DeviceTree:
+    """Walks the structure block of a flattened device tree blob.
+    The blob is memory mapped and the property values are decoded in place."""
+
+    def __init__(self, data: mmap.mmap | bytes):
+
+        if len(data) < _header.size:
+            raise ValueError("Not a device tree blob")
+        (magic, totalsize, self._off_struct, self._off_strings, self._off_rsvmap,
+         version, _, _, _, self._size_struct) = _header.unpack_from(data, 0)
+        if magic != FDT_MAGIC:
+            raise ValueError("Not a device tree blob")
+        if totalsize > len(data):
+            raise ValueError("Truncated device tree blob")
+        if version < 17:
+            # the structure block size was added in version 17
+            self._size_struct = totalsize - self._off_struct
+        if self._off_struct + self._size_struct > totalsize or self._off_strings > totalsize:
+            raise ValueError("Truncated device tree blob")
+
+        self.data = data
+        """The contents of the file"""
+
+    def _string(self, offset: int) -> str:
+        end = self.data.find(b"\0", offset)
+        if end < 0:
+            raise ValueError(f"Unterminated string at offset {offset}")
+        return self.data[offset:end].decode("utf-8", errors="replace")
+
+    def cells(self, offset: int, length: int) -> List[int]:
+        """The 32 bit cells of a property value"""
+        return list(struct.unpack_from(f">{length // 4}I", self.data, offset))
+
+    def number(self, cells: List[int]) -> int:
+        """The value of a multi-cell number, e.g. a 64 bit address"""
+        value = 0
+        for cell in cells:
+            value = (value << 32) | cell
+        return value
+
+    def reservations(self) -> List[Tuple[int, int]]:
+        """The (address, size) entries of the memory reservation block"""
+        entries = []
+        offset = self._off_rsvmap
+        while True:
+            address, size = _reservation.unpack_from(self.data, offset)
+            if address == 0 and size == 0:
+                return entries
+            entries.append((address, size))
+            offset += _reservation.size
+
+    def _address_cells(self, node: _Node) -> int:
+        return self._node_cells(node, "#address-cells", 2)
+
+    def _size_cells(self, node: _Node) -> int:
+        return self._node_cells(node, "#size-cells", 1)
+
+    def _node_cells(self, node: _Node, name: str, default: int) -> int:
+        if name not in node.props:
+            return default
+        offset, length = node.props[name]
+        return self.cells(offset, length)[0] if length >= 4 else default
+
+    def child_space(self, node: _Node) -> AddressSpace:
+        """The address space of the node's children, resolved through the 'ranges' of each parent bus"""
+        if node._space is not None:
+            return node._space
+        if node.parent is None:
+            node._space = AddressSpace("/", ())
+        elif "ranges" not in node.props:
+            # e.g. i2c or spi buses have their own address space
+            node._space = AddressSpace(node.path, ())
+        else:
+            parent_space = self.child_space(node.parent)
+            offset, length = node.props["ranges"]
+            if length == 0:
+                # identity mapping
+                node._space = parent_space
+            else:
+                child_cells = self._address_cells(node)
+                parent_cells = self._address_cells(node.parent)
+                size_cells = self._size_cells(node)
+                cells = self.cells(offset, length)
+                stride = child_cells + parent_cells + size_cells
+                ranges = tuple(
+                    Range(
+                        self.number(cells[i:i + child_cells]),
+                        self.number(cells[i + child_cells:i + child_cells + parent_cells]),
+                        self.number(cells[i + child_cells + parent_cells:i + stride]))
+                    for i in range(0, len(cells) - stride + 1, stride)
+                )
+                node._space = AddressSpace(parent_space.name, (ranges,) + parent_space.translations)
+        return node._space
+
+    def regs(self, node: _Node) -> List[Tuple[int, int]]:
+        """The (address, size) entries of the node's 'reg' property, using the parent's cell sizes.
+        Empty if the parent has no size cells, e.g. cpu nodes."""
+        if "reg" not in node.props or node.parent is None:
+            return []
+        address_cells = self._address_cells(node.parent)
+        size_cells = self._size_cells(node.parent)
+        if size_cells == 0:
+            return []
+        stride = address_cells + size_cells
+        cells = self.cells(*node.props["reg"])
+        return [
+            (self.number(cells[i:i + address_cells]), self.number(cells[i + address_cells:i + stride]))
+            for i in range(0, len(cells) - stride + 1, stride)
+        ]
+
+    def strings(self, node: _Node, name: str) -> List[str]:
+        """The values of a string list property"""
+        if name not in node.props:
+            return []
+        offset, length = node.props[name]
+        return [s.decode("utf-8", errors="replace") for s in self.data[offset:offset + length].split(b"\0")[:-1]]
+
+    def walk(self):
+        """Yield each node of the structure block once its properties have been read, i.e. before its first child"""
+        offset = self._off_struct
+        end = self._off_struct + self._size_struct
+        stack: List[_Node] = []
+        while offset < end:
+            if offset + 4 > end:
+                raise ValueError(f"Truncated structure block at offset {offset}")
+            (token,) = _token.unpack_from(self.data, offset)
+            offset += 4
+            if token == FDT_BEGIN_NODE:
+                name_end = self.data.find(b"\0", offset, end)
+                if name_end < 0:
+                    raise ValueError(f"Unterminated node name at offset {offset}")
+                name = self.data[offset:name_end].decode("utf-8", errors="replace")
+                offset = (name_end + 4) & ~3
+                parent = stack[-1] if stack else None
+                if parent is not None and not parent.yielded:
+                    # the parent's properties are always before its children
+                    parent.yielded = True
+                    yield parent
+                path = "/" if parent is None else f"{parent.path.rstrip('/')}/{name}"
+                stack.append(_Node(name, path, parent))
+            elif token == FDT_PROP:
+                if not stack:
+                    raise ValueError(f"Property outside a node at offset {offset - 4}")
+                if offset + _prop.size > end:
+                    raise ValueError(f"Truncated structure block at offset {offset}")
+                length, name_offset = _prop.unpack_from(self.data, offset)
+                offset += _prop.size
+                if offset + length > end:
+                    raise ValueError(f"Property value past the end of the structure block at offset {offset}")
+                stack[-1].props[self._string(self._off_strings + name_offset)] = (offset, length)
+                offset = (offset + length + 3) & ~3
+            elif token == FDT_END_NODE:
+                if not stack:
+                    raise ValueError(f"Node end without a node at offset {offset - 4}")
+                node = stack.pop()
+                if not node.yielded:
+                    yield node
+            elif token == FDT_NOP:
+                continue
+            elif token == FDT_END:
+                break
+            else:
+                raise ValueError(f"Invalid structure block token {token} at offset {offset - 4}")
+        if stack:
+            raise ValueError(f"Unterminated node: {stack[-1].path}")
+
+
+def load(path: pathlib.Path) -> Dict[str, mm.metamodel.MemoryMap]:
+    """Create a memory map for each bus address space with the 'reg' properties of the device nodes.
+    The /memory nodes and the reserved memory (/reserved-memory nodes, /memreserve/ entries and the initrd)
+    have their own memory maps, so that the reservations don't collide with the memory that contains them.
+    Bus addresses are translated to the CPU address space ('/') through the 'ranges' of each bus.
+    Buses without 'ranges', e.g. i2c, get a memory map named after the bus node."""
+
+    with path.open("rb") as fp:
+        try:
+            data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise ValueError(f"Not a device tree blob: {path}")
+    try:
+        return _load(DeviceTree(data), path)
+    except struct.error:
+        raise ValueError(f"Truncated device tree blob: {path}")
+    except ValueError as e:
+        raise ValueError(f"{e}: {path}")
+    finally:
+        data.close()
+
+
+def _load(tree: DeviceTree, path: pathlib.Path) -> Dict[str, mm.metamodel.MemoryMap]:
+
+    regions: Dict[str, Dict[str, Dict]] = {}
+    name_counts: Dict[str, int] = {}
+
+    def add_region(mmap_name: str, region_name: str, address: int, size: int) -> None:
+        if size == 0:
+            return
+        # region names must be unique because links are resolved by region name
+        name_counts[region_name] = name_counts.get(region_name, 0) + 1
+        if name_counts[region_name] > 1:
+            region_name = f"{region_name} #{name_counts[region_name]}"
+        regions.setdefault(mmap_name, {})[region_name] = {"origin": hex(address), "size": hex(size)}
+
+    for index, (address, size) in enumerate(tree.reservations()):
+        add_region(reserved_map_name, f"/memreserve/ {index}", address, size)
+
+    for node in tree.walk():
+        if node.path == "/chosen":
+            start = tree.cells(*node.props["linux,initrd-start"]) if "linux,initrd-start" in node.props else None
+            end = tree.cells(*node.props["linux,initrd-end"]) if "linux,initrd-end" in node.props else None
+            if start and end:
+                add_region(reserved_map_name, "initrd", tree.number(start), tree.number(end) - tree.number(start))
+            continue
+
+        regs = tree.regs(node)
+        if not regs:
+            continue
+
+        space = tree.child_space(node.parent)
+        if node.parent.path == "/" and (node.name == "memory" or node.name.startswith("memory@")
+                                        or tree.strings(node, "device_type") == ["memory"]):
+            mmap_name = memory_map_name
+        elif node.parent.path == "/reserved-memory":
+            mmap_name = reserved_map_name
+        else:
+            mmap_name = space.name
+
+        reg_names = tree.strings(node, "reg-names")
+        for index, (address, size) in enumerate(regs):
+            region_name = node.name
+            if index < len(reg_names):
+                region_name = f"{node.name} ({reg_names[index]})"
+            translated = space.translate(address, size)
+            if translated is None:
+                logger.warning(f"{node.path}: reg {hex(address)} is outside the 'ranges' of the parent bus")
+                add_region(node.parent.path, region_name, address, size)
+            else:
+                add_region(mmap_name, region_name, translated, size)
+
+    logger.info(f"Imported {sum(len(r) for r in regions.values())} regions from {path}")
+
+    return {
+        mmap_name: mm.metamodel.MemoryMap(
+            memory_regions=mmap_regions,
+            max_address=max(int(r["origin"], 16) + int(r["size"], 16) for r in mmap_regions.values()))
+        for mmap_name, mmap_regions in regions.items()
+    }
@@ -0,0 +1,251 @@
+import logging
+import mmap
+import pathlib
+import struct
+from typing import Dict, List, NamedTuple
+
+import mm.ldmap
+import mm.metamodel
+
+logger = logging.getLogger(__name__)
+
+PT_LOAD = 1
+SHT_NOBITS = 8
+SHF_ALLOC = 0x2
+SHF_TLS = 0x400
+SHN_XINDEX = 0xffff
+
+_formats = {
+    # ELFCLASS32
+    1: {"ehdr": "HHIIIIIHHHHHH", "phdr": "IIIIIIII", "shdr": "IIIIIIIIII"},
+    # ELFCLASS64
+    2: {"ehdr": "HHIQQQIHHHHHH", "phdr": "IIQQQQQQ", "shdr": "IIQQQQIIQQ"},
+}
+"""struct formats of the ELF header (after e_ident), the program header and the section header for each ELF class"""
+
+
+class Segment(NamedTuple):
+    """A PT_LOAD program header"""
+    vaddr: int
+    paddr: int
+    filesz: int
+    memsz: int
+
+
+class Section(NamedTuple):
+    """An allocated section header"""
+    name: str
+    address: int
+    size: int
+    nobits: bool
+    """The section has no file content, e.g. .bss"""
+
+
+class ElfFile:
+    """Reads the program and section headers of an ELF file.
+    The file is memory mapped and only the header tables and the section names are read,
+    so the size of the file (e.g. debug sections) doesn't matter."""
+
+    def __init__(self, data: mmap.mmap | bytes):
+
+        if len(data) < 16 or data[:4] != b"\x7fELF":
+            raise ValueError("Not an ELF file")
+        elf_class, elf_data = data[4], data[5]
+        if elf_class not in _formats or elf_data not in (1, 2):
+            raise ValueError(f"Unsupported ELF class/data encoding: {elf_class}/{elf_data}")
+
+        self.data = data
+        """The contents of the file"""
+
+        self.is_64 = elf_class == 2
+        """ELFCLASS64, otherwise ELFCLASS32"""
+
+        endian = "<" if elf_data == 1 else ">"
+        formats = _formats[elf_class]
+        self._ehdr = struct.Struct(endian + formats["ehdr"])
+        self._phdr = struct.Struct(endian + formats["phdr"])
+        self._shdr = struct.Struct(endian + formats["shdr"])
+
+        (_, _, _, _, self._phoff, self._shoff, _, _, self._phentsize, self._phnum,
+         self._shentsize, self._shnum, self._shstrndx) = self._ehdr.unpack_from(data, 16)
+
+        # extended numbering: the real values are stored in the first section header
+        if self._shoff and (self._shnum == 0 or self._shstrndx == SHN_XINDEX or self._phnum == SHN_XINDEX):
+            _, _, _, _, _, size, link, info, _, _ = self._section_header(0)
+            if self._shnum == 0:
+                self._shnum = size
+            if self._shstrndx == SHN_XINDEX:
+                self._shstrndx = link
+            if self._phnum == SHN_XINDEX:
+                self._phnum = info
+
+    def _section_header(self, index: int) -> tuple:
+        return self._shdr.unpack_from(self.data, self._shoff + index * self._shentsize)
+
+    def _name(self, offset: int) -> str:
+        end = self.data.find(b"\0", offset)
+        if end < 0:
+            raise ValueError(f"Unterminated section name at offset {offset}")
+        return self.data[offset:end].decode("utf-8", errors="replace")
+
+    def segments(self) -> List[Segment]:
+        """The loadable segments"""
+        segments = []
+        for index in range(self._phnum):
+            fields = self._phdr.unpack_from(self.data, self._phoff + index * self._phentsize)
+            if self.is_64:
+                p_type, _, _, vaddr, paddr, filesz, memsz, _ = fields
+            else:
+                p_type, _, vaddr, paddr, filesz, memsz, _, _ = fields
+            if p_type == PT_LOAD:
+                segments.append(Segment(vaddr, paddr, filesz, memsz))
+        return segments
+
+    def sections(self) -> List[Section]:
+        """The allocated sections, i.e. those that occupy memory when the program is loaded.
+        Thread local .tbss sections are skipped because they only occupy memory in each thread's TLS block."""
+        if not self._shoff:
+            return []
+        _, _, _, _, strtab_offset, _, _, _, _, _ = self._section_header(self._shstrndx)
+
+        sections = []
+        for index in range(1, self._shnum):
+            name, sh_type, flags, address, _, size, _, _, _, _ = self._section_header(index)
+            if not flags & SHF_ALLOC:
+                continue
+            nobits = sh_type == SHT_NOBITS
+            if nobits and flags & SHF_TLS:
+                continue
+            sections.append(Section(self._name(strtab_offset + name), address, size, nobits))
+        return sections
+
+
+def load_address(address: int, size: int, segments: List[Segment]) -> int:
+    """The load address (LMA) of the section at the run address (VMA), from the segment that contains it.
+    Returns the address unchanged if no segment contains the section."""
+    for segment in segments:
+        if segment.vaddr <= address and address + size <= segment.vaddr + segment.memsz:
+            return segment.paddr + (address - segment.vaddr)
+    return address
+
+
+def load(
+        path: pathlib.Path,
+        memories: Dict[str, mm.ldmap.Memory] | None = None) -> Dict[str, mm.metamodel.MemoryMap]:
+    """Create a 'VMA' memory map of the allocated sections at their run addresses.
+    If any section is loaded at a different address (e.g. initialised data copied from flash to ram),
+    an 'LMA' memory map of the sections with file content at their load addresses is also created,
+    with each relocated section linked to its run address.
+    If the file has no section headers, the loadable segments from the program headers are used instead.
+    - memories: the linker script memory regions, e.g. from mm.ldscript.load(). 
+    If set, a bounded memory map is created for each memory region instead, 
+    containing the sections at their run addresses and the relocated sections at their load addresses."""
+
+    with path.open("rb") as fp:
+        try:
+            data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise ValueError(f"Not an ELF file: {path}")
+    try:
+        elf = ElfFile(data)
+        segments = elf.segments()
+        sections = elf.sections()
+    except struct.error:
+        raise ValueError(f"Truncated ELF file: {path}")
+    except ValueError as e:
+        raise ValueError(f"{e}: {path}")
+    finally:
+        data.close()
+
+    vma_regions: Dict[str, Dict] = {}
+    lma_regions: Dict[str, Dict] = {}
+    name_counts: Dict[str, int] = {}
+
+    def unique_name(name: str) -> str:
+        # region names must be unique because links are resolved by region name
+        name_counts[name] = name_counts.get(name, 0) + 1
+        if name_counts[name] > 1:
+            return f"{name} #{name_counts[name]}"
+        return name
+
+    if sections:
+        for section in sections:
+            if section.size == 0:
+                continue
+            name = unique_name(section.name)
+            vma_regions[name] = {"origin": hex(section.address), "size": hex(section.size)}
+            if section.nobits:
+                continue
+            lma = load_address(section.address, section.size, segments)
+            lma_regions[f"{name} (LMA)"] = {"origin": hex(lma), "size": hex(section.size)}
+            if lma != section.address:
+                lma_regions[f"{name} (LMA)"]["links"] = [("VMA", name)]
+    else:
+        for index, segment in enumerate(segments):
+            name = f"LOAD #{index}"
+            if segment.memsz:
+                vma_regions[name] = {"origin": hex(segment.vaddr), "size": hex(segment.memsz)}
+            if segment.filesz:
+                lma_regions[f"{name} (LMA)"] = {"origin": hex(segment.paddr), "size": hex(segment.filesz)}
+                if segment.paddr != segment.vaddr and segment.filesz == segment.memsz:
+                    lma_regions[f"{name} (LMA)"]["links"] = [("VMA", name)]
+
+    if memories is not None:
+        memory_maps = _split_by_memory(vma_regions, lma_regions, memories)
+        logger.info(f"Imported {sum(len(m.memory_regions) for m in memory_maps.values())} regions from {path}")
+        return memory_maps
+
+    memory_maps: Dict[str, mm.metamodel.MemoryMap] = {}
+    for mmap_name, regions in (("VMA", vma_regions), ("LMA", lma_regions)):
+        # the load addresses are only of interest if something is relocated
+        if not regions or (mmap_name == "LMA" and not any("links" in r for r in regions.values())):
+            continue
+        memory_maps[mmap_name] = mm.metamodel.MemoryMap(
+            memory_regions=regions,
+            max_address=max(int(r["origin"], 16) + int(r["size"], 16) for r in regions.values()))
+
+    logger.info(f"Imported {sum(len(m.memory_regions) for m in memory_maps.values())} regions from {path}")
+    return memory_maps
+
+
+def _split_by_memory(
+        vma_regions: Dict[str, Dict],
+        lma_regions: Dict[str, Dict],
+        memories: Dict[str, mm.ldmap.Memory]) -> Dict[str, mm.metamodel.MemoryMap]:
+    """Move the regions into a memory map for each memory region that contains them"""
+
+    def memory_for(region: Dict) -> str | None:
+        origin, size = int(region["origin"], 16), int(region["size"], 16)
+        for memory in memories.values():
+            if memory.origin <= origin and origin + size <= memory.origin + memory.length:
+                return memory.name
+        return None
+
+    regions: Dict[str, Dict[str, Dict]] = {}
+    vma_memory: Dict[str, str] = {}
+    for name, region in vma_regions.items():
+        memory_name = memory_for(region)
+        if memory_name is None:
+            logger.warning(f"Section '{name}' at {region['origin']} is outside the linker script memory regions")
+            continue
+        regions.setdefault(memory_name, {})[name] = region
+        vma_memory[name] = memory_name
+
+    # the sections that are not relocated are already shown at their run address
+    for name, region in lma_regions.items():
+        if "links" not in region:
+            continue
+        memory_name = memory_for(region)
+        _, vma_name = region["links"][0]
+        if memory_name is None or vma_name not in vma_memory:
+            continue
+        regions.setdefault(memory_name, {})[name] = {**region, "links": [(vma_memory[vma_name], vma_name)]}
+
+    return {
+        memory.name: mm.metamodel.MemoryMap(
+            memory_regions=regions[memory.name],
+            origin=memory.origin,
+            max_address=memory.origin + memory.length)
+        for memory in memories.values()
+        if memory.name in regions
+    }
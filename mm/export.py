@@ -0,0 +1,162 @@
+import csv
+import json
+import pathlib
+import sqlite3
+from typing import Any, Dict, Iterator, List, Tuple
+
+import mm.metamodel
+
+columns = ["map", "region", "origin", "size", "end", "freespace", "collisions", "links", "draw_scale"]
+"""The per-region result fields, in output order"""
+
+
+def region_results(model: mm.metamodel.Diagram) -> Iterator[Dict[str, Any]]:
+    """Yield the analysis results for each region, map by map and by ascending origin.
+    - end: the first address after the region, i.e. origin + size
+    - collisions: the colliding region names and collision addresses
+    - links: (map, region) pairs"""
+
+    for mmap_name, mmap in model.memory_maps.items():
+        for region_name, region in sorted(mmap.memory_regions.items(), key=lambda item: item[1].origin):
+            yield {
+                "map": mmap_name,
+                "region": region_name,
+                "origin": region.origin,
+                "size": region.size,
+                "end": region.origin + region.size,
+                "freespace": region.freespace,
+                "collisions": region.collisions,
+                "links": [list(link) for link in region.links],
+                "draw_scale": mmap.draw_scale,
+            }
+
+
+# json.dumps sets up a new encoder for every call, which dominates the time for small objects
+_json_str = json.encoder.encode_basestring_ascii
+
+
+def _json_collisions(collisions: Dict[str, int]) -> str:
+    if not collisions:
+        return "{}"
+    return "{" + ", ".join(f"{_json_str(name)}: {address}" for name, address in collisions.items()) + "}"
+
+
+def _json_links(links: List[List[str]]) -> str:
+    if not links:
+        return "[]"
+    return "[" + ", ".join(f"[{_json_str(link_map)}, {_json_str(link_region)}]" for link_map, link_region in links) + "]"
+
+
+def write_json(path: pathlib.Path, model: mm.metamodel.Diagram) -> None:
+    """Write the region results as a json list, one region per line"""
+    with path.open("w") as fp:
+        fp.write("[")
+        separator = "\n"
+        for result in region_results(model):
+            fp.write(
+                f'{separator}{{"map": {_json_str(result["map"])}, "region": {_json_str(result["region"])}, '
+                f'"origin": {result["origin"]}, "size": {result["size"]}, "end": {result["end"]}, '
+                f'"freespace": {result["freespace"]}, "collisions": {_json_collisions(result["collisions"])}, '
+                f'"links": {_json_links(result["links"])}, "draw_scale": {result["draw_scale"]}}}'
+            )
+            separator = ",\n"
+        fp.write("\n]\n")
+
+
+def write_csv(path: pathlib.Path, model: mm.metamodel.Diagram) -> None:
+    """Write the region results as csv. The collisions and links columns are json encoded."""
+    with path.open("w", newline="") as fp:
+        writer = csv.writer(fp)
+        writer.writerow(columns)
+        writer.writerows(
+            [
+                *(result[c] for c in columns[:6]),
+                _json_collisions(result["collisions"]),
+                _json_links(result["links"]),
+                result["draw_scale"],
+            ]
+            for result in region_results(model)
+        )
+
+
+def write_sqlite(path: pathlib.Path, model: mm.metamodel.Diagram) -> None:
+    """Write the region results to a new SQLite database.
+    - regions: one row per region. 'collides' is 1 if the region has any collisions.
+    - collisions: one row per colliding pair of regions
+    - links: one row per region link
+    The regions table is indexed on map, origin and collides."""
+
+    path.unlink(missing_ok=True)
+    db = sqlite3.connect(path)
+    try:
+        # the database is written once from scratch so durability isn't needed
+        db.execute("PRAGMA journal_mode = OFF")
+        db.execute("PRAGMA synchronous = OFF")
+        db.executescript(
+            """
+            CREATE TABLE regions (
+                map TEXT NOT NULL,
+                region TEXT NOT NULL,
+                origin INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                end INTEGER NOT NULL,
+                freespace INTEGER NOT NULL,
+                collides INTEGER NOT NULL,
+                draw_scale INTEGER NOT NULL,
+                PRIMARY KEY (map, region)
+            );
+            CREATE TABLE collisions (
+                map TEXT NOT NULL,
+                region TEXT NOT NULL,
+                other_region TEXT NOT NULL,
+                address INTEGER NOT NULL
+            );
+            CREATE TABLE links (
+                map TEXT NOT NULL,
+                region TEXT NOT NULL,
+                link_map TEXT NOT NULL,
+                link_region TEXT NOT NULL
+            );
+            """
+        )
+        # each table is streamed into one executemany, so no rows are kept in memory
+        def region_rows() -> Iterator[Tuple[str, str, int, int, int, int, int, int]]:
+            for result in region_results(model):
+                yield (
+                    result["map"],
+                    result["region"],
+                    result["origin"],
+                    result["size"],
+                    result["end"],
+                    result["freespace"],
+                    1 if result["collisions"] else 0,
+                    result["draw_scale"],
+                )
+
+        def collision_rows() -> Iterator[Tuple[str, str, str, int]]:
+            for result in region_results(model):
+                for other, address in result["collisions"].items():
+                    yield (result["map"], result["region"], other, address)
+
+        def link_rows() -> Iterator[Tuple[str, str, str, str]]:
+            for result in region_results(model):
+                for link_map, link_region in result["links"]:
+                    yield (result["map"], result["region"], link_map, link_region)
+
+        with db:
+            db.executemany("INSERT INTO regions VALUES (?, ?, ?, ?, ?, ?, ?, ?)", region_rows())
+            db.executemany("INSERT INTO collisions VALUES (?, ?, ?, ?)", collision_rows())
+            db.executemany("INSERT INTO links VALUES (?, ?, ?, ?)", link_rows())
+        # indexes are faster to build after the rows are inserted
+        with db:
+            db.executescript(
+                """
+                CREATE INDEX regions_map ON regions (map);
+                CREATE INDEX regions_origin ON regions (origin);
+                CREATE INDEX regions_collides ON regions (collides);
+                CREATE INDEX collisions_region ON collisions (map, region);
+                CREATE INDEX links_region ON links (map, region);
+                """
+            )
+    finally:
+        db.close()
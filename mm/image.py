@@ -1,17 +1,27 @@
-import typeguard
+from __future__ import annotations
+
 import random
-import PIL.Image
-import PIL.ImageDraw
-import PIL.ImageColor
-import PIL.ImageFont
-import PIL.ImageChops
+import PIL
 from typing import List, Dict, Tuple
 import logging
+import mm.axis
 import mm.metamodel
+import mm.typecheck
 import math
 import dataclasses
 import re
 
+logger = logging.getLogger(__name__)
+
+def import_pillow() -> None:
+    """Import the Pillow submodules used for drawing. This is deferred until something is drawn, 
+    so that the region data can be used without loading Pillow."""
+    import PIL.Image
+    import PIL.ImageDraw
+    import PIL.ImageFont
+    import PIL.ImageChops
+    import PIL.ImageOps
+
 @dataclasses.dataclass
 class Bbox:
     
@@ -39,7 +49,7 @@ class Point:
     def ituple(self) -> Tuple[float,float]:
         return (int(self.x), int(self.y))
     
-@typeguard.typechecked
+@mm.typecheck.typechecked
 class Image():
     """Base wrapper class for a PIL.Image.Image object"""
 
@@ -77,16 +87,18 @@ class Image():
         self.abs_pos = xy
 
         if not self.img:
-            logging.warn("Cannot access image properties yet, it is still unitialised")
+            logger.warning("Cannot access image properties yet, it is still unitialised")
         else:
             self.abs_mid_pos.x = self.abs_pos.x + (self.img.width // 2)
             self.abs_mid_pos.y = self.abs_pos.y + (self.img.height // 2)
 
     def overlay(self, dest: PIL.Image.Image, xy: Point = Point(0,0), alpha: int = 255) -> PIL.Image.Image:
         """Overlay this image onto the dest image. Return the composite image"""    
+        import_pillow()
 
         self.__init_abs_pos_data(xy)
 
+        # the mask layers are the full size of dest
         mask_layer = PIL.Image.new('RGBA', dest.size, (0,0,0,0))
         mask_layer.paste(self.img, xy.ituple())
         
@@ -97,28 +109,39 @@ class Image():
         
         return PIL.Image.alpha_composite(dest, mask_layer)
 
+    def composite_onto(self, layer: PIL.Image.Image, xy: Point) -> None:
+        """Alpha composite this image onto the layer, in place. The parts outside the layer are clipped."""
+        x, y = xy.ituple()
+        left, top = max(0, -x), max(0, -y)
+        right, bottom = min(self.img.width, layer.width - x), min(self.img.height, layer.height - y)
+        if left < right and top < bottom:
+            layer.alpha_composite(self.img, dest=(x + left, y + top), source=(left, top, right, bottom))
+
     def trim(self) -> None:
         """Detect and remove whitespace from self.img"""
+        import_pillow()
 
         bg = PIL.Image.new(self.img.mode, self.img.size, self.img.getpixel((0,0)))
         diff = PIL.ImageChops.difference(self.img, bg)
         diff = PIL.ImageChops.add(diff, diff, 2.0, -100)
         bbox = diff.getbbox()
         if bbox:
-            self.img = self.img.crop(bbox) 
+            self.img = self.img.crop(bbox)
         else:
-            logging.warning("Error trimming image")
+            logger.warning("Error trimming image")
    
-    def _pick_random_colour(self) -> Tuple[int, int, int]:
-        """Pick random RGBA colour band values"""
+    def _pick_random_colour(self, seed: str | None = None) -> Tuple[int, int, int]:
+        """Pick random RGBA colour band values. 
+        - seed: always pick the same colour for the same seed"""
+        rng = random.Random(seed) if seed is not None else random
         min_band = int("00", 16)
         max_band = int("44", 16)
-        r =random.randint(min_band, max_band)
-        g =random.randint(min_band, max_band)
-        b =random.randint(min_band, max_band)
+        r =rng.randint(min_band, max_band)
+        g =rng.randint(min_band, max_band)
+        b =rng.randint(min_band, max_band)
         return (r, g, b)
 
-@typeguard.typechecked
+@mm.typecheck.typechecked
 class MapTitleImage(Image):
     """Wrapper class for PIL.Image.Image object. Represents a MemoryMap sub diagram."""
 
@@ -134,7 +157,7 @@ class MapTitleImage(Image):
         txt_lbl =  TextLabelImage(self.name, text=self.name, font_size=font_size)
 
         generic_img = DashedRectangle(img_width, 
-                                      txt_lbl.img.height + 10, 
+                                      mm.axis.title_height(font_size), 
                                       fill=fill_colour, 
                                       line=line_colour, 
                                       dash=(8,0,8,0), 
@@ -148,7 +171,7 @@ class MapTitleImage(Image):
 
         self.img = generic_img
 
-@typeguard.typechecked
+@mm.typecheck.typechecked
 class MemoryRegionImage(Image):
     """Wrapper class for PIL.Image.Image object. Represents a MemoryRegion block."""
 
@@ -158,7 +181,9 @@ class MemoryRegionImage(Image):
                  metadata: mm.metamodel.MemoryRegion, 
                  img_width: int, 
                  font_size: int,
-                 draw_scale: int):
+                 draw_scale: int,
+                 draw: bool = True,
+                 window: Tuple[int, int] | None = None):
 
         super().__init__(name, mmap_parent)
 
@@ -168,19 +193,33 @@ class MemoryRegionImage(Image):
         self.metadata: mm.metamodel.MemoryRegion = metadata
         """instance of the pydantic metamodel class for this specific memory region"""
 
+        self.window = window
+        """The address range [start, end) being drawn, if only part of the memory map is drawn. 
+        The region block is clipped to it."""
+
         self.draw_indent = 0
         """Index counter for incrementally shrinking the drawing indent"""
+
+        self.lane = 0
+        """The column that the region is drawn in, next to the regions it overlaps. Each column is img_width wide."""
         
         if self.metadata.collisions:
             self.line = "red"
         
-        self.fill = self._pick_random_colour()
+        # the same region has the same colour in every image, e.g. in each tile of a tile pyramid
+        self.fill = self._pick_random_colour(seed=f"{mmap_parent}/{name}")
         
         self.img_width = img_width
         self.font_size = font_size  
         self.draw_scale = draw_scale  
 
-        self._draw()
+        if draw:
+            self._draw()
+
+    @property
+    def draw_x(self) -> int:
+        """The x position of the region block within the memory map image"""
+        return self.lane * self.img_width
 
     @property
     def origin_as_hex(self):
@@ -218,6 +257,41 @@ class MemoryRegionImage(Image):
         from mm.diagram import Diagram
         return self.metadata.collisions
 
+    @property
+    def address_text_size(self):
+        """ lookup address label text size from metamodel  """
+        return self.metadata.address_text_size
+
+    @property
+    def clipped_start(self) -> bool:
+        """The region starts before the window"""
+        return self.window is not None and self.origin_as_int < self.window[0]
+
+    @property
+    def clipped_end(self) -> bool:
+        """The region ends after the window"""
+        return self.window is not None and self.origin_as_int + self.size_as_int > self.window[1]
+
+    @property
+    def draw_origin(self) -> int:
+        """The address of the start of the region block"""
+        return max(self.origin_as_int, self.window[0]) if self.clipped_start else self.origin_as_int
+
+    @property
+    def origin_label(self) -> str:
+        """Text for the origin address label"""
+        label = f"0x{self.origin_as_int:X}" + " (" + f"{self.origin_as_int:,}" + ")"
+        return label + " clipped" if self.clipped_start else label
+
+    @property
+    def draw_height(self) -> int:
+        """Height of the region block in pixels. At least one pixel so that regions smaller than the scale, 
+        which are drawn individually when they collide or are linked, are still visible."""
+        draw_end = self.origin_as_int + self.size_as_int
+        if self.clipped_end:
+            draw_end = self.window[1]
+        return max(1, (draw_end - self.draw_origin) // self.draw_scale)
+
     @property
     def collisions_as_hex(self):
         """ lookup memory_region collision from metamodel  """
@@ -242,7 +316,7 @@ class MemoryRegionImage(Image):
         pre: optional text to add at the end of each newline
         """
         if not isinstance(data, Dict) and not isinstance(data, List):
-            logging.warning(f"Could not split {type(data)} into string.")
+            logger.warning(f"Could not split {type(data)} into string.")
             return f"<<unknown type: {type(data)}>>"
         if isinstance(data, dict):
             return str(newline).join( ( f"{str(pre)} {str(k)} {str(mid)} {str(v)} {str(post)}" for k, v in data.items() ) )
@@ -250,26 +324,8 @@ class MemoryRegionImage(Image):
             return str(newline).join( (str(pre) + str(item) + str(post) for item in data) )
         
     def __str__(self):
-        return (
-            "|"
-            + "<span style='color:"
-            + str(self.fill)
-            + "'>"
-            + str(self.name) + " (" + str(self.parent) + ")"
-            + "</span>|"
-            + str(self.origin_as_hex) + " (" +  str(self.origin_as_int) + ")"
-            + "|"
-            + str(self.size_as_hex) + " (" +  str(self.size_as_int) + ")"
-            + "|"
-            + str(self.freespace_as_hex) + " (" +  str(self.freespace_as_int) + ")"
-            + "|"
-            + str(self.splitdata(self.collisions_as_hex, newline="<BR>", mid="@"))
-            + "|"
-            + str(self.splitdata(self.metadata.links, newline="<BR>"))
-            + "|"
-            + str(self.draw_scale) + ":1"
-            + "|"
-        )
+        from mm.report import format_row
+        return format_row(self.parent, self.name, self.metadata, self.draw_scale, self.fill)
 
     def get_data_as_list(self) -> List:
         """Get selected instance attributes"""
@@ -286,14 +342,18 @@ class MemoryRegionImage(Image):
     def _draw(self):
         """Create the image for the region rectangle and its inset name label"""
 
-        logging.debug(self.get_data_as_list())
+        logger.debug(self.get_data_as_list())
 
-        if self.freespace_as_int < 0:
-            region_img = DashedRectangle(
-                self.img_width, int(self.size_as_hex,16) // self.draw_scale, fill=self.fill, line=self.line, dash=(0,0,8,0), stroke=2).img
+        # the clipped edges use a longer dash than the collision edge
+        dash_start = 16 if self.clipped_start else 0
+        if self.clipped_end:
+            dash_end = 16
+        elif self.freespace_as_int < 0:
+            dash_end = 8
         else:
-            region_img = DashedRectangle(
-                self.img_width, int(self.size_as_hex,16) // self.draw_scale, fill=self.fill, line=self.line, dash=(0,0,0,0), stroke=2).img
+            dash_end = 0
+        region_img = DashedRectangle(
+            self.img_width, self.draw_height, fill=self.fill, line=self.line, dash=(dash_start,0,dash_end,0), stroke=2).img
 
         # draw name text
         txt_lbl =  TextLabelImage(self.name, text=f"{self.name}", font_size=self.font_size, fill_colour="white", padding_width=10)
@@ -302,7 +362,79 @@ class MemoryRegionImage(Image):
 
         self.img = region_img
 
-@typeguard.typechecked
+@mm.typecheck.typechecked
+class AggregateRegionImage(Image):
+    """Wrapper class for PIL.Image.Image object. 
+    Represents a run of adjacent regions that are too small to draw individually, as a single density block."""
+
+    def __init__(self, 
+                 mmap_parent: str, 
+                 regions: List[MemoryRegionImage], 
+                 img_width: int, 
+                 font_size: int,
+                 draw_scale: int):
+
+        super().__init__(f"{len(regions)} regions", mmap_parent)
+
+        self.img = None
+        """Pillow image object, initialised by _draw function"""
+
+        self.regions = regions
+        """The aggregated regions, by ascending origin"""
+
+        self.origin_as_int: int = regions[0].origin_as_int
+        """Origin of the first region"""
+
+        self.size_as_int: int = max(r.origin_as_int + r.size_as_int for r in regions) - self.origin_as_int
+        """Address span from the first region origin to the furthest region end"""
+
+        self.freespace_as_int: int = regions[-1].freespace_as_int
+        """Space after the last region"""
+
+        self.address_text_size: int = regions[0].address_text_size
+        """Text size for the origin address label"""
+
+        self.draw_origin: int = self.origin_as_int
+        """The address of the start of the block"""
+
+        self.draw_x: int = 0
+        """The x position of the block within the memory map image"""
+
+        self.window: Tuple[int, int] | None = regions[0].window
+        """The address range being drawn, if only part of the memory map is drawn"""
+
+        self.line = (128, 128, 128)
+        self.img_width = img_width
+        self.font_size = font_size
+        self.draw_scale = draw_scale
+
+    @property
+    def origin_label(self) -> str:
+        """Text for the origin address label"""
+        return f"0x{self.origin_as_int:X}" + " (" + f"{len(self.regions):,} regions" + ")"
+
+    @property
+    def draw_height(self) -> int:
+        """Height of the density block in pixels. At least one pixel so that the block is always visible."""
+        return max(1, self.size_as_int // self.draw_scale)
+
+    def _draw(self):
+        """Create the density block. The fill is darker when more of the address span is used by the regions."""
+
+        used = sum(r.size_as_int for r in self.regions)
+        density = min(1.0, used / self.size_as_int) if self.size_as_int else 1.0
+        shade = int(224 - 160 * density)
+        block_img = DashedRectangle(
+            self.img_width, self.draw_height, fill=(shade, shade, shade), line=self.line, dash=(0,0,0,0), stroke=1).img
+
+        # only label the block if there is room for the text
+        txt_lbl = TextLabelImage(self.name, text=self.name, font_size=self.font_size, fill_colour="white", padding_width=10)
+        if txt_lbl.img.height + 4 <= block_img.height:
+            block_img = txt_lbl.overlay(block_img, mm.image.Point((self.img_width - txt_lbl.img.width) // 2, 2), alpha=128)
+
+        self.img = block_img
+
+@mm.typecheck.typechecked
 class VoidRegionImage(Image):
 
     def __init__(
@@ -338,7 +470,7 @@ class VoidRegionImage(Image):
         )
 
 
-@typeguard.typechecked
+@mm.typecheck.typechecked
 class TextLabelImage(Image):
     def __init__(self, 
                  parent: str,
@@ -350,6 +482,7 @@ class TextLabelImage(Image):
         
 
         super().__init__(text, parent)
+        import_pillow()
 
         self.font = PIL.ImageFont.load_default(font_size)
         """The font used to display the text"""
@@ -373,6 +506,7 @@ class TextLabelImage(Image):
         self._draw()
 
     def _draw(self):
+        import_pillow()
 
         # make the image bigger than the actual text bbox so there is plenty of space for the text
         self.img = PIL.Image.new(
@@ -392,7 +526,7 @@ class TextLabelImage(Image):
         # the final diagram image will be flipped so start with the text upside down        
         self.img = self.img.transpose(PIL.Image.FLIP_TOP_BOTTOM)
 
-@typeguard.typechecked
+@mm.typecheck.typechecked
 class ArrowBlock(Image):
     def __init__(self, 
                  src: Point,
@@ -414,6 +548,7 @@ class ArrowBlock(Image):
         """
         # We need the functions from the base class
         super().__init__("Arrow", None)
+        import_pillow()
 
         self.l = int(math.hypot((dst.x - src.x), (dst.y - src.y)))
         
@@ -437,7 +572,7 @@ class ArrowBlock(Image):
         self.midypos = arrow_body_width
 
         # image needs enough height to rotate the arrow without clipping at top and bottom...
-        self.img = PIL.Image.new("RGBA", (self.l, self.l))        
+        self.img = PIL.Image.new("RGBA", (self.l, self.l))
         # and establish relative midpoint for y axis so that arrow is drawn in the center of the image
         yzero = (self.l / 2)  - (h / 2)
 
@@ -459,7 +594,7 @@ class ArrowBlock(Image):
         # calc the hypot angle from the opp and adj vectors
         self.degs = math.degrees(math.atan2(dst.y - src.y, dst.x - src.x))        
         self.img = self.img.rotate(self.degs, resample=PIL.Image.Resampling.BICUBIC)
-        self.img = self.img.transpose(PIL.Image.FLIP_TOP_BOTTOM)  
+        self.img = self.img.transpose(PIL.Image.FLIP_TOP_BOTTOM)
         
         self.trim()
         if show_outline:
@@ -500,7 +635,7 @@ class ArrowBlock(Image):
         
 
 
-@typeguard.typechecked
+@mm.typecheck.typechecked
 class DashedRectangle(Image):
     def __init__(
             self, 
@@ -512,13 +647,14 @@ class DashedRectangle(Image):
             stroke: float = 1):
         """dash is 4-tuple of top, right, bottom, left edges, set to 0 or 1 for solid line.
         Fill is an RGBA tuple or colour string"""
+        import_pillow()
 
         top_dash = dash[0] if dash[0] > 1 else 1
         
         bottom_dot = dash[2] if dash[2] > 1 else 1
         
 
-        self.img = PIL.Image.new("RGBA", (w , h), color=fill)        
+        self.img = PIL.Image.new("RGBA", (w , h), color=fill)
         canvas = PIL.ImageDraw.Draw(self.img)
         line_center = (stroke // 2)  
         
@@ -590,11 +726,25 @@ class Table:
         else:
             return Position(args[0], args[1], args[2], args[3])
 
+    def _measure_text(self, text: str, font, line_spacing: int) -> Tuple[int, int]:
+        """Width and height of the multiline text. Same result as ImageDraw.multiline_textbbox,
+        but measured straight from the font so that no image is needed"""
+        left = right = 0
+        top = bottom = 0
+        for line_idx, line in enumerate(text.split("\n")):
+            line_left, line_top, line_right, line_bottom = font.getbbox(line)
+            if line_idx == 0:
+                left, top, right = line_left, line_top, line_right
+            left = min(left, line_left)
+            right = max(right, line_right)
+            bottom = line_bottom + line_idx * line_spacing
+        return right - left, bottom - top
+
     def get_table_img(
         self,
         table,
         header=[],
-        font=PIL.ImageFont.load_default(),
+        font: PIL.ImageFont.ImageFont | PIL.ImageFont.FreeTypeFont | None = None,
         cell_pad=(20, 10),
         margin=[10, 10],
         align=None,
@@ -605,7 +755,7 @@ class Table:
         Draw a table using only Pillow
         table:    a 2d list, must be str
         header:   turple or list, must be str
-        font:     an ImageFont object
+        font:     an ImageFont object. Default: PIL.ImageFont.load_default()
         cell_pad: padding for cell, (top_bottom, left_right)
         margin:   margin for table, css-like shorthand
         align:    None or list, 'l'/'c'/'r' for left/center/right, length must be the max count of columns
@@ -623,25 +773,30 @@ class Table:
             "red": "red",
             "green": "green",
         }
+        import_pillow()
+
+        if font is None:
+            font = PIL.ImageFont.load_default()
         _color.update(colors)
         _margin = self._position_tuple(*margin)
         
         table = table.copy()
         if header:
             table.insert(0, header)
-        row_max_hei = [0] * len(table)
+
+        # measure each unique string once. Same line spacing as ImageDraw.multiline_textbbox
+        line_spacing = font.getbbox("A")[3] + 4
+        text_sizes: Dict[str, Tuple[int, int]] = {}
+        for row in table:
+            for cell in row:
+                if cell not in text_sizes:
+                    text_sizes[cell] = self._measure_text(cell, font, line_spacing)
+
+        row_max_hei = [max((text_sizes[cell][1] for cell in row), default=0) for row in table]
         col_max_wid = [0] * len(max(table, key=len))
-        for i in range(len(table)):
-            for j in range(len(table[i])):           
-                # calculate multiline text correctly
-                left, top, right, bottom = PIL.ImageDraw.Draw(PIL.Image.new("RGBA", (0,0))).multiline_textbbox(
-                    (0,0),
-                    text=table[i][j],
-                    font=font
-                )
-
-                col_max_wid[j] = max(right - left, col_max_wid[j])
-                row_max_hei[i] = max(bottom - top, row_max_hei[i])
+        for row in table:
+            for j, cell in enumerate(row):
+                col_max_wid[j] = max(text_sizes[cell][0], col_max_wid[j])
         tab_width = sum(col_max_wid) + len(col_max_wid) * 2 * cell_pad[0]
         tab_heigh = sum(row_max_hei) + len(row_max_hei) * 2 * cell_pad[1]
         
@@ -700,6 +855,7 @@ class Table:
             fill=_color["colline"],
         )
 
+        text_lengths: Dict[str, float] = {}
         top, left = _margin.top + cell_pad[1], 0
         for i in range(len(table)):
             left = _margin.left + cell_pad[0]
@@ -715,10 +871,12 @@ class Table:
                         # if not table[i][j][0].isdigit():
                         #     table[i][j] = table[i][j].replace("-", "")   # remove the '-'
                 _left = left
+                if ((align and align[j] in ("c", "r")) or (header and i == 0)) and table[i][j] not in text_lengths:
+                    text_lengths[table[i][j]] = font.getlength(table[i][j])
                 if (align and align[j] == "c") or (header and i == 0):
-                    _left += (col_max_wid[j] - font.getlength(table[i][j])) // 2
+                    _left += (col_max_wid[j] - text_lengths[table[i][j]]) // 2
                 elif align and align[j] == "r":
-                    _left += col_max_wid[j] - font.getlength(table[i][j])
+                    _left += col_max_wid[j] - text_lengths[table[i][j]]
                 draw.text((_left, top), table[i][j], font=font, fill=color)
                 left += col_max_wid[j] + cell_pad[0] * 2
             top += row_max_hei[i] + cell_pad[1] * 2
@@ -0,0 +1,175 @@
+import logging
+import pathlib
+import re
+from typing import Dict, Iterable, Iterator, List, Literal, NamedTuple
+
+import mm.metamodel
+
+logger = logging.getLogger(__name__)
+
+_hex = r"0x[0-9a-fA-F]+"
+_memory_re = re.compile(rf"^(\S+)\s+({_hex})\s+({_hex})(?:\s+(\S+))?\s*$")
+_output_section_re = re.compile(rf"^(\S+)\s+({_hex})\s+({_hex})(?:\s+load address\s+({_hex}))?\s*$")
+_input_section_re = re.compile(rf"^ (\S+)\s+({_hex})\s+({_hex})(?:\s+(.*?))?\s*$")
+_continuation_re = re.compile(rf"^\s+({_hex})\s+({_hex})(?:\s+load address\s+({_hex}))?(?:\s+(.*?))?\s*$")
+_name_only_re = re.compile(r"^( ?)(\S+)\s*$")
+
+non_alloc_prefixes = (".debug", ".comment", ".stab", ".ARM.attributes", ".note.GNU-stack", ".gnu.attributes")
+"""Sections with these name prefixes are not loaded into memory, so they are skipped."""
+
+
+class Memory(NamedTuple):
+    """An entry in the 'Memory Configuration' listing"""
+    name: str
+    origin: int
+    length: int
+    attributes: str
+
+
+class Section(NamedTuple):
+    """An output or input section in the 'Linker script and memory map' listing"""
+    name: str
+    address: int
+    size: int
+    load_address: int | None
+    """The LMA of an output section, if it is different to the VMA"""
+    input_file: str | None
+    """The object file of an input section. None for output sections."""
+
+
+def parse(lines: Iterable[str]) -> Iterator[Memory | Section]:
+    """Parse the lines of a GNU ld map file one at a time. 
+    Yields the memory configuration entries and then the output and input sections, in file order. 
+    Input sections follow the output section that contains them. Fill and symbol lines are skipped."""
+
+    state = "start"
+    pending_name: str | None = None
+    pending_is_input = False
+    for line in lines:
+        line = line.rstrip("\r\n")
+
+        if line.startswith("Memory Configuration"):
+            state = "memory"
+            continue
+        if line.startswith("Linker script and memory map"):
+            state = "script"
+            continue
+        if line.startswith("Cross Reference Table"):
+            state = "end"
+            continue
+
+        if state == "memory":
+            match = _memory_re.match(line)
+            if match and match.group(1) not in ("Name", "*default*"):
+                yield Memory(match.group(1), int(match.group(2), 16), int(match.group(3), 16), match.group(4) or "")
+            continue
+
+        if state != "script" or not line:
+            continue
+
+        # long section names are wrapped, with the address and size on the next line
+        if pending_name is not None:
+            name, is_input, pending_name = pending_name, pending_is_input, None
+            match = _continuation_re.match(line)
+            if match:
+                address, size = int(match.group(1), 16), int(match.group(2), 16)
+                if is_input:
+                    yield Section(name, address, size, None, match.group(4) or "")
+                else:
+                    load_address = int(match.group(3), 16) if match.group(3) else None
+                    yield Section(name, address, size, load_address, None)
+                continue
+
+        if line[0] == " ":
+            match = _input_section_re.match(line)
+            if match:
+                if match.group(1) != "*fill*":
+                    yield Section(match.group(1), int(match.group(2), 16), int(match.group(3), 16), None, match.group(4) or "")
+                continue
+        else:
+            match = _output_section_re.match(line)
+            if match:
+                load_address = int(match.group(4), 16) if match.group(4) else None
+                yield Section(match.group(1), int(match.group(2), 16), int(match.group(3), 16), load_address, None)
+                continue
+
+        match = _name_only_re.match(line)
+        if match and not match.group(2).startswith(("*", "0x")):
+            pending_name = match.group(2)
+            pending_is_input = bool(match.group(1))
+
+
+def load(
+        path: pathlib.Path,
+        sections: Literal["output", "input"] = "output") -> Dict[str, mm.metamodel.MemoryMap]:
+    """Create a memory map, bounded by the origin and length, for each memory in the map file's memory configuration.
+    If there is no memory configuration, a single 'default' memory map is created.
+    - sections: use the 'output' sections (e.g. .text, .data) or the 'input' sections (e.g. .text.main from main.o) as the regions.
+    Output sections with a different load address are also added at their load address, linked to the run address.
+    The file is read one line at a time."""
+
+    memories: List[Memory] = []
+    regions: Dict[str, Dict[str, Dict]] = {}
+    name_counts: Dict[str, int] = {}
+
+    def memory_for(section_name: str, address: int, size: int) -> str | None:
+        # e.g. the debug sections are at address 0, which may be inside a memory that starts at 0
+        if section_name.startswith(non_alloc_prefixes):
+            return None
+        for memory in memories:
+            if memory.origin <= address and address + size <= memory.origin + memory.length:
+                return memory.name
+        if not memories:
+            return "default"
+        return None
+
+    def add_region(mmap_name: str, region_name: str, region: Dict) -> str:
+        # region names must be unique across all maps because links are resolved by region name
+        name_counts[region_name] = name_counts.get(region_name, 0) + 1
+        if name_counts[region_name] > 1:
+            region_name = f"{region_name} #{name_counts[region_name]}"
+        regions.setdefault(mmap_name, {})[region_name] = region
+        return region_name
+
+    with path.open("r", errors="replace") as fp:
+        for entry in parse(fp):
+            if isinstance(entry, Memory):
+                memories.append(entry)
+                continue
+
+            is_input = entry.input_file is not None
+            if entry.size == 0 or entry.name == "/DISCARD/" or is_input != (sections == "input"):
+                continue
+
+            mmap_name = memory_for(entry.name, entry.address, entry.size)
+            if mmap_name is None:
+                continue
+
+            region_name = entry.name
+            if entry.input_file:
+                region_name = f"{entry.name} ({pathlib.PurePath(entry.input_file).name})"
+            region_name = add_region(mmap_name, region_name, {"origin": hex(entry.address), "size": hex(entry.size)})
+
+            # e.g. initialised data is loaded from flash and copied to ram
+            if entry.load_address is not None and entry.load_address != entry.address:
+                load_mmap_name = memory_for(entry.name, entry.load_address, entry.size)
+                if load_mmap_name is not None:
+                    add_region(
+                        load_mmap_name,
+                        f"{region_name} (LMA)",
+                        {"origin": hex(entry.load_address), "size": hex(entry.size), "links": [(mmap_name, region_name)]})
+
+    logger.info(f"Imported {sum(len(r) for r in regions.values())} regions from {path}")
+
+    memory_maps: Dict[str, mm.metamodel.MemoryMap] = {}
+    for memory in memories:
+        if memory.name in regions:
+            memory_maps[memory.name] = mm.metamodel.MemoryMap(
+                memory_regions=regions[memory.name],
+                origin=memory.origin,
+                max_address=memory.origin + memory.length)
+    if "default" in regions:
+        memory_maps["default"] = mm.metamodel.MemoryMap(
+            memory_regions=regions["default"],
+            max_address=max(int(r["origin"], 16) + int(r["size"], 16) for r in regions["default"].values()))
+    return memory_maps
@@ -0,0 +1,233 @@
+import functools
+import logging
+import pathlib
+import re
+from typing import Dict, List, Tuple
+
+import mm.ldmap
+import mm.metamodel
+
+logger = logging.getLogger(__name__)
+
+_token_re = re.compile(
+    r"\s*(?:"
+    r"(?P<number>0[xX][0-9a-fA-F]+|[0-9][0-9a-fA-F]*[hH]|[0-9]+)(?P<unit>[KkMmGg])?(?![\w.$])"
+    r"|(?P<name>[A-Za-z_.$][\w.$]*)"
+    r"|(?P<string>\"[^\"]*\")"
+    r"|(?P<op><<|>>|[-+*/%()&|~!,:;={}])"
+    r"|(?P<other>\S)"
+    r")"
+)
+_comment_re = re.compile(r"/\*.*?\*/|//[^\n]*", re.DOTALL)
+
+_units = {"k": 1024, "m": 1024 * 1024, "g": 1024 * 1024 * 1024}
+
+_binary_ops = [
+    # lowest precedence first
+    {"|": lambda a, b: a | b},
+    {"&": lambda a, b: a & b},
+    {"<<": lambda a, b: a << b, ">>": lambda a, b: a >> b},
+    {"+": lambda a, b: a + b, "-": lambda a, b: a - b},
+    {"*": lambda a, b: a * b, "/": lambda a, b: a // b, "%": lambda a, b: a % b},
+]
+
+
+def _number(text: str, unit: str | None) -> int:
+    if text[:2] in ("0x", "0X"):
+        value = int(text, 16)
+    elif text[-1] in "hH":
+        value = int(text[:-1], 16)
+    elif len(text) > 1 and text[0] == "0":
+        value = int(text, 8)
+    else:
+        value = int(text)
+    return value * _units[unit.lower()] if unit else value
+
+
+def tokenize(text: str) -> List[Tuple[str, str]]:
+    """Split the linker script into (kind, value) tokens. Comments are removed."""
+    tokens = []
+    for match in _token_re.finditer(_comment_re.sub(" ", text)):
+        kind = match.lastgroup
+        if kind == "unit":
+            kind = "number"
+        if kind is None:
+            continue
+        if kind == "number":
+            tokens.append(("number", str(_number(match.group("number"), match.group("unit")))))
+        else:
+            tokens.append((kind, match.group(kind)))
+    return tokens
+
+
+class _Parser:
+    """Recursive descent parser for the MEMORY command and the symbol assignments at the top level of the script"""
+
+    def __init__(self, tokens: List[Tuple[str, str]]):
+        self.tokens = tokens
+        self.pos = 0
+        self.symbols: Dict[str, int] = {}
+        self.memories: Dict[str, mm.ldmap.Memory] = {}
+
+    def peek(self, offset: int = 0) -> Tuple[str, str]:
+        if self.pos + offset < len(self.tokens):
+            return self.tokens[self.pos + offset]
+        return ("end", "")
+
+    def next(self) -> Tuple[str, str]:
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def expect(self, value: str) -> None:
+        kind, token = self.next()
+        if token != value:
+            raise ValueError(f"Expected '{value}' but found '{token or kind}'")
+
+    def expression(self, level: int = 0) -> int:
+        if level == len(_binary_ops):
+            return self.unary()
+        value = self.expression(level + 1)
+        while self.peek()[0] == "op" and self.peek()[1] in _binary_ops[level]:
+            op = _binary_ops[level][self.next()[1]]
+            value = op(value, self.expression(level + 1))
+        return value
+
+    def unary(self) -> int:
+        kind, token = self.next()
+        if kind == "number":
+            return int(token)
+        if token == "-":
+            return -self.unary()
+        if token == "~":
+            return ~self.unary()
+        if token == "!":
+            return int(not self.unary())
+        if token == "(":
+            value = self.expression()
+            self.expect(")")
+            return value
+        if kind == "name":
+            if self.peek()[1] == "(":
+                return self.function(token)
+            if token in self.symbols:
+                return self.symbols[token]
+            raise ValueError(f"Undefined symbol '{token}'")
+        raise ValueError(f"Unexpected '{token or kind}' in expression")
+
+    def function(self, name: str) -> int:
+        self.expect("(")
+        if name in ("ORIGIN", "LENGTH"):
+            _, memory_name = self.next()
+            self.expect(")")
+            if memory_name not in self.memories:
+                raise ValueError(f"Undefined memory region '{memory_name}'")
+            memory = self.memories[memory_name]
+            return memory.origin if name == "ORIGIN" else memory.length
+        args = [self.expression()]
+        while self.peek()[1] == ",":
+            self.next()
+            args.append(self.expression())
+        self.expect(")")
+        if name == "ALIGN" and len(args) == 2:
+            return (args[0] + args[1] - 1) // args[1] * args[1]
+        if name in ("MAX", "MIN") and len(args) == 2:
+            return max(args) if name == "MAX" else min(args)
+        raise ValueError(f"Unsupported function '{name}'")
+
+    def memory_command(self) -> None:
+        self.expect("{")
+        while self.peek()[1] != "}":
+            kind, name = self.next()
+            if kind != "name":
+                raise ValueError(f"Expected a memory region name but found '{name or kind}'")
+            attributes = ""
+            if self.peek()[1] == "(":
+                self.next()
+                while self.peek()[1] != ")" and self.peek()[0] != "end":
+                    attributes += self.next()[1]
+                self.next()
+            self.expect(":")
+            values = {}
+            for key in ("origin", "length"):
+                kind, keyword = self.next()
+                if keyword not in {"origin": ("ORIGIN", "org", "o"), "length": ("LENGTH", "len", "l")}[key]:
+                    raise ValueError(f"Expected the {key} of memory region '{name}' but found '{keyword or kind}'")
+                self.expect("=")
+                values[key] = self.expression()
+                if key == "origin":
+                    self.expect(",")
+            self.memories[name] = mm.ldmap.Memory(name, values["origin"], values["length"], attributes)
+        self.next()
+
+    def skip_block(self) -> None:
+        depth = 0
+        while self.peek()[0] != "end":
+            token = self.next()[1]
+            if token == "{":
+                depth += 1
+            elif token == "}":
+                depth -= 1
+                if depth == 0:
+                    return
+
+    def script(self) -> None:
+        while self.peek()[0] != "end":
+            kind, token = self.peek()
+            if kind == "name" and token == "MEMORY" and self.peek(1)[1] == "{":
+                self.next()
+                self.memory_command()
+            elif kind == "name" and self.peek(1)[1] == "=":
+                self.pos += 2
+                start = self.pos
+                try:
+                    self.symbols[token] = self.expression()
+                except ValueError:
+                    # e.g. uses the location counter, which has no value outside SECTIONS
+                    logger.debug(f"Skipped the assignment to '{token}'")
+                    self.pos = start
+                while self.peek()[1] != ";" and self.peek()[0] != "end":
+                    self.next()
+            elif token == "{":
+                self.skip_block()
+            else:
+                self.next()
+
+
+def parse(text: str) -> Dict[str, mm.ldmap.Memory]:
+    """The memory regions of the MEMORY command(s) in the linker script text.
+    ORIGIN and LENGTH can be expressions using K/M/G units, the symbols assigned before the MEMORY command
+    and the ORIGIN()/LENGTH() of the memory regions defined before them."""
+    parser = _Parser(tokenize(text))
+    parser.script()
+    return parser.memories
+
+
+@functools.lru_cache(maxsize=32)
+def _load_cached(path: str, mtime_ns: int, size: int) -> Dict[str, mm.ldmap.Memory]:
+    with open(path, "r", errors="replace") as fp:
+        return parse(fp.read())
+
+
+def load(path: pathlib.Path) -> Dict[str, mm.ldmap.Memory]:
+    """The memory regions of the linker script file.
+    The results are cached until the file is modified."""
+    stat = path.stat()
+    return dict(_load_cached(str(path.resolve()), stat.st_mtime_ns, stat.st_size))
+
+
+def apply_bounds(
+        memory_maps: Dict[str, mm.metamodel.MemoryMap | Dict],
+        memories: Dict[str, mm.ldmap.Memory]) -> None:
+    """Set the origin and max address of each memory map that has the same name as a memory region.
+    The memory maps can be models or input dicts (as loaded from a JSON file)."""
+    for mmap_name, memory_map in memory_maps.items():
+        if mmap_name not in memories:
+            continue
+        memory = memories[mmap_name]
+        if isinstance(memory_map, dict):
+            memory_map["origin"] = memory.origin
+            memory_map["max_address"] = memory.origin + memory.length
+        else:
+            memory_map.origin = memory.origin
+            memory_map.max_address = memory.origin + memory.length
@@ -2,11 +2,22 @@
 import pydantic
 import pathlib
 import json
-from typing import Tuple, Literal, Union
+from typing import List, Tuple, Literal, Union
 from typing_extensions import Annotated
 import logging
 import enum
 import math
+import bisect
+import heapq
+
+import mm.axis
+import mm.profile
+
+logger = logging.getLogger(__name__)
+
+model_version = 5
+"""Increment when the analysed fields change for the same input, e.g. the freespace, collisions 
+or draw scale calculations, including the fit rules in mm.axis. This invalidates the cached models."""
 
 ColourType = Union[str | Tuple[int, int, int]]
 
@@ -23,6 +34,7 @@ class IndentScheme(str, enum.Enum):
     linear = 'linear'
     alternate = 'alternate'
     inline = 'inline'
+    lanes = 'lanes'
 
 # data model
 class MemoryRegion(ConfigParent):
@@ -78,9 +90,10 @@ class MemoryRegion(ConfigParent):
     @pydantic.field_validator("origin", "size", mode="before")
     @classmethod
     def check_empty_str(cls, v: any):
-        assert v, "Empty value found!"
+        # an int is a revalidated (or imported) value, so zero is allowed
         if isinstance(v, int):
             v = hex(v)
+        assert v, "Empty value found!"
         assert v[:2] == "0x"
         return int(v, 16)
 
@@ -121,6 +134,15 @@ class MemoryMap(ConfigParent):
             If not defined, max_address will be determined by the region data."""
         )
     ]
+    origin: Annotated[
+        int | None,
+        pydantic.Field(
+            None,
+            description="""Lowest address of the map, e.g. the ORIGIN of a linker script MEMORY region. Use hex. 
+            If defined, the map is bounded by origin and max_address: the drawing scale fits this address range 
+            and is not readjusted to the region data."""
+        )
+    ]
     max_address_taken_from_diagram_height: Annotated[
         bool,
         pydantic.Field(
@@ -130,7 +152,7 @@ class MemoryMap(ConfigParent):
         )
     ]
 
-    @pydantic.field_validator("max_address", mode="before")
+    @pydantic.field_validator("max_address", "origin", mode="before")
     @classmethod
     def convert_str_to_int(cls, v: str):
         if isinstance(v, str):
@@ -141,6 +163,19 @@ class MemoryMap(ConfigParent):
         else:
             return v
 
+    def fold_ranges(self, threshold: int) -> List[Tuple[int, int]]:
+        """The address ranges that are drawn as void regions: the space after each region 
+        with more freespace than the threshold, up to the next region or the max address"""
+        regions = sorted(self.memory_regions.values(), key=lambda region: region.origin)
+        folds = []
+        covered_end = self.origin or 0
+        for idx, region in enumerate(regions):
+            covered_end = max(covered_end, region.origin + region.size)
+            if region.freespace > threshold:
+                next_origin = regions[idx + 1].origin if idx + 1 < len(regions) else self.max_address
+                folds.append((covered_end, max(covered_end, next_origin)))
+        return folds
+
 class Diagram(ConfigParent):
 
     address_text_size: Annotated[
@@ -187,10 +222,26 @@ class Diagram(ConfigParent):
             exclude=True
         )
     ]
+    link_bundle_height: Annotated[
+        int,
+        pydantic.Field(
+            0,
+            description="""Bundle the links between the same two memory maps whose ends are in the same band of this height (pixels). 
+            Each bundle is drawn as one arrow with a count badge. Set to 0 to draw every link.""",
+            ge=0)
+    ]
     legend_width: Annotated[
         int,
         pydantic.Field(30, description="The percentage width of the diagram legend")
     ]
+    lod_threshold: Annotated[
+        int,
+        pydantic.Field(
+            1, 
+            description="""Adjacent regions smaller than this height (pixels) are drawn as a single block, labelled with the region count. 
+            Regions with collisions or links are always drawn. Set to 0 to draw every region.""", 
+            ge=0)
+    ]
     memory_maps: Annotated[
         dict[str, MemoryMap],
         pydantic.Field(..., description="MemoryMap sub-diagram contents.")
@@ -210,7 +261,8 @@ class Diagram(ConfigParent):
         IndentScheme,
         pydantic.Field(
             IndentScheme.alternate, 
-            description="Drawing indent for Memory Regions. Enabled for colliding regions only.")
+            description="""Drawing indent for Memory Regions. Enabled for colliding regions only. 
+            'lanes' draws each group of overlapping regions side by side, in the fewest columns.""")
     ]
     region_alpha: Annotated[
         int,
@@ -271,6 +323,7 @@ class Diagram(ConfigParent):
 
     @pydantic.field_validator("memory_maps")
     @classmethod
+    @mm.profile.profiled
     def check_dangling_region_links(cls, v: dict[str, MemoryMap]):
         found_memory_regions = []
         found_region_links = []
@@ -313,6 +366,7 @@ class Diagram(ConfigParent):
         return v
 
     @pydantic.model_validator(mode="after")
+    @mm.profile.profiled
     def resize_memory_maps_to_fit_diagram_width(self):
         """ Resize the multiple memory maps to fit within the diagram"""
         # assume all memory maps should always be same height as overall diagram
@@ -327,6 +381,7 @@ class Diagram(ConfigParent):
         return self
 
     @pydantic.model_validator(mode="after")
+    @mm.profile.profiled
     def set_region_text_size(self):
         """If user did not set memregion text size (default is 0) then use the diagram-wide setting"""
         memmap: MemoryMap
@@ -341,124 +396,158 @@ class Diagram(ConfigParent):
         return self
     
     @pydantic.model_validator(mode="after")
+    @mm.profile.profiled
     def calc_nearest_region(self):
         """Find the nearest neighbour region and if they have collided"""
-        logging.debug("")
-        logging.debug("Calculating distances")
-        logging.debug("---------------------")
+        logger.debug("")
+        logger.debug("Calculating distances")
+        logger.debug("---------------------")
         # process each memory map independently
         for mname, memory_map in self.memory_maps.items():
             
-            # determine if drawing scale is needed by finding if the largest memoryregion exceeds the diagram height
             # NOTE: for simplicities sake we calculate distances/freespace using the original 1:1 scale,
-            # we only scale values afterwards when they are recorded for stats purposes.
-            largest_region = 0
-            for region in memory_map.memory_regions.values():
-                if region.origin + region.size > largest_region:
-                    largest_region = region.origin + region.size
+            # the drawing scale is solved afterwards, see solve_draw_scales.
 
             # only override the max_address if its not set, then use the diagram height (because that's the only metric available)
             if not memory_map.max_address:
                 memory_map.max_address = self.height
                 memory_map.max_address_taken_from_diagram_height = True
             
-            # calc the drawing scale from whichever is the greatest: max address or the region data
-            memory_map.draw_scale = math.ceil(
-                max(largest_region, memory_map.max_address) / memory_map.height)
-
-
-            neighbour_region_list = memory_map.memory_regions.items()
-            
-            for memory_region_name, memory_region in memory_map.memory_regions.items(): 
-                non_collision_distances = {}
-
-                logging.debug(f"{memory_region_name} region:")
-                this_region_end = 0
-
-                # examine all other region distances relative to this region position
-                other_region: Tuple[str, MemoryRegion]
-                for other_region in neighbour_region_list:
-
-                    # calc the end address of this and the next other region
-                    other_region_name = other_region[0]
-                    other_region_origin = other_region[1].origin
-                    other_region_size = other_region[1].size
-
-                    this_region_end: int = memory_region.origin + memory_region.size
-                    other_region_end: int = other_region_origin + other_region_size 
-
-                    # skip calculating distance from yourself.
-                    if memory_region_name == other_region_name:
-                        continue
-
-                    # skip if 'this' region origin is ahead of the probed region end address
-                    if memory_region.origin >= other_region_end:
-                        continue
-
-                    distance_to_other_region: int = other_region_origin - this_region_end
-                    logging.debug(f"\t{hex(distance_to_other_region)} bytes to {other_region_name}")
-
-                    # collision detected
-                    if distance_to_other_region < 0:
-                        # was the region that collided into us at a lower or higher origin address
-                        if other_region_origin < memory_region.origin:
-                            # lower so use our origin address as the collion point
-                            memory_region.collisions[other_region_name] = memory_region.origin
-                        else:
-                            # higher so use their origin address as the collision point
-                            memory_region.collisions[other_region_name] = other_region_origin
-
-                        # no distance left
-                        if memory_region.origin < other_region_origin:
-                            memory_region.freespace = distance_to_other_region
 
+            names = list(memory_map.memory_regions)
+            regions = list(memory_map.memory_regions.values())
+            origins = [region.origin for region in regions]
+            ends = [region.origin + region.size for region in regions]
+            collisions = _find_collisions(origins, ends)
+            ahead = _Ahead(origins, ends)
+
+            for idx, (memory_region_name, memory_region) in enumerate(zip(names, regions)):
+                this_region_end = ends[idx]
+                collided = bool(memory_region.collisions or collisions[idx])
+
+                # the collision point is the higher of the two origins, in the input order of the regions
+                for other in collisions[idx]:
+                    memory_region.collisions[names[other]] = max(origins[idx], origins[other])
+                logger.debug(f"{memory_region_name} region:")
+                logger.debug(f"\tCollisions - {memory_region.collisions}")
+
+                if not collided:
+                    # the distance to the nearest region ahead of this one, if any
+                    nearest = ahead.nearest(idx)
+                    if nearest is not None:
+                        freespace = origins[nearest] - this_region_end
                     else:
-                        # record the distance for later 
-                        non_collision_distances[other_region_name] = distance_to_other_region
-                        # set a first value while we have it (in case there are no future collisions)
-                        if not memory_region.freespace and not memory_region.collisions:
-                            memory_region.freespace = distance_to_other_region
-                        # if remain not already set to no distance left then set the positive remain distance
-                        elif not memory_region.freespace:
-                            memory_region.freespace = distance_to_other_region
-
-
-                logging.debug(f"\tCollisions - {memory_region.collisions}")
-
-                # after probing each region we must now pick the lowest distance
-                if not memory_region.collisions:
-                    if non_collision_distances:
-                        # there are other regions ahead of this one, so find the nearest one
-                        lowest = min(non_collision_distances, key=non_collision_distances.get)
-                        memory_region.freespace = non_collision_distances[lowest]
+                        freespace = memory_map.max_address - this_region_end
+                else:
+                    # no distance left: measured to the last region, in input order, that starts inside this one
+                    higher = [other for other in collisions[idx] if origins[other] > origins[idx]]
+                    if higher:
+                        freespace = origins[higher[-1]] - this_region_end
+                    elif memory_region.freespace:
+                        freespace = memory_region.freespace
                     else:
-                        # there are no regions ahead of this one
-                        memory_region.freespace = memory_map.max_address - (this_region_end)
-                elif memory_region.collisions and not memory_region.freespace:
-                    memory_region.freespace = memory_map.max_address - (this_region_end)
+                        # otherwise the first region, in input order, that leaves a gap after this one
+                        first = ahead.first_after(this_region_end)
+                        freespace = origins[first] - this_region_end if first is not None else 0
+                    if not freespace:
+                        freespace = memory_map.max_address - this_region_end
+                memory_region.freespace = freespace
 
                 # if this region collides with diagram max address then add it and override the freespace variable
                 if memory_region.origin + memory_region.size > memory_map.max_address:
                     memory_region.collisions['end'] = memory_map.max_address
                     memory_region.freespace = memory_map.max_address - (memory_region.origin + memory_region.size)
-                    
 
-                # the user-defined max_address field has created an excessive amount of empty space, clamp it to the region data usage instead
-                if memory_region.freespace > self.height:
-                    logging.warning(f"'{mname}' Region freespace exceeds diagram height: {memory_region.freespace} > {self.height}.")
-                    logging.warning(f"You have set your 'max_address' to {memory_map.max_address} but none of your regions are using the excessive empty space this has created.")
-                    logging.warning(f"Drawing ratio (1:{str(memory_map.draw_scale)}) will be readjusted.")
-                    memory_map.draw_scale = math.ceil((largest_region) / memory_map.height)
-                    # if the 'draw_scale' means we end up close to the diagram top edge 
-                    # then add some space for a voidregion (if any)
-                    if math.ceil(largest_region / memory_map.draw_scale) >= memory_map.height:
-                        memory_map.draw_scale = math.ceil((largest_region + (800000)) / memory_map.height)
-                    
-                    logging.warning(f"Recalculating drawing ratio: (1:{str(memory_map.draw_scale)})")
+                # likewise if the region starts below the origin of a bounded map
+                if memory_map.origin is not None and memory_region.origin < memory_map.origin:
+                    memory_region.collisions['start'] = memory_map.origin
 
+        self.solve_draw_scales()
         return self
 
+    def solve_draw_scales(self) -> None:
+        """Set the drawing scale of each memory map, once the freespace of the regions is known. 
+        The space after each region with more freespace than the threshold is drawn as a void region, 
+        so the scale fits the rest of the address range, and the void regions, into the map height below its title. 
+        This is the scale that the diagram, the table and every report use. A bounded map, e.g. a linker script memory region, is drawn to the scale of its address range instead.
+        The maps that needed folding, or that don't fit, are reported in a single log message."""
+        notes = []
+        for mname, memory_map in self.memory_maps.items():
+            map_origin = memory_map.origin or 0
+            map_end = max([memory_map.max_address] + [region.origin + region.size for region in memory_map.memory_regions.values()])
+            span = map_end - map_origin
+            height = mm.axis.regions_height(memory_map.height, self.text_size)
+            if memory_map.origin is not None:
+                memory_map.draw_scale = max(1, math.ceil(span / height))
+                continue
+
+            folds = memory_map.fold_ranges(self.threshold)
+            fold_pixels = mm.axis.fold_height(self.text_size)
+            memory_map.draw_scale = mm.axis.fit_draw_scale(span, folds, height, fold_pixels)
+
+            # e.g. the max address is well beyond the regions
+            folded_height = max((end - start for start, end in folds), default=0)
+            fits = mm.axis.laid_out_height(span, folds, memory_map.draw_scale, fold_pixels) <= height
+            if folded_height > height or not fits:
+                notes.append(
+                    f"'{mname}' 1:{memory_map.draw_scale} ({len(folds)} void regions"
+                    f"{'' if fits else ', which leave too little height for the regions'})")
+
+        if notes:
+            logger.warning(
+                f"Drawing scales fitted to the diagram height ({self.height}px), with the empty space drawn as void regions: " 
+                + ", ".join(notes))
+
     
+def _find_collisions(origins: List[int], ends: List[int]) -> List[List[int]]:
+    """The indexes of the regions that overlap each region, ascending. Two regions overlap if each starts before the other ends.
+    The regions are swept in origin order, keeping the regions that are still open in a heap by end address, 
+    so the cost is O(n log n) plus the number of collisions."""
+    collisions: List[List[int]] = [[] for _ in origins]
+    # (end, index) of the regions that end after the current origin
+    active: List[Tuple[int, int]] = []
+    for idx in sorted(range(len(origins)), key=lambda idx: origins[idx]):
+        while active and active[0][0] <= origins[idx]:
+            heapq.heappop(active)
+        for _, other in active:
+            # an empty region at the other region's origin is not inside it
+            if origins[other] < ends[idx]:
+                collisions[idx].append(other)
+                collisions[other].append(idx)
+        if ends[idx] > origins[idx]:
+            heapq.heappush(active, (ends[idx], idx))
+    for other_list in collisions:
+        other_list.sort()
+    return collisions
+
+
+class _Ahead:
+    """Finds the regions ahead of a region by bisecting the region origins, in ascending order"""
+
+    def __init__(self, origins: List[int], ends: List[int]):
+        self.origins = origins
+        self.ends = ends
+        self.order = sorted(range(len(origins)), key=lambda idx: origins[idx])
+        self.sorted_origins = [origins[idx] for idx in self.order]
+        # the lowest index of the regions from each position of the order onwards
+        self.first_index = self.order + [len(origins)]
+        for pos in range(len(self.order) - 2, -1, -1):
+            self.first_index[pos] = min(self.first_index[pos], self.first_index[pos + 1])
+
+    def nearest(self, idx: int) -> int | None:
+        """The region with the lowest origin at or after the end of the region idx. 
+        An empty region is not ahead of another empty region at the same address."""
+        pos = bisect.bisect_left(self.sorted_origins, self.ends[idx])
+        while pos < len(self.order) and (self.order[pos] == idx or self.ends[self.order[pos]] <= self.origins[idx]):
+            pos += 1
+        return self.order[pos] if pos < len(self.order) else None
+
+    def first_after(self, address: int) -> int | None:
+        """The region with the lowest index that starts after the address"""
+        pos = bisect.bisect_right(self.sorted_origins, address)
+        return self.first_index[pos] if pos < len(self.order) else None
+
+
 # helper functions
 def generate_schema(path: pathlib.Path):
     myschema = Diagram.model_json_schema()
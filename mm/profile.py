@@ -0,0 +1,189 @@
+import contextlib
+import functools
+import json
+import os
+import pathlib
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+
+class Profiler:
+    """Records timing spans around the stages of the diagram pipeline.
+    Each span also counts the PIL images allocated while it was open, including those of any nested spans."""
+
+    def __init__(self, trace_memory: bool = False):
+
+        self.spans: List[Dict[str, Any]] = []
+        """Completed spans, in order of completion"""
+
+        self.start_time = time.perf_counter()
+        """Span start times are relative to this"""
+
+        self.trace_memory = trace_memory
+        """Record the peak tracemalloc usage of each span, and the peak RSS of the process when the span ends. 
+        tracemalloc must be started by the caller. The tracemalloc peak is process-wide so only profile one thread at a time."""
+
+        self.images = 0
+        """Total number of PIL images allocated while profiling"""
+
+        self.image_bytes = 0
+        """Total uncompressed size of the PIL images allocated while profiling"""
+
+        self._local = threading.local()
+        """Stack of the open span records for each thread"""
+
+    def _stack(self) -> List[Dict[str, Any]]:
+        return self._local.__dict__.setdefault("stack", [])
+
+    def _update_peaks(self, stack: List[Dict[str, Any]]) -> None:
+        """Fold the tracemalloc peak since the last reset into every open span, then reset the peak"""
+        _, traced_peak = tracemalloc.get_traced_memory()
+        for record in stack:
+            record["_traced_peak"] = max(record["_traced_peak"], traced_peak)
+        tracemalloc.reset_peak()
+
+    @contextlib.contextmanager
+    def span(self, name: str, **args):
+        """Record the time taken by the body of the 'with' statement. Extra keyword args are stored with the span."""
+
+        stack = self._stack()
+        record = {
+            "name": name,
+            "parent": stack[-1]["name"] if stack else None,
+            "depth": len(stack),
+            "thread": threading.get_ident(),
+            "args": args,
+            "images": 0,
+            "image_bytes": 0,
+        }
+        if self.trace_memory:
+            self._update_peaks(stack)
+            record["_traced_start"], _ = tracemalloc.get_traced_memory()
+            record["_traced_peak"] = record["_traced_start"]
+
+        stack.append(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            end = time.perf_counter()
+            if self.trace_memory:
+                self._update_peaks(stack)
+            stack.pop()
+            record["start_s"] = start - self.start_time
+            record["duration_s"] = end - start
+            if self.trace_memory:
+                record["peak_traced_bytes"] = record.pop("_traced_peak") - record.pop("_traced_start")
+                record["peak_rss_bytes"] = read_peak_rss()
+            if stack:
+                stack[-1]["images"] += record["images"]
+                stack[-1]["image_bytes"] += record["image_bytes"]
+            self.spans.append(record)
+
+    def add_image(self, img) -> None:
+        """Count a newly allocated PIL image against the innermost open span"""
+        size = image_bytes(img)
+        self.images += 1
+        self.image_bytes += size
+        stack = self._stack()
+        if stack:
+            stack[-1]["images"] += 1
+            stack[-1]["image_bytes"] += size
+
+    def save_json(self, path: pathlib.Path) -> None:
+        """Save the spans as a json list, ordered by start time"""
+        with path.open("w") as fp:
+            json.dump(sorted(self.spans, key=lambda s: s["start_s"]), fp, indent=2, default=str)
+
+    def save_chrome_trace(self, path: pathlib.Path) -> None:
+        """Save the spans in the Chrome trace event format. Open the file with chrome://tracing or ui.perfetto.dev"""
+        pid = os.getpid()
+        events = [
+            {
+                "name": s["name"],
+                "cat": "mm",
+                "ph": "X",
+                "ts": s["start_s"] * 1e6,
+                "dur": s["duration_s"] * 1e6,
+                "pid": pid,
+                "tid": s["thread"],
+                "args": {
+                    **s["args"],
+                    **{k: s[k] for k in ("images", "image_bytes", "peak_traced_bytes", "peak_rss_bytes") if k in s},
+                },
+            }
+            for s in self.spans
+        ]
+        with path.open("w") as fp:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, fp, default=str)
+
+
+def image_bytes(img) -> int:
+    """Uncompressed size of a PIL image"""
+    return img.width * img.height * len(img.getbands())
+
+
+def read_peak_rss() -> int | None:
+    """Peak resident set size (bytes) of the process so far. It never decreases, 
+    so a span only raised it if it is higher than at the end of the previous span. Not available on Windows."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes, except on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+active: Profiler | None = None
+"""The profiler used by span(). Profiling is disabled when this is None."""
+
+
+@contextlib.contextmanager
+def profiling(profiler: Profiler | None):
+    """Make the profiler active for the body of the 'with' statement. Does nothing if the profiler is None.
+    While it is active every PIL image allocation is counted, see add_image, 
+    because Image._new creates the result of every Pillow operation."""
+    global active
+    if profiler is None:
+        yield None
+        return
+
+    import PIL.Image
+    previous, original_new = active, PIL.Image.Image._new
+
+    @functools.wraps(original_new)
+    def counted_new(self, im):
+        img = original_new(self, im)
+        if active is not None:
+            active.add_image(img)
+        return img
+
+    active = profiler
+    PIL.Image.Image._new = counted_new
+    try:
+        yield profiler
+    finally:
+        PIL.Image.Image._new = original_new
+        active = previous
+
+
+def span(name: str, **args):
+    """Context manager that records a span with the active profiler, if any"""
+    if active is None:
+        return contextlib.nullcontext()
+    return active.span(name, **args)
+
+
+def profiled(func: Callable) -> Callable:
+    """Decorator that records a span, named after the function, for every call"""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with span(func.__qualname__):
+            return func(*args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,105 @@
+import heapq
+from typing import Dict, Iterator, List, TextIO, Tuple
+
+import mm.clusters
+import mm.metamodel
+
+cluster_name_limit = 8
+"""The most region names listed for each collision cluster"""
+
+
+def sorted_regions(model: mm.metamodel.Diagram) -> Iterator[Tuple[str, str, mm.metamodel.MemoryRegion]]:
+    """Yield (map name, region name, region) for every region in the model, by descending origin.
+    Each map is sorted separately, which is linear for region data that is already in order,
+    and then the maps are merged lazily. Regions with the same origin keep the input order."""
+
+    def by_origin(mmap_name: str, mmap: mm.metamodel.MemoryMap):
+        regions = sorted(mmap.memory_regions.items(), key=lambda item: item[1].origin, reverse=True)
+        return ((mmap_name, region_name, region) for region_name, region in regions)
+
+    yield from heapq.merge(
+        *(by_origin(mmap_name, mmap) for mmap_name, mmap in model.memory_maps.items()),
+        key=lambda item: item[2].origin,
+        reverse=True
+    )
+
+
+def format_row(
+        mmap_name: str,
+        region_name: str,
+        region: mm.metamodel.MemoryRegion,
+        draw_scale: int,
+        colour: mm.metamodel.ColourType | None = None) -> str:
+    """Markdown table row for the region. The name is coloured to match the diagram, if a colour is given."""
+
+    name = f"{region_name} ({mmap_name})"
+    if colour is not None:
+        name = f"<span style='color:{colour}'>{name}</span>"
+    collisions = "<BR>".join(f" {k} @ {hex(v)} " for k, v in region.collisions.items())
+    links = "<BR>".join(str(link) for link in region.links)
+    return (
+        f"|{name}"
+        f"|{hex(region.origin)} ({region.origin})"
+        f"|{hex(region.size)} ({region.size})"
+        f"|{hex(region.freespace)} ({region.freespace})"
+        f"|{collisions}"
+        f"|{links}"
+        f"|{draw_scale}:1|"
+    )
+
+
+def write_markdown(
+        fp: TextIO,
+        model: mm.metamodel.Diagram,
+        image_links: List[str] | None = None,
+        colours: Dict[Tuple[str, str], mm.metamodel.ColourType] | None = None,
+        clusters: Dict[str, List[mm.clusters.Cluster]] | None = None) -> None:
+    """Write the markdown report for the analysed model, one row at a time.
+    - image_links: markdown lines written before the table, e.g. links to the diagram and table images.
+    - colours: region name colours, keyed by (map name, region name)
+    - clusters: the collision clusters of each memory map, summarised after the table"""
+
+    colours = colours or {}
+    for line in image_links or []:
+        fp.write(f"{line}\n")
+    fp.write("|region (parent)|origin|size|free Space|collisions|links|draw scale|\n")
+    fp.write("|:-|:-|:-|:-|:-|:-|:-|\n")
+    for mmap_name, region_name, region in sorted_regions(model):
+        row = format_row(
+            mmap_name,
+            region_name,
+            region,
+            model.memory_maps[mmap_name].draw_scale,
+            colours.get((mmap_name, region_name)))
+        fp.write(f"{row}\n")
+    fp.write("\n---")
+    for mmap_name, mmap in model.memory_maps.items():
+        fp.write(f"\n#### {mmap_name}:")
+        if mmap.origin is not None:
+            fp.write(f"\n- origin = 0x{mmap.origin:X} ({mmap.origin:,})")
+        fp.write(f"\n- max address = 0x{mmap.max_address:X} ({mmap.max_address:,})")
+        fp.write(f"\n- {'Calculated from region data' if mmap.max_address_taken_from_diagram_height else 'User-defined input'}")
+    if clusters:
+        write_clusters(fp, clusters)
+
+
+def write_clusters(fp: TextIO, clusters: Dict[str, List[mm.clusters.Cluster]]) -> None:
+    """Write a table row for each collision cluster. The depth is the most regions that overlap at one address."""
+    fp.write("\n\n---\n#### Collision clusters:\n")
+    fp.write("\n|parent|cluster|address range|size|regions|depth|names|\n")
+    fp.write("|:-|:-|:-|:-|:-|:-|:-|\n")
+    for mmap_name, mmap_clusters in clusters.items():
+        for cluster_idx, cluster in enumerate(mmap_clusters):
+            names = ", ".join(cluster.regions[:cluster_name_limit])
+            if len(cluster.regions) > cluster_name_limit:
+                names += f", ... (+{len(cluster.regions) - cluster_name_limit})"
+            fp.write(
+                f"|{mmap_name}"
+                f"|{cluster_idx + 1}"
+                f"|0x{cluster.start:X} - 0x{cluster.end:X}"
+                f"|{hex(cluster.end - cluster.start)} ({cluster.end - cluster.start})"
+                f"|{len(cluster.regions)}"
+                f"|{cluster.depth}"
+                f"|{names}|\n")
+    if not any(clusters.values()):
+        fp.write("\nNo collisions\n")
@@ -0,0 +1,169 @@
+import argparse
+import concurrent.futures
+import json
+import logging
+import math
+import os
+import pathlib
+from typing import Dict, List, NamedTuple, Set, Tuple
+
+import mm.metamodel
+import mm.profile
+import mm.window
+
+logger = logging.getLogger(__name__)
+
+manifest_format = "mm-tiles"
+"""Identifies a tile pyramid manifest"""
+
+manifest_version = 1
+"""Increment when the layout of the manifest or the tile paths change"""
+
+manifest_name = "manifest.json"
+
+_link_targets: Set[Tuple[str, str]] = set()
+"""The link targets of the model, found once per process by _init_worker instead of once per tile"""
+
+_tile_maps: Dict[str, mm.metamodel.MemoryMap] = {}
+"""The memory maps resized to the tile size, by name. Shared by the tiles of each map."""
+
+
+class TileLevel(NamedTuple):
+    """A zoom level of a memory map. Each tile covers tile_size * draw_scale addresses."""
+    level: int
+    draw_scale: int
+    rows: int
+
+
+class Tile(NamedTuple):
+    """A tile to draw. Row 0 starts at the lowest address of the map."""
+    mmap_name: str
+    level: int
+    row: int
+    window: mm.window.Window
+    path: pathlib.Path
+
+
+def map_bounds(memory_map: mm.metamodel.MemoryMap) -> mm.window.Window:
+    """The address range of the map, including any regions outside the origin or max address"""
+    start = memory_map.origin or 0
+    end = memory_map.max_address
+    for region in memory_map.memory_regions.values():
+        start = min(start, region.origin)
+        end = max(end, region.origin + region.size)
+    return mm.window.Window(start, max(end, start + 1))
+
+
+def tile_levels(bounds: mm.window.Window, tile_size: int, max_levels: int) -> List[TileLevel]:
+    """The zoom levels of a map. Level 0 fits the map into one tile,
+    each following level halves the draw scale, until the scale is 1:1 or there are max_levels levels."""
+    span = bounds.end - bounds.start
+    top_scale = max(1, math.ceil(span / tile_size))
+    levels = []
+    for level in range(max_levels):
+        draw_scale = max(1, math.ceil(top_scale / (1 << level)))
+        levels.append(TileLevel(level, draw_scale, math.ceil(span / (tile_size * draw_scale))))
+        if draw_scale == 1:
+            break
+    return levels
+
+
+def content_rows(index: mm.window.RegionIndex, bounds: mm.window.Window, tile_span: int, rows: int) -> List[int]:
+    """The rows of a level that overlap at least one region. The other tiles are empty so they are not drawn."""
+    found = []
+    next_row = 0
+    for start, end in zip(index.origins, index.ends):
+        if end <= start:
+            continue
+        first = max(next_row, (start - bounds.start) // tile_span)
+        last = min(rows - 1, (end - 1 - bounds.start) // tile_span)
+        if first <= last:
+            found.extend(range(first, last + 1))
+            next_row = last + 1
+    return found
+
+
+def _init_worker(model: mm.metamodel.Diagram, pargs: argparse.Namespace, process: bool = True) -> None:
+    """Set up the diagram state in each worker process. 
+    This is also needed in the main process when it is running mm.diagram as __main__, 
+    because the class state is then set on a different module object."""
+    import mm.diagram
+    mm.diagram.Diagram.model = model
+    mm.diagram.Diagram.pargs = pargs
+    _link_targets.clear()
+    _link_targets.update(mm.diagram.Diagram._link_targets(model))
+    _tile_maps.clear()
+    if process:
+        mm.profile.active = None
+
+
+def _draw_tile(tile: Tile, tile_size: int) -> None:
+    import mm.diagram
+    memory_map = _tile_maps.get(tile.mmap_name)
+    if memory_map is None:
+        memory_map = mm.diagram.Diagram.model.memory_maps[tile.mmap_name].model_copy(
+            update={"width": tile_size, "height": tile_size})
+        _tile_maps[tile.mmap_name] = memory_map
+    mmd = mm.diagram.MemoryMapDiagram(
+        {tile.mmap_name: memory_map}, window=tile.window, tile=True, link_targets=_link_targets)
+    tile.path.parent.mkdir(parents=True, exist_ok=True)
+    mmd.img.save(tile.path)
+
+
+def _draw_tiles(tiles: List[Tuple[Tile, int]]) -> None:
+    for tile, tile_size in tiles:
+        _draw_tile(tile, tile_size)
+
+
+def write_pyramid(
+        model: mm.metamodel.Diagram,
+        pargs: argparse.Namespace,
+        out_dir: pathlib.Path,
+        tile_size: int = 512,
+        max_levels: int = 8,
+        workers: int | None = None) -> Dict:
+    """Draw each memory map as a multi-resolution tile pyramid and write the manifest. Return the manifest.
+    The tiles are saved as '<map path>/<level>/<row>.png', each tile_size x tile_size pixels.
+    Only the tiles that overlap a region are drawn, in parallel when there is more than one worker.
+    - pargs: the command line arguments, used by the workers to draw the tiles
+    - workers: the number of worker processes. Default: the number of CPUs"""
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest = {
+        "format": manifest_format,
+        "version": manifest_version,
+        "name": model.name,
+        "tile_size": tile_size,
+        "maps": [],
+    }
+    tiles: List[Tile] = []
+    for mmap_idx, (mmap_name, memory_map) in enumerate(model.memory_maps.items()):
+        # the map names can contain path separators, e.g. device tree node paths
+        map_path = f"map{mmap_idx}"
+        bounds = map_bounds(memory_map)
+        index = mm.window.region_index(memory_map.memory_regions)
+        map_manifest = {"name": mmap_name, "path": map_path, "origin": bounds.start, "end": bounds.end, "levels": []}
+        for level in tile_levels(bounds, tile_size, max_levels):
+            tile_span = tile_size * level.draw_scale
+            rows = content_rows(index, bounds, tile_span, level.rows)
+            map_manifest["levels"].append({**level._asdict(), "tiles": rows})
+            for row in rows:
+                window = mm.window.Window(bounds.start + row * tile_span, bounds.start + (row + 1) * tile_span)
+                tiles.append(Tile(mmap_name, level.level, row, window, out_dir / map_path / str(level.level) / f"{row}.png"))
+        manifest["maps"].append(map_manifest)
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tiles) == 1:
+        _init_worker(model, pargs, process=False)
+        _draw_tiles([(tile, tile_size) for tile in tiles])
+    else:
+        # a few tiles per task, interleaved so that each task gets a mix of levels
+        batches = [[(tile, tile_size) for tile in tiles[idx::workers * 4]] for idx in range(min(len(tiles), workers * 4))]
+        with concurrent.futures.ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(model, pargs)) as executor:
+            for _ in executor.map(_draw_tiles, batches):
+                pass
+
+    with (out_dir / manifest_name).open("w") as fp:
+        json.dump(manifest, fp, indent=2)
+    logger.info(f"Created {len(tiles)} tiles in {out_dir}")
+    return manifest
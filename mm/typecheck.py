@@ -0,0 +1,40 @@
+import functools
+import os
+
+production_env_var = "MMDIAGRAM_PRODUCTION"
+"""Set this environment variable to '1' before importing mm to skip the typeguard instrumentation"""
+
+production: bool = os.environ.get(production_env_var, "").strip().lower() not in ("", "0", "false", "no")
+"""Production mode. The classes are not instrumented by typeguard, so there are no run-time type checks."""
+
+
+def typechecked(target):
+    """Instrument the target with typeguard.typechecked, unless in production mode.
+    typeguard recompiles the module source for every method, so a class is only instrumented when it is
+    first instantiated: importing mm doesn't pay for the classes that a run never uses, e.g. the drawing classes
+    when only the markdown is written. The class and static methods aren't checked until then.
+    Production mode is read when the module is imported, so it can't be changed afterwards.
+    Use typeguard.suppress_type_checks() to turn off the checks of classes that are already instrumented."""
+    if production:
+        return target
+    if not isinstance(target, type):
+        import typeguard
+        return typeguard.typechecked(target)
+
+    init = target.__dict__.get("__init__")
+
+    @functools.wraps(init or target.__init__)
+    def __init__(self, *args, **kwargs):
+        import typeguard
+
+        # another thread may have got here first
+        if target.__dict__.get("__init__") is __init__:
+            if init is None:
+                del target.__init__
+            else:
+                target.__init__ = init
+            typeguard.typechecked(target)
+        target.__init__(self, *args, **kwargs)
+
+    target.__init__ = __init__
+    return target
@@ -0,0 +1,62 @@
+import bisect
+import collections
+import itertools
+from typing import Dict, List, NamedTuple, Tuple
+
+import mm.metamodel
+import mm.typecheck
+
+
+class Window(NamedTuple):
+    """An address range [start, end) of a memory map"""
+    start: int
+    end: int
+
+
+@mm.typecheck.typechecked
+class RegionIndex:
+    """Finds the regions of a memory map that overlap an address range, without scanning every region.
+    The regions are sorted by origin. The running maximum of the region end addresses is non-decreasing,
+    so the first region that can reach into the range is found by bisecting it,
+    and the last by bisecting the origins."""
+
+    def __init__(self, memory_regions: Dict[str, mm.metamodel.MemoryRegion]):
+
+        ordered = sorted(memory_regions.items(), key=lambda item: item[1].origin)
+
+        self.names: List[str] = [name for name, _ in ordered]
+        """Region names, by ascending origin"""
+
+        self.origins: List[int] = [region.origin for _, region in ordered]
+        """Region origins, ascending"""
+
+        self.ends: List[int] = [region.origin + region.size for _, region in ordered]
+        """Region end addresses, in the same order"""
+
+        self.max_ends: List[int] = list(itertools.accumulate(self.ends, max))
+        """The largest end address of the regions up to and including each index"""
+
+    def query(self, window: Window) -> List[str]:
+        """The names of the regions that overlap the window, by ascending origin"""
+        lo = bisect.bisect_right(self.max_ends, window.start)
+        hi = bisect.bisect_left(self.origins, window.end)
+        return [self.names[idx] for idx in range(lo, hi) if self.ends[idx] > window.start]
+
+
+_index_cache: "collections.OrderedDict[int, Tuple[Dict, RegionIndex]]" = collections.OrderedDict()
+"""The most recently used region indexes, by the id of their regions dict"""
+
+
+def region_index(memory_regions: Dict[str, mm.metamodel.MemoryRegion]) -> RegionIndex:
+    """The index of the regions, reused while the same regions dict is queried again, e.g. for each tile of a map"""
+    key = id(memory_regions)
+    cached = _index_cache.get(key)
+    # the dict is stored with the index so that its id can't be reused by another dict
+    if cached is not None and cached[0] is memory_regions and len(cached[1].names) == len(memory_regions):
+        _index_cache.move_to_end(key)
+        return cached[1]
+    index = RegionIndex(memory_regions)
+    _index_cache[key] = (memory_regions, index)
+    if len(_index_cache) > 8:
+        _index_cache.popitem(last=False)
+    return index
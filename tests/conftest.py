@@ -0,0 +1,4 @@
+import os
+
+# the test suite always runs with the typeguard run-time type checks
+os.environ.pop("MMDIAGRAM_PRODUCTION", None)
@@ -49,10 +49,13 @@ def test_setup(request):
     table_image.unlink(missing_ok=True)
 
     json_file = pathlib.Path(f"{request.param['file_path']}.json")
-    table_image.unlink(missing_ok=True)
+    json_file.unlink(missing_ok=True)
+
+    model_json = pathlib.Path(f"{request.param['file_path']}_model.json")
+    model_json.unlink(missing_ok=True)
 
     # send the path variables back to the calling unit test function
-    yield {"report": report, "diagram_image": diagram_image, "table_image": table_image, "json_file": json_file}
+    yield {"report": report, "diagram_image": diagram_image, "table_image": table_image, "json_file": json_file, "model_json": model_json}
 
     # finally add the generated files for this test to the examples.md file
     append_to_examples_md_file(request.param)
@@ -0,0 +1,5 @@
+int counter = 5;
+int table[4] = {1, 2, 3, 4};
+int zeroed[64];
+const char message[] = "hello";
+void _start(void) { counter += table[1] + zeroed[2] + message[0]; for(;;); }
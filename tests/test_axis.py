@@ -0,0 +1,197 @@
+import json
+import logging
+import random
+import unittest
+import PIL.Image
+import pytest
+
+from tests.fixtures.common import test_setup
+
+import mm.axis
+import mm.diagram
+import mm.image
+import mm.metamodel
+
+
+def test_axis_to_scale():
+    axis = mm.axis.AddressAxis(0x1000, 4)
+    assert axis.pixel(0x1000) == 0
+    assert axis.pixel(0x1400) == 0x100
+    # below the origin is extrapolated
+    assert axis.pixel(0xFF8) == -2
+
+
+def test_axis_fold():
+    axis = mm.axis.AddressAxis(0, 1)
+    fold = axis.fold(0x100, 0x10000, 30)
+    assert fold == mm.axis.Fold(0x100, 0x10000, 0x100)
+
+    assert axis.pixel(0xFF) == 0xFF
+    assert axis.pixel(0x100) == 0x100
+    # the folded span is compressed into the void height
+    assert 0x100 < axis.pixel(0x8000) < 0x100 + 30
+    assert axis.pixel(0x10000) == 0x100 + 30
+    assert axis.pixel(0x10010) == 0x100 + 30 + 0x10
+
+    # the axis is monotonic
+    addresses = range(0, 0x20000, 0x80)
+    pixels = [axis.pixel(a) for a in addresses]
+    assert pixels == sorted(pixels)
+
+
+def test_axis_consecutive_folds():
+    axis = mm.axis.AddressAxis(0, 2)
+    axis.fold(0x10, 0x1000, 30)
+    axis.fold(0x1000, 0x2000, 30)
+    # an empty fold still makes room for the void region
+    axis.fold(0x2010, 0x2010, 30)
+
+    assert axis.pixel(0x1000) == 8 + 30
+    assert axis.pixel(0x2000) == 8 + 60
+    assert axis.pixel(0x2010) == 8 + 60 + 8 + 30
+    assert [f.pixel for f in axis.folds] == [8, 38, 76]
+
+
+def test_positions_without_rasterising():
+    """The region positions can be queried from the axis without drawing the map"""
+    with unittest.mock.patch("sys.argv", ["mm.diagram", "-l", "0x3e8"]):
+        mm.diagram.Diagram._parse_args()
+    mm.diagram.Diagram.model = mm.metamodel.Diagram(
+        name="axis",
+        height=0x10000,
+        width=1000,
+        threshold=hex(0x10),
+        memory_maps={
+            "dram": {
+                "max_address": hex(0x10000),
+                "memory_regions": {
+                    "a": {"origin": hex(0x10), "size": hex(0x20)},
+                    "b": {"origin": hex(0x1000), "size": hex(0x20)},
+                    "c": {"origin": hex(0x1020), "size": hex(0x40)},
+                },
+            }
+        },
+    )
+    mm.diagram.Diagram.model.calc_nearest_region()
+    mmd = mm.diagram.MemoryMapDiagram(
+        {"dram": mm.diagram.Diagram.model.memory_maps["dram"]}, rasterise=False)
+
+    regions = {r.name: r for r in mmd.image_list}
+    assert all(r.img is None for r in regions.values())
+
+    void_span = mmd.void_padding + mmd.void_height + mmd.void_padding
+    assert mmd.axis.pixel(0x10) == 0x10
+    # the space between a and b is folded into a void region
+    assert mmd.axis.pixel(0x1000) == 0x30 + void_span
+    # regions after a void region are still drawn to scale relative to each other
+    assert mmd.axis.pixel(0x1020) == 0x30 + void_span + 0x20
+    assert mmd.region_mid_pos(regions["c"]).y == 0x30 + void_span + 0x20 + 0x20
+    # and the space after c, up to the max address, is folded
+    assert len(mmd.axis.folds) == 2
+
+
+@pytest.mark.parametrize("test_setup", [{"file_path": "out/tmp/axis_fit"}], indirect=True)
+def test_fit_draw_scale(test_setup, tmp_path):
+    """The void regions and the title are allowed for before drawing, so the diagram is not resized afterwards"""
+    fit_input = {
+        "name": "fit",
+        "height": 1000,
+        "width": 1000,
+        "memory_maps": {
+            "dram": {
+                "max_address": hex(12 * 0x1000),
+                # each region is followed by a gap that is folded into a void region
+                "memory_regions": {f"r{idx}": {"origin": hex(idx * 0x1000), "size": hex(0x800)} for idx in range(12)},
+            },
+        },
+    }
+    json_path = tmp_path / "input.json"
+    json_path.write_text(json.dumps(fit_input))
+    with unittest.mock.patch("sys.argv", ["mm.diagram", "-f", str(json_path), "-o", str(test_setup["report"])]):
+        with unittest.mock.patch.object(PIL.Image.Image, "resize", side_effect=AssertionError("resized")):
+            d = mm.diagram.Diagram()
+
+    mmd = d.mmd_list[0]
+    assert mmd.height == 1000 - mm.axis.title_height(d.model.text_size) - d.title_gap
+    assert len(mmd.folds) == 12
+    assert mmd.draw_scale == d.model.memory_maps["dram"].draw_scale
+    assert mmd.title.name.endswith(f"scale {mmd.draw_scale}:1")
+    assert mmd.axis.pixel(mmd.max_address) <= mmd.height
+    assert mmd.folds[11].pixel + mmd.void_padding + mmd.void_height <= mmd.height
+    assert PIL.Image.open(test_setup["diagram_image"]).size == (1000, 1000)
+
+
+@pytest.mark.parametrize("test_setup", [{"file_path": "out/tmp/axis_scale_outputs"}], indirect=True)
+def test_draw_scale_same_in_every_output(test_setup):
+    """The title, table, markdown and results report the scale that the map is drawn at"""
+    report = test_setup["report"]
+    csv_path = report.parent / f"{report.stem}_results.csv"
+    csv_path.unlink(missing_ok=True)
+    with unittest.mock.patch(
+        "sys.argv", 
+        ["mm.diagram", "full", "0x0", "0x3ff", "-l", "0x400", "-o", str(report), 
+         "--outputs", "diagram", "table", "markdown", "results-csv"]):
+        d = mm.diagram.Diagram()
+
+    mmd = d.mmd_list[0]
+    # the title takes part of the 0x400px height, so the map doesn't fit at 1:1
+    assert mmd.draw_scale == d.model.memory_maps["Untitled"].draw_scale == 2
+    assert mmd.title.name.endswith("scale 2:1")
+    assert mmd.image_list[0].get_data_as_list()[-1] == "2:1"
+    assert "|2:1|" in report.read_text()
+    assert csv_path.read_text().splitlines()[1].endswith(",2")
+
+
+def test_fit_draw_scale_properties():
+    """Every region fits the map height below the title at the solved scale, and it is the smallest scale that does"""
+    rng = random.Random(7)
+    for _ in range(200):
+        height = rng.randrange(200, 2000)
+        regions = {}
+        address = rng.randrange(0, 0x1000)
+        for idx in range(rng.randrange(1, 40)):
+            size = rng.randrange(1, 0x10000)
+            regions[f"r{idx}"] = {"origin": hex(address), "size": hex(size)}
+            # mostly small gaps, with the odd large one, and a few collisions
+            address = max(0, address + size + rng.choice([0, 0x10, 0x400, 0x100000, -0x20]))
+        model = mm.metamodel.Diagram(
+            name="fit",
+            height=height,
+            width=400,
+            threshold=hex(0x100),
+            memory_maps={"dram": {"memory_regions": regions, "max_address": hex(address + rng.randrange(0, 0x10000000))}},
+        )
+        memory_map = model.memory_maps["dram"]
+        height = mm.axis.regions_height(memory_map.height, model.text_size)
+        folds = memory_map.fold_ranges(model.threshold)
+        fold_pixels = mm.axis.fold_height(model.text_size)
+        end = max([memory_map.max_address] + [r.origin + r.size for r in memory_map.memory_regions.values()])
+        if len(folds) * fold_pixels > height - height // 4:
+            continue
+
+        # lay out the axis as the diagram does
+        axis = mm.axis.AddressAxis(0, memory_map.draw_scale)
+        for start, fold_end in folds:
+            axis.fold(start, fold_end, fold_pixels)
+        assert axis.pixel(end) <= height
+        assert all(axis.pixel(r.origin + r.size) <= height for r in memory_map.memory_regions.values())
+
+        if memory_map.draw_scale > 1:
+            assert mm.axis.laid_out_height(end, folds, memory_map.draw_scale - 1, fold_pixels) > height
+
+
+def test_fit_draw_scale_diagnostic(caplog):
+    """The maps that were fitted are reported together, once"""
+    memory_maps = {
+        name: {
+            "memory_regions": {"a": {"origin": hex(0x0), "size": hex(0x100)}, "b": {"origin": hex(0x1000), "size": hex(0x100)}},
+            "max_address": hex(0x10000000),
+        }
+        for name in ("dram", "sram", "flash")
+    }
+    with caplog.at_level(logging.WARNING, logger="mm.metamodel"):
+        model = mm.metamodel.Diagram(name="fit", height=1000, width=400, memory_maps=memory_maps)
+
+    assert len(caplog.records) == 1
+    assert "'dram' 1:1 (2 void regions), 'sram' 1:1 (2 void regions), 'flash' 1:1 (2 void regions)" in caplog.text
+    assert model.memory_maps["dram"].draw_scale == 1
@@ -0,0 +1,123 @@
+import copy
+
+import benchmarks.compare
+import benchmarks.export
+import benchmarks.generate
+import benchmarks.ldmap
+import benchmarks.run
+import benchmarks.table
+import benchmarks.typecheck
+
+import mm.diagram
+import mm.ldmap
+import mm.metamodel
+
+
+def test_suite_coverage():
+    suite = benchmarks.generate.default_suite()
+    assert {s.page_size for s in suite} == set(benchmarks.generate.page_sizes)
+    assert {s.indent_scheme for s in suite} == {scheme.value for scheme in mm.metamodel.IndentScheme}
+    # scenario names are used as keys in the results
+    assert len({s.name for s in suite}) == len(suite)
+
+
+def test_generated_diagrams_are_valid():
+    for scenario in benchmarks.generate.default_suite():
+        model = mm.metamodel.Diagram(**benchmarks.generate.generate_diagram(scenario))
+        assert sum(len(mmap.memory_regions) for mmap in model.memory_maps.values()) == scenario.regions
+
+
+def test_collision_density():
+    clean = benchmarks.generate.Scenario(regions=50, maps=1, collision_density=0.0)
+    dense = benchmarks.generate.Scenario(regions=50, maps=1, collision_density=0.5)
+
+    def count_collisions(scenario):
+        model = mm.metamodel.Diagram(**benchmarks.generate.generate_diagram(scenario))
+        return sum(
+            1 for mmap in model.memory_maps.values() 
+            for region in mmap.memory_regions.values() 
+            if region.collisions
+        )
+
+    assert count_collisions(clean) == 0
+    assert count_collisions(dense) > 0
+
+
+def test_run_scenario():
+    scenario = benchmarks.generate.Scenario(regions=6, maps=2, links=2, page_size="A10")
+    results = benchmarks.run.run_scenario(scenario, repeat=1)
+
+    assert list(results) == benchmarks.run.stages
+    for stage in results.values():
+        assert stage["wall_time_s"] >= 0
+        assert stage["peak_traced_bytes"] >= 0
+    assert results["png_encode"]["output_bytes"] > 0
+    # measured inside the validation, not run again
+    assert results["calc_nearest_region"]["wall_time_s"] <= results["validation"]["wall_time_s"]
+    assert results["draw_diagram_img"]["output_bytes"] == 307 * 437 * 4
+
+
+def test_compare():
+    baseline = {
+        "scenarios": {
+            "s1": {
+                "stages": {
+                    "validation": {"wall_time_s": 1.0, "peak_traced_bytes": 1000, "peak_rss_bytes": None, "output_bytes": 10},
+                    "table": {"wall_time_s": 1.0, "peak_traced_bytes": 1000, "peak_rss_bytes": None, "output_bytes": 10},
+                }
+            }
+        }
+    }
+    assert benchmarks.compare.compare(baseline, baseline) == []
+
+    current = copy.deepcopy(baseline)
+    current["scenarios"]["s1"]["stages"]["table"]["wall_time_s"] = 1.5
+    # below the noise floor, so not a regression
+    current["scenarios"]["s1"]["stages"]["validation"]["peak_traced_bytes"] = 2000
+
+    regressions = benchmarks.compare.compare(current, baseline, tolerance=0.2)
+    assert len(regressions) == 1
+    assert regressions[0].stage == "table"
+    assert regressions[0].metric == "wall_time_s"
+
+    assert benchmarks.compare.compare(current, baseline, tolerance=0.6) == []
+
+
+def test_typecheck_comparison():
+    scenario = benchmarks.generate.Scenario(regions=4, maps=1, page_size="A10")
+    results = benchmarks.typecheck.compare(scenario, repeat=1)
+    assert list(results) == benchmarks.run.stages
+    for result in results.values():
+        assert result["checked_s"] > 0
+        assert result["production_s"] > 0
+
+
+def test_table_sizes():
+    results = benchmarks.table.run_table_sizes([5, 10], repeat=1)
+    assert list(results) == [5, 10]
+    assert all(seconds > 0 for seconds in results.values())
+
+
+def test_ldmap_throughput(tmp_path):
+    map_path = tmp_path / "synthetic.map"
+    input_count = benchmarks.ldmap.generate_map_file(map_path, 0.1)
+    assert map_path.stat().st_size >= 0.1 * 1024 * 1024
+
+    # every generated input section is imported
+    memory_maps = mm.ldmap.load(map_path, sections="input")
+    assert sum(len(mmap.memory_regions) for mmap in memory_maps.values()) == input_count
+
+    results = benchmarks.ldmap.measure_throughput(map_path, repeat=1)
+    assert results["parse_mb_per_s"] > 0
+    assert results["load_mb_per_s"] > 0
+    # the end to end time includes the collision and freespace analysis of every region
+    assert results["regions"] == input_count
+    assert results["diagram_s"] > 0
+
+
+def test_export_sizes():
+    results = benchmarks.export.run_export_sizes([10, 20], repeat=1)
+    assert list(results) == [10, 20]
+    for steps in results.values():
+        assert list(steps) == ["json_load", "analysis", *mm.diagram.Diagram.results_writers]
+        assert all(seconds > 0 for seconds in steps.values())
@@ -0,0 +1,86 @@
+import json
+import unittest
+import pytest
+
+from tests.fixtures.common import test_setup
+
+import benchmarks.generate
+import mm.cache
+import mm.diagram
+import mm.metamodel
+
+input_dict = benchmarks.generate.generate_diagram(benchmarks.generate.Scenario(regions=20, maps=2, links=3, collision_density=0.3))
+key = mm.cache.input_hash([json.dumps(input_dict).encode()])
+
+
+def test_roundtrip():
+    model = mm.metamodel.Diagram(**input_dict)
+    cached = mm.cache.loads(mm.cache.dumps(model, key), key)
+
+    # including the computed fields that are excluded from model_dump()
+    assert mm.cache._to_builtins(cached) == mm.cache._to_builtins(model)
+    assert cached.model_dump() == model.model_dump()
+    region = next(iter(cached.memory_maps["map0"].memory_regions.values()))
+    assert isinstance(region, mm.metamodel.MemoryRegion)
+    assert region.text_size == model.text_size
+
+
+def test_invalidation():
+    model = mm.metamodel.Diagram(**input_dict)
+    data = mm.cache.dumps(model, key)
+
+    # different input
+    assert mm.cache.loads(data, mm.cache.input_hash([b"{}"])) is None
+    # corrupt or truncated
+    assert mm.cache.loads(data[:-10], key) is None
+    assert mm.cache.loads(data[:10], key) is None
+    assert mm.cache.loads(b"", key) is None
+
+    with unittest.mock.patch.object(mm.cache, "format_version", mm.cache.format_version + 1):
+        assert mm.cache.loads(data, key) is None
+
+    # the analysis has changed
+    with unittest.mock.patch.object(mm.metamodel, "model_version", mm.metamodel.model_version + 1):
+        assert mm.cache.loads(data, key) is None
+
+    # the fields have changed
+    mm.cache._schema_hash.cache_clear()
+    try:
+        with unittest.mock.patch.object(mm.metamodel.Diagram, "model_json_schema", return_value={"changed": True}):
+            assert mm.cache.loads(data, key) is None
+    finally:
+        mm.cache._schema_hash.cache_clear()
+    assert mm.cache.loads(data, key) is not None
+
+
+@pytest.mark.parametrize("test_setup", [{"file_path": "out/tmp/cache_cli"}], indirect=True)
+def test_cache_cli(test_setup, tmp_path):
+    """The second run should load the model from the cache instead of validating the input"""
+
+    json_path = tmp_path / "input.json"
+    json_path.write_text(json.dumps(input_dict))
+    cache_dir = tmp_path / "cache"
+    argv = [
+        "mm.diagram",
+        "-f", str(json_path),
+        "-o", str(test_setup["report"]),
+        "--outputs", "results-json",
+        "--cache-dir", str(cache_dir),
+    ]
+    results_path = test_setup["report"].parent / (test_setup["report"].stem + "_results.json")
+
+    with unittest.mock.patch("sys.argv", argv):
+        mm.diagram.Diagram()
+    assert len(list(cache_dir.glob("*.mmc"))) == 1
+    uncached_results = results_path.read_text()
+
+    with unittest.mock.patch("sys.argv", argv):
+        with unittest.mock.patch.object(mm.metamodel.Diagram, "__init__", side_effect=AssertionError):
+            mm.diagram.Diagram()
+    assert results_path.read_text() == uncached_results
+
+    # a modified input is validated again
+    json_path.write_text(json.dumps({**input_dict, "height": input_dict["height"] + 1}))
+    with unittest.mock.patch("sys.argv", argv):
+        mm.diagram.Diagram()
+    assert len(list(cache_dir.glob("*.mmc"))) == 2
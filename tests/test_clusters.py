@@ -0,0 +1,200 @@
+import json
+import random
+import unittest
+import PIL.Image
+import pytest
+
+from tests.fixtures.common import test_setup
+
+import mm.clusters
+import mm.diagram
+import mm.metamodel
+import mm.window
+
+clusters_input = {
+    "name": "clusters",
+    "height": 1000,
+    "width": 1000,
+    "memory_maps": {
+        "dram": {
+            "max_address": hex(0x10000000),
+            "memory_regions": {
+                "kernel": {"origin": hex(0x100000), "size": hex(0x800000)},
+                "dtb": {"origin": hex(0x8FF000), "size": hex(0x2000)},
+                "initrd": {"origin": hex(0x900000), "size": hex(0x4000000)},
+                "rootfs": {"origin": hex(0x4800000), "size": hex(0x1000000)},
+                "shm": {"origin": hex(0x8000000), "size": hex(0x100000)},
+                "uboot": {"origin": hex(0xF000000), "size": hex(0x100000)},
+                "env": {"origin": hex(0xF0F0000), "size": hex(0x20000)},
+            },
+        },
+        "flash": {
+            "max_address": hex(0x10000000),
+            "memory_regions": {"image": {"origin": hex(0x0), "size": hex(0x1000000)}},
+        },
+    },
+}
+
+
+def test_find_clusters():
+    clusters = mm.clusters.find_clusters(mm.metamodel.Diagram(**clusters_input).memory_maps["dram"])
+    # kernel, dtb and initrd are connected through dtb, and initrd also collides with rootfs
+    assert clusters == [
+        mm.clusters.Cluster(("kernel", "dtb", "initrd", "rootfs"), 0x100000, 0x5800000, 2),
+        mm.clusters.Cluster(("uboot", "env"), 0xF000000, 0xF110000, 2),
+    ]
+    assert mm.clusters.find_clusters(mm.metamodel.Diagram(**clusters_input).memory_maps["flash"]) == []
+
+
+def test_overlap_depth():
+    assert mm.clusters.overlap_depth([]) == 0
+    # touching intervals don't overlap
+    assert mm.clusters.overlap_depth([(0, 10), (10, 20)]) == 1
+    assert mm.clusters.overlap_depth([(0, 10), (5, 20), (8, 9), (9, 30)]) == 3
+
+
+def test_context_spans():
+    clusters = [
+        mm.clusters.Cluster(("a", "b"), 0x100, 0x200, 2),
+        mm.clusters.Cluster(("c", "d"), 0x280, 0x300, 2),
+        mm.clusters.Cluster(("e", "f"), 0x1000, 0x1100, 2),
+    ]
+    assert mm.clusters.context_spans(clusters, 0) == [
+        mm.window.Window(0x100, 0x200), mm.window.Window(0x280, 0x300), mm.window.Window(0x1000, 0x1100)]
+    # the context joins the first two clusters, and is clamped at address 0
+    assert mm.clusters.context_spans(clusters, 0x200) == [
+        mm.window.Window(0x0, 0x500), mm.window.Window(0xE00, 0x1300)]
+
+
+@pytest.mark.parametrize("test_setup", [{"file_path": "out/tmp/clusters"}], indirect=True)
+def test_collisions_only_cli(test_setup, tmp_path):
+    json_path = tmp_path / "input.json"
+    json_path.write_text(json.dumps(clusters_input))
+    with unittest.mock.patch(
+        "sys.argv",
+        [
+            "mm.diagram",
+            "-f", str(json_path),
+            "-o", str(test_setup["report"]),
+            "--collisions-only",
+            "--collision-context", "0x10000",
+        ],
+    ):
+        d = mm.diagram.Diagram()
+
+    # flash has no collisions
+    assert [mmd.name for mmd in d.mmd_list] == ["dram"]
+    mmd = d.mmd_list[0]
+    assert mmd.spans == [mm.window.Window(0xF0000, 0x5810000), mm.window.Window(0xEFF0000, 0xF120000)]
+
+    # shm is between the clusters so it isn't drawn
+    regions = {r.name: r for r in mmd.image_list}
+    assert set(regions) == {"kernel", "dtb", "initrd", "rootfs", "uboot", "env"}
+    assert regions["uboot"].window == mmd.spans[1]
+
+    # the empty space between the clusters, including the context, is folded
+    assert list(mmd.folds) == [len(mmd.draw_list) - 3, len(mmd.draw_list) - 1]
+    assert mmd.folds[len(mmd.draw_list) - 3][:2] == (0x5800000, 0xF000000)
+
+    assert PIL.Image.open(test_setup["diagram_image"]).size == (1000, 1000)
+
+    report = test_setup["report"].read_text()
+    assert "#### Collision clusters:" in report
+    assert "|dram|1|0x100000 - 0x5800000|0x5700000 (91226112)|4|2|kernel, dtb, initrd, rootfs|" in report
+    assert "|dram|2|0xF000000 - 0xF110000|0x110000 (1114112)|2|2|uboot, env|" in report
+
+
+def test_collisions_only_args(tmp_path):
+    json_path = tmp_path / "input.json"
+    json_path.write_text(json.dumps(clusters_input))
+    out = str(tmp_path / "report.md")
+
+    for cluster_args, error in (
+        (["--collisions-only", "--collision-context", "100"], "hex format"),
+        (["--collisions-only", "--window", "0x0", "0x100"], "can't be used with 'window'"),
+    ):
+        with unittest.mock.patch("sys.argv", ["mm.diagram", "-f", str(json_path), "-o", out, *cluster_args]):
+            with pytest.raises(SystemExit, match=error):
+                mm.diagram.Diagram()
+
+
+def test_assign_lanes():
+    rng = random.Random(3)
+    for _ in range(50):
+        intervals = []
+        for _ in range(rng.randrange(1, 60)):
+            start = rng.randrange(0, 0x1000)
+            intervals.append((start, start + rng.randrange(0, 0x200)))
+        lanes = mm.clusters.assign_lanes(intervals)
+
+        # overlapping intervals never share a lane
+        for a, (a_start, a_end) in enumerate(intervals):
+            for b, (b_start, b_end) in enumerate(intervals[:a]):
+                if a_start < max(b_end, b_start + 1) and b_start < max(a_end, a_start + 1):
+                    assert lanes[a][0] != lanes[b][0]
+                    # and are in the same group
+                    assert lanes[a][1] == lanes[b][1]
+
+        # the fewest lanes: the most intervals that overlap at one address
+        assert max(count for _, count in lanes) == mm.clusters.overlap_depth(
+            [(start, max(end, start + 1)) for start, end in intervals])
+        assert all(0 <= lane < count for lane, count in lanes)
+
+
+def test_assign_lanes_reuse():
+    # c reuses the lane of a, and d is in a group of its own
+    assert mm.clusters.assign_lanes([(0, 10), (5, 20), (10, 15), (20, 30)]) == [(0, 2), (1, 2), (0, 2), (0, 1)]
+
+
+@pytest.mark.parametrize("test_setup", [{"file_path": "out/tmp/lanes"}], indirect=True)
+def test_lanes_cli(test_setup, tmp_path):
+    json_path = tmp_path / "input.json"
+    json_path.write_text(json.dumps({**clusters_input, "indent_scheme": "lanes"}))
+    with unittest.mock.patch(
+        "sys.argv",
+        ["mm.diagram", "-f", str(json_path), "-o", str(test_setup["report"]), "--outputs", "diagram"],
+    ):
+        d = mm.diagram.Diagram()
+
+    mmd = d.mmd_list[0]
+    regions = {r.name: r for r in mmd.image_list}
+    lane_width = mmd.region_width // 2
+    # kernel/dtb/initrd/rootfs are at most two deep, so dtb and initrd share the width with kernel and rootfs
+    assert [regions[name].lane for name in ("kernel", "dtb", "initrd", "rootfs")] == [0, 1, 0, 1]
+    assert all(regions[name].img_width == lane_width for name in ("kernel", "dtb", "initrd", "rootfs"))
+    assert regions["dtb"].draw_x == lane_width
+    assert mmd.region_mid_pos(regions["dtb"]).x == lane_width + lane_width // 2
+    # shm doesn't overlap anything so it keeps the full width
+    assert (regions["shm"].lane, regions["shm"].img_width) == (0, mmd.region_width)
+
+
+@pytest.mark.parametrize("test_setup", [{"file_path": "out/tmp/lanes_wrap"}], indirect=True)
+def test_lanes_wrap(test_setup, tmp_path):
+    """More overlapping regions than fit at the narrowest lane width"""
+    lanes_input = {
+        "name": "lanes",
+        "height": 1000,
+        "width": 400,
+        "indent_scheme": "lanes",
+        "memory_maps": {
+            "dram": {
+                "max_address": hex(0x10000),
+                "memory_regions": {f"r{i}": {"origin": hex(i * 0x10), "size": hex(0x1000)} for i in range(100)},
+            },
+        },
+    }
+    json_path = tmp_path / "input.json"
+    json_path.write_text(json.dumps(lanes_input))
+    with unittest.mock.patch(
+        "sys.argv",
+        ["mm.diagram", "-f", str(json_path), "-o", str(test_setup["report"]), "--outputs", "diagram"],
+    ):
+        d = mm.diagram.Diagram()
+
+    mmd = d.mmd_list[0]
+    max_lanes = mmd.region_width // mmd.lane_min_width
+    assert max_lanes < 100
+    assert {r.lane for r in mmd.image_list} == set(range(max_lanes))
+    # the lanes never grow the map
+    assert all(r.draw_x + r.img_width <= mmd.region_width for r in mmd.image_list)
+    assert PIL.Image.open(test_setup["diagram_image"]).size == (400, 1000)
@@ -2,11 +2,13 @@ import unittest
 import pytest 
 import json
 import pathlib
+import random
 
 from tests.fixtures.common import test_setup
 
 import mm.diagram
 import mm.image
+import mm.metamodel
 
 # These tests only check the distance between adjacent regions
 # They don't check the output image sizes so we don't care what value we set to the threshold.
@@ -271,4 +273,80 @@ def test_distance_collision_with_limit(test_setup):
         # outimg = PIL.Image.open(str(test_setup["diagram_image"]))
         # assert outimg.size[1] == 2000
 
-        assert test_setup["table_image"].exists()
\ No newline at end of file
+        assert test_setup["table_image"].exists()
+
+
+def baseline_nearest_region(regions, max_address):
+    """The pairwise comparison of every region with every other region, that calc_nearest_region used to do.
+    regions maps each name to [origin, size, freespace, collisions], the last two as given in the input"""
+    for name, region in regions.items():
+        origin, size = region[0], region[1]
+        non_collision_distances = {}
+        for other_name, (other_origin, other_size, _, _) in regions.items():
+            this_region_end = origin + size
+            other_region_end = other_origin + other_size
+            if name == other_name:
+                continue
+            if origin >= other_region_end:
+                continue
+            distance = other_origin - this_region_end
+            if distance < 0:
+                if other_origin < origin:
+                    region[3][other_name] = origin
+                else:
+                    region[3][other_name] = other_origin
+                if origin < other_origin:
+                    region[2] = distance
+            else:
+                non_collision_distances[other_name] = distance
+                if not region[2]:
+                    region[2] = distance
+
+        if not region[3]:
+            if non_collision_distances:
+                region[2] = min(non_collision_distances.values())
+            else:
+                region[2] = max_address - (origin + size)
+        elif not region[2]:
+            region[2] = max_address - (origin + size)
+
+        if origin + size > max_address:
+            region[3]["end"] = max_address
+            region[2] = max_address - (origin + size)
+    return {name: (region[2], region[3]) for name, region in regions.items()}
+
+
+def test_distance_matches_baseline():
+    """The sweep over the regions should find the same collisions and freespace, in the same order, 
+    as comparing every pair of regions, whatever the order of the regions in the input. 
+    That includes overlapping and empty regions, and regions whose freespace and collisions are given in the input, 
+    e.g. a model written by --results-json that is read again."""
+    rng = random.Random(3)
+    for _ in range(300):
+        regions = {}
+        for idx in range(rng.randrange(1, 15)):
+            origin = rng.randrange(0, 0x200, rng.choice([1, 0x10]))
+            freespace, collisions = 0, {}
+            if rng.random() < 0.1:
+                freespace = rng.randrange(-0x20, 0x20)
+            if rng.random() < 0.1:
+                collisions = {f"r{rng.randrange(0, 15)}": rng.randrange(0, 0x200)}
+            regions[f"r{idx}"] = [origin, rng.choice([0, 0x8, 0x10, 0x40, 0x80]), freespace, collisions]
+        names = list(regions)
+        rng.shuffle(names)
+        model = mm.metamodel.Diagram(
+            name="distance", height=1000, width=400,
+            memory_maps={"m": {"max_address": hex(0x200), "memory_regions": {
+                name: {
+                    "origin": hex(regions[name][0]), 
+                    "size": hex(regions[name][1]), 
+                    "freespace": regions[name][2], 
+                    "collisions": dict(regions[name][3]),
+                } for name in names
+            }}})
+        found = {
+            name: (region.freespace, list(region.collisions.items()))
+            for name, region in model.memory_maps["m"].memory_regions.items()
+        }
+        expected = baseline_nearest_region({name: regions[name] for name in names}, 0x200)
+        assert found == {name: (freespace, list(collisions.items())) for name, (freespace, collisions) in expected.items()}
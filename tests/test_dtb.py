@@ -0,0 +1,207 @@
+import unittest
+import pytest
+import struct
+
+from tests.fixtures.common import test_setup
+
+import mm.diagram
+import mm.dtb
+import mm.metamodel
+
+
+def cells(*values):
+    return struct.pack(f">{len(values)}I", *values)
+
+
+def string(*values):
+    return b"".join(v.encode() + b"\0" for v in values)
+
+
+def build_dtb(root, reservations=()):
+    """Flattened device tree blob (version 17) for a tree of {"props": {...}, "children": {...}} nodes"""
+
+    strings = bytearray()
+    string_offsets = {}
+    structure = bytearray()
+
+    def pad():
+        structure.extend(bytes(-len(structure) % 4))
+
+    def add_node(name, node):
+        structure.extend(struct.pack(">I", mm.dtb.FDT_BEGIN_NODE) + name.encode() + b"\0")
+        pad()
+        for prop_name, value in node.get("props", {}).items():
+            if prop_name not in string_offsets:
+                string_offsets[prop_name] = len(strings)
+                strings.extend(prop_name.encode() + b"\0")
+            structure.extend(struct.pack(">III", mm.dtb.FDT_PROP, len(value), string_offsets[prop_name]) + value)
+            pad()
+        for child_name, child in node.get("children", {}).items():
+            add_node(child_name, child)
+        structure.extend(struct.pack(">I", mm.dtb.FDT_END_NODE))
+
+    add_node("", root)
+    structure.extend(struct.pack(">I", mm.dtb.FDT_END))
+
+    rsvmap = b"".join(struct.pack(">QQ", address, size) for address, size in reservations) + bytes(16)
+    off_rsvmap = 40
+    off_struct = off_rsvmap + len(rsvmap)
+    off_strings = off_struct + len(structure)
+    totalsize = off_strings + len(strings)
+    header = struct.pack(
+        ">10I", mm.dtb.FDT_MAGIC, totalsize, off_struct, off_strings, off_rsvmap, 17, 16, 0, len(strings), len(structure))
+    return header + rsvmap + bytes(structure) + bytes(strings)
+
+
+board = {
+    "props": {"#address-cells": cells(2), "#size-cells": cells(2), "model": string("test board")},
+    "children": {
+        "chosen": {
+            "props": {"linux,initrd-start": cells(0x88000000), "linux,initrd-end": cells(0x88800000)},
+        },
+        "cpus": {
+            "props": {"#address-cells": cells(1), "#size-cells": cells(0)},
+            "children": {"cpu@0": {"props": {"reg": cells(0)}}},
+        },
+        "memory@80000000": {
+            "props": {"device_type": string("memory"), "reg": cells(0x0, 0x80000000, 0x0, 0x40000000)},
+        },
+        "reserved-memory": {
+            "props": {"#address-cells": cells(2), "#size-cells": cells(2), "ranges": b""},
+            "children": {
+                "optee@8e000000": {"props": {"reg": cells(0x0, 0x8e000000, 0x0, 0x2000000), "no-map": b""}},
+                "uboot@8f000000": {"props": {"reg": cells(0x0, 0x8f000000, 0x0, 0x1000000)}},
+                "linux,cma": {"props": {"size": cells(0x0, 0x4000000), "reusable": b""}},
+            },
+        },
+        "soc": {
+            "props": {
+                "compatible": string("simple-bus"),
+                "#address-cells": cells(1),
+                "#size-cells": cells(1),
+                "ranges": cells(0x0, 0x0, 0x10000000, 0x10000000),
+            },
+            "children": {
+                "uart@1000": {"props": {"reg": cells(0x1000, 0x100)}},
+                "pcie@2000": {
+                    "props": {"reg": cells(0x2000, 0x100, 0x3000, 0x100), "reg-names": string("dbi", "config")},
+                },
+                "i2c@4000": {
+                    "props": {"reg": cells(0x4000, 0x100), "#address-cells": cells(1), "#size-cells": cells(0)},
+                    "children": {"sensor@48": {"props": {"reg": cells(0x48)}}},
+                },
+                "spi@5000": {
+                    "props": {"reg": cells(0x5000, 0x100), "#address-cells": cells(1), "#size-cells": cells(1)},
+                    "children": {"flash@0": {"props": {"reg": cells(0x0, 0x100000)}}},
+                },
+            },
+        },
+    },
+}
+
+
+@pytest.fixture()
+def board_dtb(tmp_path):
+    dtb_path = tmp_path / "board.dtb"
+    dtb_path.write_bytes(build_dtb(board, reservations=[(0x8a000000, 0x100000)]))
+    return dtb_path
+
+
+def regions(memory_map):
+    return {name: (r.origin, r.size) for name, r in memory_map.memory_regions.items()}
+
+
+def test_load(board_dtb):
+    memory_maps = mm.dtb.load(board_dtb)
+
+    assert set(memory_maps) == {"/memory", "/reserved-memory", "/", "/soc/spi@5000"}
+    assert regions(memory_maps["/memory"]) == {"memory@80000000": (0x80000000, 0x40000000)}
+
+    # the dynamically allocated cma pool has no reg
+    assert regions(memory_maps["/reserved-memory"]) == {
+        "/memreserve/ 0": (0x8a000000, 0x100000),
+        "initrd": (0x88000000, 0x800000),
+        "optee@8e000000": (0x8e000000, 0x2000000),
+        "uboot@8f000000": (0x8f000000, 0x1000000),
+    }
+
+    # the u-boot and op-tee reservations overlap
+    model = mm.metamodel.Diagram(name="board", height=1000, width=500, memory_maps=memory_maps)
+    assert "optee@8e000000" in model.memory_maps["/reserved-memory"].memory_regions["uboot@8f000000"].collisions
+
+    # the soc bus addresses are translated, the i2c devices have no size
+    assert regions(memory_maps["/"]) == {
+        "uart@1000": (0x10001000, 0x100),
+        "pcie@2000 (dbi)": (0x10002000, 0x100),
+        "pcie@2000 (config)": (0x10003000, 0x100),
+        "i2c@4000": (0x10004000, 0x100),
+        "spi@5000": (0x10005000, 0x100),
+    }
+    assert regions(memory_maps["/soc/spi@5000"]) == {"flash@0": (0x0, 0x100000)}
+
+
+def test_reg_outside_ranges(tmp_path):
+    tree = {
+        "props": {"#address-cells": cells(1), "#size-cells": cells(1)},
+        "children": {
+            "bus": {
+                "props": {"#address-cells": cells(1), "#size-cells": cells(1), "ranges": cells(0x0, 0x1000, 0x100)},
+                "children": {"dev@200": {"props": {"reg": cells(0x200, 0x10)}}},
+            },
+        },
+    }
+    dtb_path = tmp_path / "outside.dtb"
+    dtb_path.write_bytes(build_dtb(tree))
+
+    memory_maps = mm.dtb.load(dtb_path)
+    assert regions(memory_maps["/bus"]) == {"dev@200": (0x200, 0x10)}
+
+
+def patch_blob(blob, offset, value):
+    return blob[:offset] + struct.pack(">I", value) + blob[offset + 4:]
+
+
+def patch_struct(blob, value):
+    """Replace the first token of the structure block"""
+    off_struct = struct.unpack_from(">I", blob, 8)[0]
+    return patch_blob(blob, off_struct, value)
+
+
+@pytest.mark.parametrize("contents", [
+    b"", 
+    b"not a device tree blob" * 2, 
+    build_dtb(board)[:60],
+    # property and node end before the root node
+    patch_struct(build_dtb(board), mm.dtb.FDT_PROP),
+    patch_struct(build_dtb(board), mm.dtb.FDT_END_NODE),
+    # structure block size past the end of the blob
+    patch_blob(build_dtb(board), 36, 0x100000),
+    # structure block ends inside the root node
+    patch_blob(build_dtb(board), 36, 8),
+    patch_blob(build_dtb(board), 36, 6),
+])
+def test_invalid_file(tmp_path, contents):
+    dtb_path = tmp_path / "invalid.dtb"
+    dtb_path.write_bytes(contents)
+
+    with pytest.raises(ValueError):
+        mm.dtb.load(dtb_path)
+
+
+@pytest.mark.parametrize("test_setup", [{"file_path": "out/tmp/dtb_cli"}], indirect=True)
+def test_dtb_cli(test_setup, board_dtb):
+
+    with unittest.mock.patch(
+        "sys.argv",
+        [
+            "mm.diagram",
+            "--dtb", str(board_dtb),
+            "-l", hex(1000),
+            "-o", str(test_setup["report"]),
+        ]
+    ):
+        d = mm.diagram.Diagram()
+
+    assert d.model.name == "board"
+    assert "/reserved-memory" in d.model.memory_maps
+    assert test_setup["report"].exists()
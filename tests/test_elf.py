@@ -0,0 +1,112 @@
+import unittest
+import pytest
+import pathlib
+import struct
+
+from tests.fixtures.common import test_setup
+
+import mm.diagram
+import mm.elf
+
+# built with: gcc -Os -g -nostdlib -static -no-pie -T firmware.ld firmware.c -o firmware.elf
+fixture_path = pathlib.Path("tests/fixtures/elf/firmware.elf")
+
+
+def build_elf32_be(segments):
+    """ELF32 big endian file with program headers only, e.g. a stripped image"""
+    ehdr_size, phdr_size = 52, 32
+    data = b"\x7fELF" + bytes([1, 2, 1]) + bytes(9)
+    data += struct.pack(">HHIIIIIHHHHHH", 2, 20, 1, 0, ehdr_size, 0, 0, ehdr_size, phdr_size, len(segments), 40, 0, 0)
+    for vaddr, paddr, filesz, memsz in segments:
+        data += struct.pack(">IIIIIIII", mm.elf.PT_LOAD, 0, vaddr, paddr, filesz, memsz, 5, 4)
+    return data
+
+
+def test_sections():
+    memory_maps = mm.elf.load(fixture_path)
+
+    assert list(memory_maps) == ["VMA", "LMA"]
+    vma = memory_maps["VMA"].memory_regions
+    assert list(vma) == [".text", ".rodata", ".data", ".bss"]
+    assert (vma[".data"].origin, vma[".data"].size) == (0x20000000, 0x14)
+    assert (vma[".bss"].origin, vma[".bss"].size) == (0x20000020, 0x100)
+    assert memory_maps["VMA"].max_address == 0x20000120
+
+    # .bss has no load address, .data is loaded from flash after .rodata
+    lma = memory_maps["LMA"].memory_regions
+    assert list(lma) == [".text (LMA)", ".rodata (LMA)", ".data (LMA)"]
+    assert lma[".data (LMA)"].origin == 0x0800001d
+    assert lma[".data (LMA)"].links == [("VMA", ".data")]
+    assert lma[".text (LMA)"].links == []
+
+
+def test_segments_without_section_headers(tmp_path):
+    elf_path = tmp_path / "stripped.elf"
+    elf_path.write_bytes(build_elf32_be([
+        (0x1000, 0x1000, 0x200, 0x200),
+        (0x8000, 0x1200, 0x40, 0x40),
+        (0x8040, 0x1240, 0x0, 0x100),
+    ]))
+
+    memory_maps = mm.elf.load(elf_path)
+    assert list(memory_maps["VMA"].memory_regions) == ["LOAD #0", "LOAD #1", "LOAD #2"]
+    assert list(memory_maps["LMA"].memory_regions) == ["LOAD #0 (LMA)", "LOAD #1 (LMA)"]
+    assert memory_maps["LMA"].memory_regions["LOAD #1 (LMA)"].links == [("VMA", "LOAD #1")]
+
+
+def test_no_lma_map_when_nothing_is_relocated(tmp_path):
+    elf_path = tmp_path / "linux.elf"
+    elf_path.write_bytes(build_elf32_be([(0x1000, 0x1000, 0x200, 0x200)]))
+
+    assert list(mm.elf.load(elf_path)) == ["VMA"]
+
+
+@pytest.mark.parametrize("contents", [b"", b"not an elf file", b"\x7fELF\x01\x01\x01" + bytes(9)])
+def test_invalid_file(tmp_path, contents):
+    elf_path = tmp_path / "invalid.elf"
+    elf_path.write_bytes(contents)
+
+    with pytest.raises(ValueError):
+        mm.elf.load(elf_path)
+
+
+def test_unterminated_section_name(tmp_path):
+    """The section name string table runs to the end of the file without a NUL terminator"""
+    data = bytearray(fixture_path.read_bytes())
+    shoff, = struct.unpack_from("<Q", data, 0x28)
+    shentsize, _, shstrndx = struct.unpack_from("<HHH", data, 0x3A)
+    # sh_offset of the string table section
+    struct.pack_into("<Q", data, shoff + shstrndx * shentsize + 0x18, len(data))
+    elf_path = tmp_path / "unterminated.elf"
+    elf_path.write_bytes(bytes(data) + b"\x01" * 8)
+
+    with pytest.raises(ValueError, match="Unterminated section name"):
+        mm.elf.load(elf_path)
+
+
+@pytest.mark.parametrize("test_setup", [{"file_path": "out/tmp/elf_cli"}], indirect=True)
+def test_elf_cli(test_setup):
+
+    with unittest.mock.patch(
+        "sys.argv",
+        [
+            "mm.diagram",
+            "--elf", str(fixture_path),
+            "-l", hex(1000),
+            "-o", str(test_setup["report"]),
+        ]
+    ):
+        d = mm.diagram.Diagram()
+
+    assert d.model.name == "firmware"
+    assert list(d.model.memory_maps) == ["VMA", "LMA"]
+    assert test_setup["report"].exists()
+
+
+def test_elf_cli_invalid_file():
+    with unittest.mock.patch(
+        "sys.argv",
+        ["mm.diagram", "--elf", "tests/fixtures/ldmap/firmware.map", "-l", hex(1000)]
+    ):
+        with pytest.raises(SystemExit):
+            mm.diagram.Diagram()
@@ -0,0 +1,73 @@
+import unittest
+import pytest
+import csv
+import json
+import sqlite3
+
+from tests.fixtures.common import test_setup
+
+import mm.diagram
+
+
+def results_path(test_setup, extension):
+    report = test_setup["report"]
+    path = report.parent / f"{report.stem}_results.{extension}"
+    path.unlink(missing_ok=True)
+    return path
+
+
+@pytest.mark.parametrize("test_setup", [{"file_path": "out/tmp/export_results"}], indirect=True)
+def test_export_results(test_setup):
+    """The json, csv and sqlite outputs should contain the same per-region results"""
+
+    json_path = results_path(test_setup, "json")
+    csv_path = results_path(test_setup, "csv")
+    sqlite_path = results_path(test_setup, "sqlite")
+
+    with unittest.mock.patch(
+        "sys.argv",
+        [
+            "mm.diagram",
+            "kernel", "0x10", "0x30",
+            "rootfs", "0x20", "0x30",
+            "dtb", "0x100", "0x10",
+            "-l", hex(1000),
+            "-o", str(test_setup["report"]),
+            "--outputs", "results-json", "results-csv", "results-sqlite"
+        ]
+    ):
+        mm.diagram.Diagram()
+
+    assert not test_setup["report"].exists()
+
+    results = json.loads(json_path.read_text())
+    assert [r["region"] for r in results] == ["kernel", "rootfs", "dtb"]
+    kernel = results[0]
+    assert kernel == {
+        "map": "Untitled",
+        "region": "kernel",
+        "origin": 0x10,
+        "size": 0x30,
+        "end": 0x40,
+        "freespace": -0x20,
+        "collisions": {"rootfs": 0x20},
+        "links": [],
+        "draw_scale": kernel["draw_scale"],
+    }
+
+    with csv_path.open(newline="") as fp:
+        rows = list(csv.DictReader(fp))
+    assert [r["region"] for r in rows] == ["kernel", "rootfs", "dtb"]
+    assert int(rows[0]["end"]) == 0x40
+    assert json.loads(rows[0]["collisions"]) == {"rootfs": 0x20}
+    assert json.loads(rows[2]["collisions"]) == {}
+
+    db = sqlite3.connect(sqlite_path)
+    try:
+        colliding = db.execute("SELECT region FROM regions WHERE collides ORDER BY origin").fetchall()
+        assert colliding == [("kernel",), ("rootfs",)]
+        assert db.execute("SELECT other_region, address FROM collisions WHERE region = 'kernel'").fetchall() == [("rootfs", 0x20)]
+        indexes = {row[0] for row in db.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert {"regions_map", "regions_origin", "regions_collides"} <= indexes
+    finally:
+        db.close()
@@ -0,0 +1,86 @@
+import subprocess
+import sys
+import pathlib
+
+# upper limit for 'import mm.diagram', as a multiple of a bare 'import pydantic', which the model needs anyway.
+# It is relative so that slow CI runners don't fail the test. Measured at about 4x, and over 20x before the imports were deferred.
+import_time_budget_ratio = 6
+
+# only imported for the inputs and outputs that use them
+deferred_modules = [
+    "typeguard", "PIL.Image", "PIL.ImageDraw", "PIL.ImageFont",
+    "mm.cache", "mm.clusters", "mm.dtb", "mm.elf", "mm.export", "mm.ldmap", "mm.ldscript", "mm.report", "mm.tiles",
+]
+
+repo_root = pathlib.Path(__file__).parent.parent
+
+
+def run_python(code: str, *options: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *options, "-c", code],
+        capture_output=True,
+        text=True,
+        cwd=repo_root
+    )
+
+
+def import_times(module: str) -> dict:
+    """The cumulative import time in microseconds of each module imported by 'import module'"""
+    res = run_python(f"import {module}", "-X", "importtime")
+    assert res.returncode == 0, res.stderr
+
+    # lines are formatted as "import time: self [us] | cumulative | imported package"
+    times = {}
+    for line in res.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_import_time_budget():
+    # the fastest of a few runs, to leave out the noise of other processes
+    diagram_times = [import_times("mm.diagram") for _ in range(3)]
+    pydantic_us = min(import_times("pydantic")["pydantic"] for _ in range(3))
+    diagram_us = min(times["mm.diagram"] for times in diagram_times)
+
+    assert diagram_us < import_time_budget_ratio * pydantic_us
+
+    for module in deferred_modules:
+        assert module not in diagram_times[0]
+
+
+def test_import_does_not_configure_logging():
+    res = run_python(
+        "import logging\n"
+        "import mm.diagram\n"
+        "assert not logging.getLogger().handlers\n"
+        "assert logging.getLogger().level == logging.WARNING\n"
+    )
+    assert res.returncode == 0, res.stderr
+
+
+def test_markdown_only_does_not_load_pillow(tmp_path):
+    report = tmp_path / "report.md"
+    res = run_python(
+        "import sys\n"
+        "import mm.diagram\n"
+        f"sys.argv = ['mm.diagram', 'kernel', '0x10', '0x30', '-l', '0x3e8', '-o', r'{report}', '--outputs', 'markdown']\n"
+        "mm.diagram.Diagram()\n"
+        "assert 'PIL.Image' not in sys.modules\n"
+    )
+    assert res.returncode == 0, res.stderr
+    assert report.exists()
+
+
+def test_cli_configures_logging(tmp_path):
+    report = tmp_path / "report.md"
+    res = subprocess.run(
+        [sys.executable, "-m", "mm.diagram", "kernel", "0x10", "0x30", "-l", "0x3e8", "-o", str(report), "--outputs", "markdown"],
+        capture_output=True,
+        text=True,
+        cwd=repo_root
+    )
+    assert res.returncode == 0, res.stderr
+    assert "INFO - Selected diagram height: 1000" in res.stdout
@@ -0,0 +1,148 @@
+import unittest
+import pytest
+import pathlib
+
+from tests.fixtures.common import test_setup
+
+import mm.diagram
+import mm.ldmap
+
+fixture_path = pathlib.Path("tests/fixtures/ldmap/firmware.map")
+
+
+def test_parse():
+    with fixture_path.open("r") as fp:
+        entries = list(mm.ldmap.parse(fp))
+
+    memories = [e for e in entries if isinstance(e, mm.ldmap.Memory)]
+    assert memories == [
+        mm.ldmap.Memory("FLASH", 0x08000000, 0x10000, "xr"),
+        mm.ldmap.Memory("RAM", 0x20000000, 0x5000, "xrw"),
+    ]
+
+    sections = [e for e in entries if isinstance(e, mm.ldmap.Section)]
+    output_sections = [s.name for s in sections if s.input_file is None]
+    assert output_sections == [
+        ".isr_vector", ".text", ".rodata", ".ARM.attributes", ".data", ".bss", "._user_heap_stack", ".debug_info"
+    ]
+
+    # the discarded input sections listed before the memory configuration are not included
+    assert sections[0].name == ".isr_vector"
+
+    data = next(s for s in sections if s.name == ".data" and s.input_file is None)
+    assert data.load_address == 0x080003c0
+
+    # wrapped names
+    wrapped = next(s for s in sections if s.name == ".text.HAL_RCC_OscConfig_with_a_very_long_name")
+    assert (wrapped.address, wrapped.size) == (0x08000258, 0x98)
+    assert wrapped.input_file == "./Drivers/HAL/Src/stm32_hal_rcc.o"
+
+    # fill is skipped
+    assert not any(s.name == "*fill*" for s in sections)
+
+
+def test_load_output_sections():
+    memory_maps = mm.ldmap.load(fixture_path)
+
+    assert list(memory_maps) == ["FLASH", "RAM"]
+    assert memory_maps["FLASH"].max_address == 0x08010000
+    assert memory_maps["FLASH"].origin == 0x08000000
+    assert memory_maps["RAM"].max_address == 0x20005000
+    assert list(memory_maps["FLASH"].memory_regions) == [".isr_vector", ".text", ".rodata", ".data (LMA)"]
+    assert list(memory_maps["RAM"].memory_regions) == [".data", ".bss", "._user_heap_stack"]
+
+    # initialised data is loaded from flash
+    lma = memory_maps["FLASH"].memory_regions[".data (LMA)"]
+    assert lma.origin == 0x080003c0
+    assert lma.size == 0x10
+    assert lma.links == [("RAM", ".data")]
+
+
+def test_load_input_sections():
+    memory_maps = mm.ldmap.load(fixture_path, sections="input")
+
+    assert list(memory_maps["FLASH"].memory_regions) == [
+        ".isr_vector (startup_stm32.o)",
+        ".text (crtbegin.o)",
+        ".text.main (main.o)",
+        ".text.HAL_RCC_OscConfig_with_a_very_long_name (stm32_hal_rcc.o)",
+        ".text (libc_nano.a(lib_a-memset.o))",
+        ".rodata.str1.4 (main.o)",
+    ]
+    # the empty COMMON section is skipped
+    assert list(memory_maps["RAM"].memory_regions) == [
+        ".data.SystemCoreClock (system_stm32.o)",
+        ".data (main.o)",
+        ".bss.counter (main.o)",
+    ]
+
+
+def test_load_without_memory_configuration(tmp_path):
+    map_file = tmp_path / "nomem.map"
+    map_file.write_text(
+        "Linker script and memory map\n"
+        "\n"
+        ".text           0x0000000000001000      0x100\n"
+        " .text          0x0000000000001000      0x100 main.o\n"
+        ".text           0x0000000000002000      0x100\n"
+        ".debug_info     0x0000000000000000       0x80\n"
+    )
+
+    memory_maps = mm.ldmap.load(map_file)
+    assert list(memory_maps) == ["default"]
+    # duplicate names are numbered and debug sections are skipped
+    assert list(memory_maps["default"].memory_regions) == [".text", ".text #2"]
+    assert memory_maps["default"].max_address == 0x2100
+
+
+def test_load_memory_at_origin_zero(tmp_path):
+    """The debug sections at address 0 are skipped, even if a memory starts at 0"""
+    map_file = tmp_path / "zero.map"
+    map_file.write_text(
+        "Memory Configuration\n"
+        "\n"
+        "Name             Origin             Length             Attributes\n"
+        "FLASH            0x0000000000000000 0x0000000000010000 xr\n"
+        "*default*        0x0000000000000000 0xffffffffffffffff\n"
+        "\n"
+        "Linker script and memory map\n"
+        "\n"
+        ".text           0x0000000000000000      0x100\n"
+        ".ARM.attributes\n"
+        "                0x0000000000000000       0x2e\n"
+        ".comment        0x0000000000000000       0x49\n"
+        ".debug_info     0x0000000000000000       0x80\n"
+    )
+
+    memory_maps = mm.ldmap.load(map_file)
+    assert list(memory_maps) == ["FLASH"]
+    assert list(memory_maps["FLASH"].memory_regions) == [".text"]
+
+
+@pytest.mark.parametrize("test_setup", [{"file_path": "out/tmp/ldmap_cli"}], indirect=True)
+def test_ldmap_cli(test_setup):
+
+    with unittest.mock.patch(
+        "sys.argv",
+        [
+            "mm.diagram",
+            "--ldmap", str(fixture_path),
+            "-l", hex(1000),
+            "-o", str(test_setup["report"]),
+            "--outputs", "markdown", "results-json"
+        ]
+    ):
+        d = mm.diagram.Diagram()
+
+    assert d.model.name == "firmware"
+    assert list(d.model.memory_maps) == ["FLASH", "RAM"]
+    assert test_setup["report"].exists()
+
+
+def test_ldmap_cli_conflicts_with_file():
+    with unittest.mock.patch(
+        "sys.argv",
+        ["mm.diagram", "--ldmap", str(fixture_path), "-f", "docs/example/example1.json"]
+    ):
+        with pytest.raises(SystemExit):
+            mm.diagram.Diagram()
@@ -0,0 +1,175 @@
+import math
+import os
+import unittest
+import pytest
+import pathlib
+
+from tests.fixtures.common import test_setup
+
+import mm.axis
+import mm.diagram
+import mm.ldmap
+import mm.ldscript
+import mm.metamodel
+
+script = """
+/* Entry Point */
+ENTRY(Reset_Handler)
+
+_Min_Stack_Size = 0x400; /* required amount of stack */
+FLASH_BASE = 0x08000000;
+
+MEMORY
+{
+  FLASH (rx)      : ORIGIN = FLASH_BASE, LENGTH = 64K
+  RAM (xrw)       : ORIGIN = 0x20000000, LENGTH = 20K - _Min_Stack_Size
+  STACK (rw)      : org = ORIGIN(RAM) + LENGTH(RAM), len = _Min_Stack_Size
+  BACKUP (!x)     : o = 0x40024000 | 0x100, l = (1 << 12) / 2
+  QSPI            : ORIGIN = 0x90000000, LENGTH = 2M
+}
+
+_estack = ORIGIN(STACK) + LENGTH(STACK);
+
+SECTIONS
+{
+  .isr_vector : { . = ALIGN(4); KEEP(*(.isr_vector)) } >FLASH
+  .text : { *(.text*) } >FLASH
+}
+"""
+
+
+def test_parse():
+    memories = mm.ldscript.parse(script)
+
+    assert memories == {
+        "FLASH": mm.ldmap.Memory("FLASH", 0x08000000, 64 * 1024, "rx"),
+        "RAM": mm.ldmap.Memory("RAM", 0x20000000, 20 * 1024 - 0x400, "xrw"),
+        "STACK": mm.ldmap.Memory("STACK", 0x20004c00, 0x400, "rw"),
+        "BACKUP": mm.ldmap.Memory("BACKUP", 0x40024100, 0x800, "!x"),
+        "QSPI": mm.ldmap.Memory("QSPI", 0x90000000, 2 * 1024 * 1024, ""),
+    }
+
+
+@pytest.mark.parametrize("expression, expected", [
+    ("0x10 + 2 * 3", 0x16),
+    ("(0x10 + 2) * 3", 0x36),
+    ("1M - 4K", 1024 * 1024 - 4096),
+    ("100h", 0x100),
+    ("010", 8),
+    ("~0 & 0xff", 0xff),
+    ("ALIGN(0x1001, 0x1000)", 0x2000),
+    ("MAX(1K, 0x800)", 0x800),
+])
+def test_expressions(expression, expected):
+    memories = mm.ldscript.parse(f"MEMORY {{ M : ORIGIN = {expression}, LENGTH = 1 }}")
+    assert memories["M"].origin == expected
+
+
+@pytest.mark.parametrize("text", [
+    "MEMORY { M : ORIGIN = UNDEFINED_SYMBOL, LENGTH = 1 }",
+    "MEMORY { M : ORIGIN = ORIGIN(OTHER), LENGTH = 1 }",
+    "MEMORY { M : START = 0, LENGTH = 1 }",
+    "MEMORY { M (rx",
+])
+def test_invalid(text):
+    with pytest.raises(ValueError):
+        mm.ldscript.parse(text)
+
+
+def test_load_cache(tmp_path):
+    """The file is only parsed again when it is modified"""
+    ld_path = tmp_path / "cached.ld"
+    ld_path.write_text(script)
+
+    mm.ldscript._load_cached.cache_clear()
+    first = mm.ldscript.load(ld_path)
+    assert mm.ldscript.load(ld_path) == first
+    assert mm.ldscript._load_cached.cache_info().hits == 1
+
+    ld_path.write_text("MEMORY { RAM : ORIGIN = 0x0, LENGTH = 1K }")
+    stat = ld_path.stat()
+    os.utime(ld_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert list(mm.ldscript.load(ld_path)) == ["RAM"]
+
+    # the cached results can't be modified by the caller
+    mm.ldscript.load(ld_path).clear()
+    assert list(mm.ldscript.load(ld_path)) == ["RAM"]
+
+
+def test_bounded_memory_map():
+    """The drawing scale is set by the origin and max address, not the region data or diagram height"""
+    memory_maps = {
+        "FLASH": {
+            "memory_regions": {
+                "vectors": {"origin": "0x8000000", "size": "0x200"},
+                "text": {"origin": "0x8000200", "size": "0x400"},
+            },
+        },
+        "RAM": {
+            "memory_regions": {
+                "data": {"origin": "0x1fffff00", "size": "0x200"},
+            },
+        },
+    }
+    mm.ldscript.apply_bounds(memory_maps, mm.ldscript.parse(script))
+    model = mm.metamodel.Diagram(name="bounded", height=1000, width=400, memory_maps=memory_maps)
+
+    flash = model.memory_maps["FLASH"]
+    assert (flash.origin, flash.max_address) == (0x08000000, 0x08010000)
+    # the address range fits the map height below the title
+    assert flash.draw_scale == math.ceil(0x10000 / mm.axis.regions_height(1000, model.text_size)) == 69
+    assert flash.memory_regions["text"].freespace == 0x10000 - 0x600
+
+    # the region starts below the origin of the map
+    assert model.memory_maps["RAM"].memory_regions["data"].collisions == {"start": 0x20000000}
+
+
+@pytest.mark.parametrize("test_setup", [{"file_path": "out/tmp/ldscript_elf"}], indirect=True)
+def test_ldscript_elf_cli(test_setup):
+    """The ELF sections are split into a memory map for each memory region"""
+
+    with unittest.mock.patch(
+        "sys.argv",
+        [
+            "mm.diagram",
+            "--elf", "tests/fixtures/elf/firmware.elf",
+            "--ldscript", "tests/fixtures/elf/firmware.ld",
+            "-l", hex(1000),
+            "-o", str(test_setup["report"]),
+        ]
+    ):
+        d = mm.diagram.Diagram()
+
+    flash, ram = d.model.memory_maps["FLASH"], d.model.memory_maps["RAM"]
+    assert list(flash.memory_regions) == [".text", ".rodata", ".data (LMA)"]
+    assert list(ram.memory_regions) == [".data", ".bss"]
+    assert flash.memory_regions[".data (LMA)"].links == [("RAM", ".data")]
+    assert (flash.origin, flash.max_address) == (0x08000000, 0x08010000)
+    assert (ram.origin, ram.max_address) == (0x20000000, 0x20005000)
+    assert "- origin = 0x8000000 (134,217,728)" in test_setup["report"].read_text()
+
+
+@pytest.mark.parametrize("test_setup", [{"file_path": "out/tmp/ldscript_json"}], indirect=True)
+def test_ldscript_json_cli(test_setup, tmp_path):
+    """Memory maps with the same name as a memory region are bounded by it"""
+
+    ld_path = tmp_path / "bounds.ld"
+    ld_path.write_text("MEMORY { dram : ORIGIN = 0x10, LENGTH = 0x3d8 }")
+
+    with unittest.mock.patch(
+        "sys.argv",
+        [
+            "mm.diagram",
+            "kernel", "0x10", "0x50",
+            "rootfs", "0x60", "0x30",
+            "-n", "dram",
+            "-l", hex(1000),
+            "--ldscript", str(ld_path),
+            "-o", str(test_setup["report"]),
+        ]
+    ):
+        d = mm.diagram.Diagram()
+
+    dram = d.model.memory_maps["dram"]
+    assert (dram.origin, dram.max_address) == (0x10, 0x3e8)
+    assert not dram.memory_regions["kernel"].collisions
@@ -0,0 +1,115 @@
+import json
+import unittest
+import PIL.Image
+import PIL.ImageColor
+import pytest
+
+from tests.fixtures.common import test_setup
+
+import mm.diagram
+import mm.image
+
+
+def links_input(link_count: int) -> dict:
+    """Each region of 'flash' is linked to the region of the same size in 'ram'"""
+    flash = {}
+    ram = {}
+    for idx in range(link_count):
+        flash[f"f{idx}"] = {"origin": hex(idx * 0x1000), "size": hex(0x800), "links": [["ram", f"r{idx}"]]}
+        ram[f"r{idx}"] = {"origin": hex(idx * 0x1000 + 0x400), "size": hex(0x800)}
+    return {
+        "name": "links",
+        "height": 1000,
+        "width": 1000,
+        "link_alpha": 128,
+        "memory_maps": {
+            "flash": {"max_address": hex(link_count * 0x1000), "memory_regions": flash},
+            "ram": {"max_address": hex(link_count * 0x1000 + 0x400), "memory_regions": ram},
+        },
+    }
+
+
+def run(tmp_path, report, input_dict):
+    json_path = tmp_path / "input.json"
+    json_path.write_text(json.dumps(input_dict))
+    with unittest.mock.patch("sys.argv", ["mm.diagram", "-f", str(json_path), "-o", str(report), "--outputs", "diagram"]):
+        return mm.diagram.Diagram()
+
+
+@pytest.mark.parametrize("test_setup", [{"file_path": "out/tmp/links"}], indirect=True)
+def test_link_layer(test_setup, tmp_path):
+    """The arrows are drawn into one layer, instead of compositing the whole diagram for each arrow"""
+
+    with unittest.mock.patch.object(mm.image.ArrowBlock, "overlay", side_effect=AssertionError("arrow overlay")):
+        with unittest.mock.patch.object(
+                mm.image.ArrowBlock, "composite_onto", autospec=True, side_effect=mm.image.Image.composite_onto) as composite:
+            d = run(tmp_path, test_setup["report"], links_input(8))
+
+    assert composite.call_count == 8
+    img = PIL.Image.open(test_setup["diagram_image"])
+    assert img.size == (1000, 1000)
+
+    # the arrow heads are drawn next to the target map with the link colour at link_alpha over the background
+    link_colour = PIL.Image.alpha_composite(
+        PIL.Image.new("RGBA", (1, 1), d.model.bgcolour),
+        PIL.Image.new("RGBA", (1, 1), (*PIL.ImageColor.getrgb(d.model.link_fill_colour)[:3], 128))).getpixel((0, 0))
+    column = [img.getpixel((d.mmd_list[0].width - 20, y)) for y in range(img.height)]
+    link_rows = [y for y, pixel in enumerate(column) if pixel == link_colour]
+    # the rows of each arrow head are contiguous, apart from the odd anti-aliased pixel
+    heads = 1 + sum(1 for above, below in zip(link_rows, link_rows[1:]) if below - above > 2)
+    assert heads == 8
+
+
+def test_composite_onto_clips():
+    layer = PIL.Image.new("RGBA", (10, 10), (0, 0, 0, 0))
+    block = mm.image.Image("block", None)
+    block.img = PIL.Image.new("RGBA", (4, 4), (255, 0, 0, 255))
+
+    block.composite_onto(layer, mm.image.Point(-2, 8))
+    assert layer.getpixel((0, 9)) == (255, 0, 0, 255)
+    assert layer.getpixel((2, 9)) == (0, 0, 0, 0)
+    assert layer.getbbox() == (0, 8, 2, 10)
+
+    # entirely outside
+    block.composite_onto(layer, mm.image.Point(20, 20))
+    assert layer.getbbox() == (0, 8, 2, 10)
+
+
+def test_bundle_links():
+    vectors = [
+        (0, 1, mm.image.Point(10, 5), mm.image.Point(90, 15)),
+        (0, 1, mm.image.Point(10, 25), mm.image.Point(90, 35)),
+        # different band at the target
+        (0, 1, mm.image.Point(10, 45), mm.image.Point(90, 55)),
+        # different target map
+        (0, 2, mm.image.Point(10, 5), mm.image.Point(190, 15)),
+    ]
+    assert mm.diagram.Diagram._bundle_links(vectors, 0) == [(src, dst, 1) for _, _, src, dst in vectors]
+    assert mm.diagram.Diagram._bundle_links(vectors, 100) == [
+        (mm.image.Point(10, 25), mm.image.Point(90, 35), 3),
+        (mm.image.Point(10, 5), mm.image.Point(190, 15), 1),
+    ]
+    assert mm.diagram.Diagram._bundle_links(vectors, 40) == [
+        (mm.image.Point(10, 15), mm.image.Point(90, 25), 2),
+        (mm.image.Point(10, 45), mm.image.Point(90, 55), 1),
+        (mm.image.Point(10, 5), mm.image.Point(190, 15), 1),
+    ]
+
+
+@pytest.mark.parametrize("test_setup", [{"file_path": "out/tmp/links_bundled"}], indirect=True)
+def test_link_bundles(test_setup, tmp_path):
+    input_dict = links_input(8)
+    input_dict["link_bundle_height"] = 250
+
+    with unittest.mock.patch.object(
+            mm.image.ArrowBlock, "composite_onto", autospec=True, side_effect=mm.image.Image.composite_onto) as arrows:
+        with unittest.mock.patch.object(
+                mm.image.TextLabelImage, "composite_onto", autospec=True, side_effect=mm.image.Image.composite_onto) as badges:
+            run(tmp_path, test_setup["report"], input_dict)
+
+    # one arrow per band, with a badge when it has more than one link
+    assert 1 < arrows.call_count < 8
+    assert 0 < badges.call_count <= arrows.call_count
+    assert sorted(int(call.args[0].name) for call in badges.call_args_list)[-1] > 1
+    assert sum(int(call.args[0].name) for call in badges.call_args_list) + (arrows.call_count - badges.call_count) == 8
+    assert PIL.Image.open(test_setup["diagram_image"]).size == (1000, 1000)
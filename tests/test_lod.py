@@ -0,0 +1,109 @@
+import json
+import unittest
+import pytest
+import PIL.Image
+
+from tests.fixtures.common import test_setup
+
+import mm.diagram
+import mm.image
+
+
+def lod_input(lod_threshold: int = 1):
+    """500 adjacent tiny regions, a pair of colliding tiny regions and a tiny region with a link"""
+    flash = {f"obj{i}": {"origin": hex(0x10000 + i * 0x10), "size": hex(0x10)} for i in range(500)}
+    flash["collide1"] = {"origin": hex(0x80000), "size": hex(0x10)}
+    flash["collide2"] = {"origin": hex(0x80008), "size": hex(0x10)}
+    flash["linked"] = {"origin": hex(0x90000), "size": hex(0x100), "links": [["ram", "data"]]}
+    return {
+        "name": "lod",
+        "height": 1000,
+        "width": 1000,
+        "lod_threshold": lod_threshold,
+        "memory_maps": {
+            "flash": {"memory_regions": flash, "max_address": hex(0x400000)},
+            "ram": {"memory_regions": {"data": {"origin": hex(0x1000), "size": hex(0x100)}}, "max_address": hex(0x400000)},
+        },
+    }
+
+
+def run(tmp_path, report, input_dict, outputs=("diagram", "table")):
+    json_path = tmp_path / "input.json"
+    json_path.write_text(json.dumps(input_dict))
+    with unittest.mock.patch("sys.argv", ["mm.diagram", "-f", str(json_path), "-o", str(report), "--outputs", *outputs]):
+        return mm.diagram.Diagram()
+
+
+@pytest.mark.parametrize("test_setup", [{"file_path": "out/tmp/lod"}], indirect=True)
+def test_lod_aggregation(test_setup, tmp_path):
+    d = run(tmp_path, test_setup["report"], lod_input())
+    flash = next(mmd for mmd in d.mmd_list if mmd.name == "flash")
+
+    # all regions are still in the table and the report
+    assert len(flash.image_list) == 503
+
+    aggregates = [r for r in flash.draw_list if isinstance(r, mm.image.AggregateRegionImage)]
+    assert len(aggregates) == 1
+    assert len(aggregates[0].regions) == 500
+    assert aggregates[0].origin_as_int == 0x10000
+    assert aggregates[0].size_as_int == 500 * 0x10
+    assert aggregates[0].origin_label == "0x10000 (500 regions)"
+
+    # colliding and linked regions are always drawn individually
+    drawn = {r.name for r in flash.draw_list if isinstance(r, mm.image.MemoryRegionImage)}
+    assert drawn == {"collide1", "collide2", "linked"}
+
+    # the aggregated regions are not drawn at all
+    assert all(r.img is None for r in aggregates[0].regions)
+    assert test_setup["diagram_image"].exists()
+    assert test_setup["table_image"].exists()
+
+
+@pytest.mark.parametrize("test_setup", [{"file_path": "out/tmp/lod_disabled"}], indirect=True)
+def test_lod_disabled(test_setup, tmp_path):
+    d = run(tmp_path, test_setup["report"], lod_input(lod_threshold=0), outputs=("diagram",))
+    flash = next(mmd for mmd in d.mmd_list if mmd.name == "flash")
+
+    assert len(flash.draw_list) == 503
+    assert all(isinstance(r, mm.image.MemoryRegionImage) for r in flash.draw_list)
+    assert all(r.img is not None for r in flash.image_list)
+
+
+def test_lod_void_ends_run(tmp_path):
+    """A gap larger than the threshold is drawn as a void region, so the tiny regions either side are not merged"""
+    input_dict = lod_input()
+    regions = input_dict["memory_maps"]["flash"]["memory_regions"]
+    regions["obj250"]["origin"] = hex(0x200000)
+    regions["obj251"]["origin"] = hex(0x300000)
+
+    d = run(tmp_path, tmp_path / "report.md", input_dict, outputs=("diagram",))
+    flash = next(mmd for mmd in d.mmd_list if mmd.name == "flash")
+    aggregates = [r for r in flash.draw_list if isinstance(r, mm.image.AggregateRegionImage)]
+
+    assert [len(a.regions) for a in aggregates] == [250, 248]
+    assert sum(isinstance(r, mm.image.MemoryRegionImage) for r in flash.draw_list) == 5
+
+
+@pytest.mark.parametrize("test_setup", [{"file_path": "out/tmp/lod_sub_pixel"}], indirect=True)
+def test_lod_sub_pixel_regions_visible(test_setup, tmp_path):
+    """Colliding, linked and isolated regions smaller than one pixel are drawn at least one pixel tall"""
+    input_dict = lod_input()
+    input_dict["memory_maps"]["flash"]["memory_regions"]["linked"]["size"] = hex(0x10)
+    input_dict["memory_maps"]["flash"]["memory_regions"]["isolated"] = {"origin": hex(0x200000), "size": hex(0x10)}
+    input_dict["memory_maps"]["ram"]["memory_regions"]["data"]["size"] = hex(0x10)
+
+    d = run(tmp_path, test_setup["report"], input_dict, outputs=("diagram",))
+    flash_idx, flash = next((idx, mmd) for idx, mmd in enumerate(d.mmd_list) if mmd.name == "flash")
+    drawn = [r for r in flash.draw_list if isinstance(r, mm.image.MemoryRegionImage)]
+    assert {r.name for r in drawn} == {"collide1", "collide2", "linked", "isolated"}
+
+    diagram_img = PIL.Image.open(test_setup["diagram_image"]).convert("RGBA")
+    bgcolour = PIL.Image.new("RGBA", (1, 1), d.model.bgcolour).getpixel((0, 0))
+    for region in drawn:
+        assert region.draw_height >= 1
+        assert region.img.height >= 1
+
+        # the maps are drawn bottom up, below the 4px border
+        x = flash_idx * flash.width + region.draw_x + region.img.width // 4
+        y = diagram_img.height - 1 - (4 + flash.axis.pixel(region.draw_origin))
+        assert diagram_img.getpixel((x, y)) != bgcolour, region.name
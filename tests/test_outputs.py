@@ -0,0 +1,159 @@
+import unittest
+import pytest
+import json
+import PIL.Image
+
+from tests.fixtures.common import test_setup
+
+import mm.diagram
+
+
+@pytest.mark.parametrize("test_setup", [{"file_path": "out/tmp/outputs_markdown_only"}], indirect=True)
+def test_outputs_markdown_only(test_setup):
+    """No images should be created when only the markdown report is requested"""
+
+    with unittest.mock.patch(
+        "sys.argv",
+        [
+            "mm.diagram",
+            "kernel", "0x10", "0x30",
+            "rootfs", "0x20", "0x30",
+            "-l", hex(1000),
+            "-o", str(test_setup["report"]),
+            "--outputs", "markdown"
+        ]
+    ):
+        with unittest.mock.patch("PIL.Image.new", wraps=PIL.Image.new) as pil_image_new:
+            d = mm.diagram.Diagram()
+            assert pil_image_new.call_count == 0
+
+        # the report is written straight from the model, without any region images
+        assert d.mmd_list == []
+
+        assert test_setup["report"].exists()
+        assert not test_setup["diagram_image"].exists()
+        assert not test_setup["table_image"].exists()
+
+        # the report should not link to a diagram that was never created
+        assert "_diagram.png" not in test_setup["report"].read_text()
+
+
+@pytest.mark.parametrize("test_setup", [{"file_path": "out/tmp/outputs_table_json"}], indirect=True)
+def test_outputs_table_json(test_setup):
+
+    with unittest.mock.patch(
+        "sys.argv",
+        [
+            "mm.diagram",
+            "kernel", "0x10", "0x30",
+            "rootfs", "0x20", "0x30",
+            "-l", hex(1000),
+            "-o", str(test_setup["report"]),
+            "--outputs", "table", "json"
+        ]
+    ):
+        mm.diagram.Diagram()
+
+        assert not test_setup["report"].exists()
+        assert not test_setup["diagram_image"].exists()
+        assert test_setup["table_image"].exists()
+        assert test_setup["model_json"].exists()
+
+        with test_setup["model_json"].open("r") as fp:
+            data = json.load(fp)
+
+        regions = next(iter(data["memory_maps"].values()))["memory_regions"]
+        assert regions["kernel"]["collisions"] == {"rootfs": 0x20}
+        assert regions["rootfs"]["freespace"] == 1000 - (0x20 + 0x30)
+
+
+def test_outputs_json_keeps_input(tmp_path):
+    """The json output should never be written over the json input file"""
+
+    input_json = {
+        "name": "json", "height": 1000, "width": 400,
+        "memory_maps": {"flash": {"max_address": hex(1000), "memory_regions": {"kernel": {"origin": hex(0x10), "size": hex(0x30)}}}},
+    }
+    # the docs/example layout: the input json and the report share a stem
+    input_path = tmp_path / "example.json"
+    input_path.write_text(json.dumps(input_json))
+    with unittest.mock.patch(
+        "sys.argv",
+        ["mm.diagram", "-f", str(input_path), "-o", str(tmp_path / "example.md"), "--outputs", "json"]
+    ):
+        mm.diagram.Diagram()
+
+    assert json.loads(input_path.read_text()) == input_json
+    assert (tmp_path / "example_model.json").exists()
+
+    model_path = tmp_path / "example_model.json"
+    with unittest.mock.patch(
+        "sys.argv",
+        ["mm.diagram", "-f", str(model_path), "-o", str(tmp_path / "example.md"), "--outputs", "json"]
+    ):
+        with pytest.raises(SystemExit, match="overwrite the input file"):
+            mm.diagram.Diagram()
+
+
+def test_outputs_invalid_choice():
+
+    with unittest.mock.patch(
+        "sys.argv",
+        [
+            "mm.diagram",
+            "kernel", "0x10", "0x30",
+            "-l", hex(1000),
+            "--outputs", "pdf"
+        ]
+    ):
+        with pytest.raises(SystemExit):
+            mm.diagram.Diagram()
+
+
+@pytest.mark.parametrize("test_setup", [{"file_path": "out/tmp/outputs_table_pages"}], indirect=True)
+def test_outputs_table_pages(test_setup):
+    """Tables with more rows than '--table-rows' should be split into numbered pages"""
+
+    pages = [
+        test_setup["report"].parent / f"{test_setup['report'].stem}_table_{page:03d}.png"
+        for page in range(1, 4)
+    ]
+    for page in pages:
+        page.unlink(missing_ok=True)
+
+    with unittest.mock.patch(
+        "sys.argv",
+        [
+            "mm.diagram",
+            "kernel", "0x10", "0x30",
+            "rootfs", "0x50", "0x30",
+            "dtb", "0x90", "0x30",
+            "uboot", "0xD0", "0x30",
+            "uboot-scr", "0x110", "0x30",
+            "-l", hex(1000),
+            "-o", str(test_setup["report"]),
+            "--outputs", "table", "markdown",
+            "--table-rows", "2"
+        ]
+    ):
+        mm.diagram.Diagram()
+
+    assert not test_setup["table_image"].exists()
+    page_imgs = [PIL.Image.open(page) for page in pages]
+
+    # 2 + 2 + 1 rows, every page has the same header and caption
+    assert page_imgs[0].height == page_imgs[1].height
+    assert page_imgs[2].height < page_imgs[0].height
+
+    report = test_setup["report"].read_text()
+    for idx, page in enumerate(pages):
+        assert f"[summary table (page {idx + 1} of 3)]({page.name})" in report
+
+
+def test_outputs_table_rows_invalid():
+    with unittest.mock.patch(
+        "sys.argv",
+        ["mm.diagram", "kernel", "0x10", "0x30", "-l", hex(1000), "--table-rows", "0"]
+    ):
+        with pytest.raises(SystemExit):
+            mm.diagram.Diagram()
@@ -21,12 +21,12 @@ test_desc = """
 @pytest.mark.parametrize(
     'psize, expected_scale_res, test_setup', 
     [
-        (mm.diagram.A3, (1, 3382), {"file_path": "docs/example/A3_region_exceeds_height_no_maxaddress_set", "test_desc": test_desc}),
-        (mm.diagram.A4, (2, 4783), {"file_path": "docs/example/A4_region_exceeds_height_no_maxaddress_set", "test_desc": test_desc}),
-        (mm.diagram.A5, (2, 6766), {"file_path": "docs/example/A5_region_exceeds_height_no_maxaddress_set", "test_desc": test_desc}),
-        (mm.diagram.A6, (3, 9598), {"file_path": "docs/example/A6_region_exceeds_height_no_maxaddress_set", "test_desc": test_desc}),
-        (mm.diagram.A7, (4, 13531), {"file_path": "docs/example/A7_region_exceeds_height_no_maxaddress_set", "test_desc": test_desc}),
-        (mm.diagram.A8, (5, 19196), {"file_path": "docs/example/A8_region_exceeds_height_no_maxaddress_set", "test_desc": test_desc}),
+        (mm.diagram.A3, (1, 3408), {"file_path": "docs/example/A3_region_exceeds_height_no_maxaddress_set", "test_desc": test_desc}),
+        (mm.diagram.A4, (1, 4834), {"file_path": "docs/example/A4_region_exceeds_height_no_maxaddress_set", "test_desc": test_desc}),
+        (mm.diagram.A5, (2, 6868), {"file_path": "docs/example/A5_region_exceeds_height_no_maxaddress_set", "test_desc": test_desc}),
+        (mm.diagram.A6, (2, 9806), {"file_path": "docs/example/A6_region_exceeds_height_no_maxaddress_set", "test_desc": test_desc}),
+        (mm.diagram.A7, (3, 13947), {"file_path": "docs/example/A7_region_exceeds_height_no_maxaddress_set", "test_desc": test_desc}),
+        (mm.diagram.A8, (5, 20045), {"file_path": "docs/example/A8_region_exceeds_height_no_maxaddress_set", "test_desc": test_desc}),
     ], indirect=['test_setup']
 )
 def test_generate_doc_region_exceeds_height_no_maxaddress_set(
@@ -88,12 +88,12 @@ test_desc = """
 @pytest.mark.parametrize(
     'psize, expected_scale_res, test_setup', 
     [
-        (mm.diagram.A3, (1, 3544), {"file_path": "docs/example/A3_region_freespace_exceeds_height_higher_maxaddress_set", "test_desc": test_desc}),
-        (mm.diagram.A4, (2, 5011), {"file_path": "docs/example/A4_region_freespace_exceeds_height_higher_maxaddress_set", "test_desc": test_desc}),
-        (mm.diagram.A5, (2, 7088), {"file_path": "docs/example/A5_region_freespace_exceeds_height_higher_maxaddress_set", "test_desc": test_desc}),
-        (mm.diagram.A6, (3, 10056), {"file_path": "docs/example/A6_region_freespace_exceeds_height_higher_maxaddress_set", "test_desc": test_desc}),
-        (mm.diagram.A7, (4, 14176), {"file_path": "docs/example/A7_region_freespace_exceeds_height_higher_maxaddress_set", "test_desc": test_desc}),
-        (mm.diagram.A8, (5, 20112), {"file_path": "docs/example/A8_region_freespace_exceeds_height_higher_maxaddress_set", "test_desc": test_desc}),
+        (mm.diagram.A3, (1, 3438), {"file_path": "docs/example/A3_region_freespace_exceeds_height_higher_maxaddress_set", "test_desc": test_desc}),
+        (mm.diagram.A4, (1, 4896), {"file_path": "docs/example/A4_region_freespace_exceeds_height_higher_maxaddress_set", "test_desc": test_desc}),
+        (mm.diagram.A5, (2, 6994), {"file_path": "docs/example/A5_region_freespace_exceeds_height_higher_maxaddress_set", "test_desc": test_desc}),
+        (mm.diagram.A6, (2, 10065), {"file_path": "docs/example/A6_region_freespace_exceeds_height_higher_maxaddress_set", "test_desc": test_desc}),
+        (mm.diagram.A7, (3, 14476), {"file_path": "docs/example/A7_region_freespace_exceeds_height_higher_maxaddress_set", "test_desc": test_desc}),
+        (mm.diagram.A8, (5, 21157), {"file_path": "docs/example/A8_region_freespace_exceeds_height_higher_maxaddress_set", "test_desc": test_desc}),
     ], indirect=['test_setup']
 )
 def test_generate_doc_region_freespace_exceeds_height_higher_maxaddress_set(
@@ -131,7 +131,7 @@ def test_generate_doc_region_freespace_exceeds_height_higher_maxaddress_set(
 
             d = mm.diagram.Diagram()
 
-            assert "Region freespace exceeds diagram height" in caplog.text
+            assert "Drawing scales fitted to the diagram height" in caplog.text
 
             mmap: mm.metamodel.MemoryMap
             for mname, mmap in d.model.memory_maps.items():
@@ -160,10 +160,10 @@ test_desc = """
     'psize, expected_scale_res, test_setup', 
     [
         (mm.diagram.A3, (1, 2), {"file_path": "docs/example/A3_maxaddress_lower_than_memregions", "test_desc": test_desc}),
-        (mm.diagram.A4, (2, 2), {"file_path": "docs/example/A4_maxaddress_lower_than_memregions", "test_desc": test_desc}),
+        (mm.diagram.A4, (1, 2), {"file_path": "docs/example/A4_maxaddress_lower_than_memregions", "test_desc": test_desc}),
         (mm.diagram.A5, (2, 3), {"file_path": "docs/example/A5_maxaddress_lower_than_memregions", "test_desc": test_desc}),
-        (mm.diagram.A6, (3, 3), {"file_path": "docs/example/A6_maxaddress_lower_than_memregions", "test_desc": test_desc}),
-        (mm.diagram.A7, (4, 5), {"file_path": "docs/example/A7_maxaddress_lower_than_memregions", "test_desc": test_desc}),
+        (mm.diagram.A6, (2, 3), {"file_path": "docs/example/A6_maxaddress_lower_than_memregions", "test_desc": test_desc}),
+        (mm.diagram.A7, (3, 5), {"file_path": "docs/example/A7_maxaddress_lower_than_memregions", "test_desc": test_desc}),
         (mm.diagram.A8, (5, 6), {"file_path": "docs/example/A8_maxaddress_lower_than_memregions", "test_desc": test_desc}),
     ], indirect=['test_setup']
 )
@@ -202,7 +202,7 @@ def test_generate_doc_maxaddress_lower_than_memregions(
 
             d = mm.diagram.Diagram()
 
-            # assert "Region freespace exceeds diagram height" in caplog.text
+            # assert "Drawing scales fitted to the diagram height" in caplog.text
 
             mmap: mm.metamodel.MemoryMap
             for mname, mmap in d.model.memory_maps.items():
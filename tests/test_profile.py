@@ -0,0 +1,179 @@
+import unittest
+import pytest
+import json
+import pathlib
+import tracemalloc
+import PIL.Image
+
+from tests.fixtures.common import test_setup
+
+import mm.diagram
+import mm.image
+import mm.profile
+
+
+def profile_paths(report: pathlib.Path):
+    return (
+        report.parent / (report.stem + "_profile.json"),
+        report.parent / (report.stem + "_trace.json"),
+    )
+
+
+@pytest.mark.parametrize("test_setup", [{"file_path": "out/tmp/profile_cli"}], indirect=True)
+def test_profile_cli(test_setup):
+    """The '--profile' option should save the spans as json and as a Chrome trace"""
+
+    profile_json, trace_json = profile_paths(test_setup["report"])
+    profile_json.unlink(missing_ok=True)
+    trace_json.unlink(missing_ok=True)
+
+    with unittest.mock.patch(
+        "sys.argv",
+        [
+            "mm.diagram",
+            "kernel", "0x10", "0x30",
+            "rootfs", "0x20", "0x30",
+            "-l", hex(1000),
+            "-o", str(test_setup["report"]),
+            "--profile"
+        ]
+    ):
+        mm.diagram.Diagram()
+
+    assert mm.profile.active is None
+
+    spans = json.loads(profile_json.read_text())
+    assert all(s["duration_s"] >= 0 for s in spans)
+    assert [s["start_s"] for s in spans] == sorted(s["start_s"] for s in spans)
+
+    trace = json.loads(trace_json.read_text())
+    names = {e["name"] for e in trace["traceEvents"]}
+    for expected in (
+        "_create_model",
+        "Diagram.calc_nearest_region",
+        "_create_image_list",
+        "_create_mmap",
+        "draw_diagram_img",
+        "_draw_links",
+        "_create_table_image",
+        "_create_markdown",
+        "save",
+    ):
+        assert expected in names
+    assert all(e["ph"] == "X" for e in trace["traceEvents"])
+
+    # nested spans record their parent
+    mmap_span = next(s for s in spans if s["name"] == "_create_mmap")
+    assert mmap_span["parent"] == "_create_image_list"
+    assert mmap_span["args"] == {"map": "Untitled"}
+
+
+@pytest.mark.parametrize("test_setup", [{"file_path": "out/tmp/profile_api"}], indirect=True)
+def test_profile_api(test_setup):
+    """Profiling can be enabled without the command line option"""
+
+    profile_json, trace_json = profile_paths(test_setup["report"])
+    profile_json.unlink(missing_ok=True)
+    trace_json.unlink(missing_ok=True)
+
+    with unittest.mock.patch(
+        "sys.argv",
+        [
+            "mm.diagram",
+            "kernel", "0x10", "0x30",
+            "-l", hex(1000),
+            "-o", str(test_setup["report"]),
+            "--outputs", "markdown"
+        ]
+    ):
+        mm.diagram.Diagram(profile=True)
+
+    assert mm.diagram.Diagram.profiler.spans
+    assert profile_json.exists()
+    assert trace_json.exists()
+
+
+@pytest.mark.parametrize("test_setup", [{"file_path": "out/tmp/profile_disabled"}], indirect=True)
+def test_profile_disabled_by_default(test_setup):
+
+    profile_json, trace_json = profile_paths(test_setup["report"])
+    profile_json.unlink(missing_ok=True)
+    trace_json.unlink(missing_ok=True)
+
+    with unittest.mock.patch(
+        "sys.argv",
+        [
+            "mm.diagram",
+            "kernel", "0x10", "0x30",
+            "-l", hex(1000),
+            "-o", str(test_setup["report"]),
+            "--outputs", "markdown"
+        ]
+    ):
+        mm.diagram.Diagram()
+
+    assert mm.diagram.Diagram.profiler is None
+    assert mm.profile.active is None
+    assert not profile_json.exists()
+    assert not trace_json.exists()
+
+
+@pytest.mark.parametrize("test_setup", [{"file_path": "out/tmp/profile_memory"}], indirect=True)
+def test_profile_memory(test_setup):
+    """Each span should report the images allocated and the memory peaks"""
+
+    profile_json, trace_json = profile_paths(test_setup["report"])
+
+    with unittest.mock.patch(
+        "sys.argv",
+        [
+            "mm.diagram",
+            "kernel", "0x10", "0x30",
+            "rootfs", "0x20", "0x30",
+            "-l", hex(1000),
+            "-o", str(test_setup["report"]),
+            "--profile-memory"
+        ]
+    ):
+        mm.diagram.Diagram()
+
+    assert not tracemalloc.is_tracing()
+
+    spans = {s["name"]: s for s in json.loads(profile_json.read_text())}
+    for s in spans.values():
+        assert s["peak_traced_bytes"] >= 0
+        assert "peak_rss_bytes" in s
+
+    # nested spans are included in the parent totals
+    root = spans["_create_outputs"]
+    assert root["images"] == mm.diagram.Diagram.profiler.images
+    assert root["image_bytes"] == mm.diagram.Diagram.profiler.image_bytes
+    assert root["images"] >= spans["draw_diagram_img"]["images"] > 0
+    assert root["peak_traced_bytes"] >= spans["draw_diagram_img"]["peak_traced_bytes"]
+
+    trace = json.loads(trace_json.read_text())
+    mmap_event = next(e for e in trace["traceEvents"] if e["name"] == "_create_mmap")
+    assert mmap_event["args"]["image_bytes"] > 0
+
+
+def test_profile_counts_scratch_images():
+    """The full size overlay mask layers and the arrow scratch image should be counted"""
+
+    mm.image.import_pillow()
+    profiler = mm.profile.Profiler()
+    dest = PIL.Image.new("RGBA", (1000, 1000))
+    original_new = PIL.Image.Image._new
+    with mm.profile.profiling(profiler):
+        with profiler.span("arrow") as arrow_span:
+            arrow = mm.image.ArrowBlock(mm.image.Point(0, 0), mm.image.Point(300, 400))
+        with profiler.span("overlay") as overlay_span:
+            arrow.overlay(dest)
+    # the allocation hook is only installed while profiling
+    assert mm.profile.active is None
+    assert PIL.Image.Image._new is original_new
+
+    # the l x l scratch image
+    assert arrow_span["image_bytes"] >= 500 * 500 * 4
+    # the mask and alpha layers, and the composite
+    assert overlay_span["images"] == 3
+    assert overlay_span["image_bytes"] == 3 * 1000 * 1000 * 4
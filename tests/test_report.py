@@ -0,0 +1,90 @@
+import unittest
+import pytest
+import io
+
+from tests.fixtures.common import test_setup
+
+import mm.diagram
+import mm.image
+import mm.metamodel
+import mm.report
+
+
+def create_model() -> mm.metamodel.Diagram:
+    return mm.metamodel.Diagram(
+        name="report",
+        height=1000,
+        width=1000,
+        memory_maps={
+            "flash": {
+                "memory_regions": {
+                    "boot": {"origin": "0x10", "size": "0x20"},
+                    "app": {"origin": "0x100", "size": "0x40"},
+                    "data": {"origin": "0x20", "size": "0x20"},
+                }
+            },
+            "ram": {
+                "memory_regions": {
+                    "stack": {"origin": "0x200", "size": "0x40"},
+                    "heap": {"origin": "0x10", "size": "0x40"},
+                }
+            },
+        }
+    )
+
+
+def test_sorted_regions():
+    """Regions of every map should be merged by descending origin. Equal origins keep the map order."""
+    order = [(mmap_name, region_name) for mmap_name, region_name, _ in mm.report.sorted_regions(create_model())]
+    assert order == [
+        ("ram", "stack"),
+        ("flash", "app"),
+        ("flash", "data"),
+        ("flash", "boot"),
+        ("ram", "heap"),
+    ]
+
+
+def test_format_row():
+    model = create_model()
+    region = model.memory_maps["flash"].memory_regions["boot"]
+    assert mm.report.format_row("flash", "boot", region, 2) == \
+        "|boot (flash)|0x10 (16)|0x20 (32)|-0x10 (-16)| data @ 0x20 ||2:1|"
+    assert mm.report.format_row("flash", "boot", region, 2, "red").startswith(
+        "|<span style='color:red'>boot (flash)</span>|")
+
+
+def test_write_markdown():
+    model = create_model()
+    fp = io.StringIO()
+    mm.report.write_markdown(fp, model, ["![memory map diagram](report_diagram.png)"])
+    lines = fp.getvalue().splitlines()
+    assert lines[0] == "![memory map diagram](report_diagram.png)"
+    assert lines[1] == "|region (parent)|origin|size|free Space|collisions|links|draw scale|"
+    assert lines[3].startswith("|stack (ram)|")
+    assert "#### flash:" in lines
+    assert "#### ram:" in lines
+
+
+@pytest.mark.parametrize("test_setup", [{"file_path": "out/tmp/report_no_region_images"}], indirect=True)
+def test_markdown_without_region_images(test_setup):
+    """The markdown only output should not create any region objects"""
+
+    with unittest.mock.patch(
+        "sys.argv",
+        [
+            "mm.diagram",
+            "kernel", "0x10", "0x30",
+            "rootfs", "0x20", "0x30",
+            "-l", hex(1000),
+            "-o", str(test_setup["report"]),
+            "--outputs", "markdown"
+        ]
+    ):
+        with unittest.mock.patch("mm.image.MemoryRegionImage") as region_image:
+            mm.diagram.Diagram()
+            assert region_image.call_count == 0
+
+    report = test_setup["report"].read_text()
+    assert "|rootfs (Untitled)|0x20 (32)|" in report
+    assert "|kernel (Untitled)|0x10 (16)|" in report
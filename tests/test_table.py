@@ -0,0 +1,43 @@
+import pytest
+import PIL.Image
+import PIL.ImageDraw
+import PIL.ImageFont
+
+import mm.image
+import mm.profile
+
+texts = [
+    "",
+    "kernel (dram)",
+    "0x10 (16)",
+    "+None",
+    "-rootfs@0x20\n-dtb@0x30",
+    "a\n\nb",
+    "\nleading newline",
+    "trailing newline\n",
+]
+
+
+@pytest.mark.parametrize("font", [PIL.ImageFont.load_default(), PIL.ImageFont.load_default(15)])
+def test_measure_text(font):
+    """The text size should match the ImageDraw bounding box"""
+
+    line_spacing = font.getbbox("A")[3] + 4
+    for text in texts:
+        left, top, right, bottom = PIL.ImageDraw.Draw(PIL.Image.new("RGBA", (0, 0))).multiline_textbbox((0, 0), text, font=font)
+        assert mm.image.Table()._measure_text(text, font, line_spacing) == (right - left, bottom - top)
+
+
+def test_table_allocates_one_image():
+    """Measuring the cells should not need any images"""
+
+    profiler = mm.profile.Profiler()
+    with mm.profile.profiling(profiler):
+        img = mm.image.Table().get_table_img(
+            table=[[text, "0x10"] for text in texts],
+            header=["name", "origin"],
+            align=["l", "r"],
+        )
+
+    assert profiler.images == 1
+    assert profiler.image_bytes == img.width * img.height * 4
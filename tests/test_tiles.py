@@ -0,0 +1,97 @@
+import json
+import unittest
+import PIL.Image
+import pytest
+
+from tests.fixtures.common import test_setup
+
+import mm.diagram
+import mm.metamodel
+import mm.tiles
+import mm.window
+
+tiles_input = {
+    "name": "soc",
+    "height": 1000,
+    "width": 1000,
+    "memory_maps": {
+        "dram": {
+            "max_address": hex(0x100000),
+            "memory_regions": {
+                "kernel": {"origin": hex(0x1000), "size": hex(0x8000)},
+                "dtb": {"origin": hex(0x80000), "size": hex(0x400)},
+                "initrd": {"origin": hex(0x80200), "size": hex(0x400)},
+            },
+        },
+        "/soc/flash": {
+            "max_address": hex(0x100000),
+            "memory_regions": {"boot": {"origin": hex(0x0), "size": hex(0x10000)}},
+        },
+    },
+}
+
+
+def test_tile_levels():
+    levels = mm.tiles.tile_levels(mm.window.Window(0, 0x100000), 256, 20)
+    assert levels[0] == mm.tiles.TileLevel(0, 0x1000, 1)
+    assert levels[1] == mm.tiles.TileLevel(1, 0x800, 2)
+    # stops at 1:1
+    assert levels[-1] == mm.tiles.TileLevel(12, 1, 0x1000)
+
+    assert len(mm.tiles.tile_levels(mm.window.Window(0, 0x100000), 256, 3)) == 3
+
+
+def test_content_rows():
+    regions = {
+        "a": mm.metamodel.MemoryRegion(origin=hex(0x100), size=hex(0x300)),
+        # inside a
+        "b": mm.metamodel.MemoryRegion(origin=hex(0x200), size=hex(0x10)),
+        "c": mm.metamodel.MemoryRegion(origin=hex(0x1000), size=hex(0x1)),
+    }
+    index = mm.window.RegionIndex(regions)
+    assert mm.tiles.content_rows(index, mm.window.Window(0, 0x2000), 0x100, 0x20) == [1, 2, 3, 16]
+    assert mm.tiles.content_rows(index, mm.window.Window(0, 0x2000), 0x2000, 1) == [0]
+
+
+@pytest.mark.parametrize("test_setup", [{"file_path": "out/tmp/tiles"}], indirect=True)
+@pytest.mark.parametrize("workers", ["1", "2"])
+def test_tiles_cli(test_setup, tmp_path, workers):
+    json_path = tmp_path / "input.json"
+    json_path.write_text(json.dumps(tiles_input))
+    with unittest.mock.patch(
+        "sys.argv",
+        [
+            "mm.diagram",
+            "-f", str(json_path),
+            "-o", str(test_setup["report"]),
+            "--outputs", "tiles",
+            "--tile-size", "256",
+            "--tile-levels", "6",
+            "--tile-workers", workers,
+        ],
+    ):
+        with unittest.mock.patch.object(
+                mm.diagram.Diagram, "_link_targets", wraps=mm.diagram.Diagram._link_targets) as link_targets:
+            mm.diagram.Diagram()
+        if workers == "1":
+            # once per model, not once per tile
+            assert link_targets.call_count == 1
+
+    tiles_dir = test_setup["report"].parent / (test_setup["report"].stem + "_tiles")
+    manifest = json.loads((tiles_dir / "manifest.json").read_text())
+    assert manifest["format"] == mm.tiles.manifest_format
+    assert manifest["tile_size"] == 256
+    assert [m["name"] for m in manifest["maps"]] == ["dram", "/soc/flash"]
+
+    dram = manifest["maps"][0]
+    assert (dram["origin"], dram["end"]) == (0, 0x100000)
+    assert [level["draw_scale"] for level in dram["levels"]] == [0x1000, 0x800, 0x400, 0x200, 0x100, 0x80]
+    # only the tiles with regions are drawn
+    assert dram["levels"][5] == {"level": 5, "draw_scale": 0x80, "rows": 32, "tiles": [0, 1, 16]}
+
+    paths = sorted(p.relative_to(tiles_dir).as_posix() for p in tiles_dir.glob("**/*.png"))
+    expected = sorted(
+        f"{m['path']}/{level['level']}/{row}.png"
+        for m in manifest["maps"] for level in m["levels"] for row in level["tiles"])
+    assert paths == expected
+    assert all(PIL.Image.open(tiles_dir / p).size == (256, 256) for p in paths)
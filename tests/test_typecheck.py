@@ -0,0 +1,63 @@
+import unittest
+import pytest
+import subprocess
+import sys
+import os
+import pathlib
+import typeguard
+
+from tests.fixtures.common import test_setup
+
+import mm.diagram
+import mm.image
+import mm.typecheck
+
+repo_root = pathlib.Path(__file__).parent.parent
+
+
+def test_checks_enabled_for_tests():
+    assert not mm.typecheck.production
+    with pytest.raises(typeguard.TypeCheckError):
+        mm.image.DashedRectangle("10", 10, (0, 0, 0, 0), fill="white")
+
+
+def test_production_env_var():
+    """The classes should not be instrumented in production mode"""
+    res = subprocess.run(
+        [
+            sys.executable, "-c",
+            "import mm.image, mm.typecheck\n"
+            "assert mm.typecheck.production\n"
+            "assert 'check_argument_types_internal' not in mm.image.DashedRectangle.__init__.__code__.co_names\n"
+        ],
+        capture_output=True,
+        text=True,
+        cwd=repo_root,
+        env={**os.environ, mm.typecheck.production_env_var: "1"}
+    )
+    assert res.returncode == 0, res.stderr
+
+
+@pytest.mark.parametrize("test_setup", [{"file_path": "out/tmp/typecheck_production"}], indirect=True)
+def test_production_api(test_setup):
+    """The run-time checks should be suppressed while the diagram is created"""
+
+    with unittest.mock.patch(
+        "sys.argv",
+        [
+            "mm.diagram",
+            "kernel", "0x10", "0x30",
+            "rootfs", "0x20", "0x30",
+            "-l", hex(1000),
+            "-o", str(test_setup["report"]),
+        ]
+    ):
+        with unittest.mock.patch("typeguard.suppress_type_checks", wraps=typeguard.suppress_type_checks) as suppress:
+            mm.diagram.Diagram(production=True)
+            assert suppress.call_count == 1
+
+    assert test_setup["diagram_image"].exists()
+
+    # the checks are back on afterwards
+    with pytest.raises(typeguard.TypeCheckError):
+        mm.image.DashedRectangle("10", 10, (0, 0, 0, 0), fill="white")
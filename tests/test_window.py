@@ -0,0 +1,110 @@
+import json
+import random
+import unittest
+import PIL.Image
+import pytest
+
+from tests.fixtures.common import test_setup
+
+import mm.diagram
+import mm.metamodel
+import mm.window
+
+
+def test_region_index():
+    rng = random.Random(1)
+    regions = {
+        f"r{i}": mm.metamodel.MemoryRegion(origin=hex(rng.randrange(0, 0x10000)), size=hex(rng.randrange(1, 0x800)))
+        for i in range(500)
+    }
+    index = mm.window.RegionIndex(regions)
+    for _ in range(100):
+        start = rng.randrange(0, 0x10000)
+        window = mm.window.Window(start, start + rng.randrange(1, 0x1000))
+        expected = {
+            name for name, r in regions.items()
+            if r.origin < window.end and r.origin + r.size > window.start
+        }
+        found = index.query(window)
+        assert set(found) == expected
+        assert [regions[name].origin for name in found] == sorted(regions[name].origin for name in found)
+
+
+window_input = {
+    "name": "window",
+    "height": 1000,
+    "width": 1000,
+    "memory_maps": {
+        "dram": {
+            "max_address": hex(0x10000000),
+            "memory_regions": {
+                "kernel": {"origin": hex(0x100000), "size": hex(0x800000)},
+                "dtb": {"origin": hex(0x8FF000), "size": hex(0x2000)},
+                "initrd": {"origin": hex(0x900000), "size": hex(0x4000000)},
+                "uboot": {"origin": hex(0xF000000), "size": hex(0x100000)},
+            },
+        },
+        "flash": {
+            "max_address": hex(0x10000000),
+            "memory_regions": {"image": {"origin": hex(0x0), "size": hex(0x1000000)}},
+        },
+    },
+}
+
+
+@pytest.mark.parametrize("test_setup", [{"file_path": "out/tmp/window"}], indirect=True)
+def test_window_cli(test_setup, tmp_path):
+    """Zoom in on the collision between dtb and initrd"""
+
+    json_path = tmp_path / "input.json"
+    json_path.write_text(json.dumps(window_input))
+    with unittest.mock.patch(
+        "sys.argv",
+        [
+            "mm.diagram",
+            "-f", str(json_path),
+            "-o", str(test_setup["report"]),
+            "--window", "0x8FE000", "0x902000",
+            "--window-maps", "dram",
+        ],
+    ):
+        d = mm.diagram.Diagram()
+
+    assert [mmd.name for mmd in d.mmd_list] == ["dram"]
+    mmd = d.mmd_list[0]
+    assert mmd.draw_scale == 18
+    assert mmd.origin == 0x8FE000
+
+    regions = {r.name: r for r in mmd.image_list}
+    assert set(regions) == {"kernel", "dtb", "initrd"}
+
+    assert regions["kernel"].clipped_start and not regions["kernel"].clipped_end
+    assert not regions["dtb"].clipped_start and not regions["dtb"].clipped_end
+    assert not regions["initrd"].clipped_start and regions["initrd"].clipped_end
+
+    # the clipped regions are only drawn inside the window
+    assert regions["kernel"].img.height == (0x900000 - 0x8FE000) // 18
+    assert regions["initrd"].img.height == (0x902000 - 0x900000) // 18
+    assert regions["kernel"].origin_label.endswith(" clipped")
+
+    # the collision is still measured against the whole map
+    assert regions["dtb"].collisions
+
+    assert PIL.Image.open(test_setup["diagram_image"]).size == (1000, 1000)
+    assert test_setup["table_image"].exists()
+
+
+def test_window_args(tmp_path):
+    json_path = tmp_path / "input.json"
+    json_path.write_text(json.dumps(window_input))
+    out = str(tmp_path / "report.md")
+
+    for window_args, error in (
+        (["--window", "0x100", "100"], "hex format"),
+        (["--window", "0x200", "0x100"], "below the end"),
+        (["--window-maps", "dram"], "can only be used with 'window'"),
+        (["--window", "0x0", "0x100", "--window-maps", "sram"], "not found: sram"),
+    ):
+        with unittest.mock.patch("sys.argv", ["mm.diagram", "-f", str(json_path), "-o", out, *window_args]):
+            with pytest.raises(SystemExit, match=error):
+                mm.diagram.Diagram()